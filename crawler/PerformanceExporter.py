@@ -1,74 +1,38 @@
 # Author: iilj
 
-import os
-import json
-import math
+import hashlib
+import argparse
 import sqlite3
+from concurrent.futures import ProcessPoolExecutor
 from sqlite3.dbapi2 import Connection, Cursor
-from typing import Dict, List, Optional, Tuple
-from lib.AHCInnerRatingRequestResult import AHCInnerRatingRequestResult
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from lib.AperfStore import AperfStore
+from lib.AtomicFile import write_json
+from lib.InnerPerformanceEngine import InnerPerformanceEngine
+from lib.Metrics import Metrics
+from lib.RatingStateStore import ContestKey, RatingStateStore
+
+PERFS_DIR: Path = Path('../atcoder-marathon-replay-frontend/public/perfs')
+
+
+USERS_QUERY: str = ('SELECT DISTINCT s.user_name '
+                    'FROM submissions AS s JOIN contests AS c ON c.contest_slug = s.contest '
+                    'WHERE s.contest = ? AND s.time_unix >= c.start_time_unix AND s.time_unix < c.end_time_unix')
 
 
 def get_users(cur: Cursor, contest: str = 'ahc001') -> List[str]:
     users: List[str] = []
-    for row in cur.execute('SELECT DISTINCT user_name '
-                           'FROM submissions WHERE contest = ? AND time_unix >= ('
-                           '    SELECT start_time_unix FROM contests WHERE contest_slug = ?'
-                           ') AND time_unix < ('
-                           '    SELECT end_time_unix FROM contests WHERE contest_slug = ?'
-                           ')', (contest, contest, contest)):
+    for row in cur.execute(USERS_QUERY, (contest,)):
         user_name: str = row[0]
         if user_name != 'wata_admin':
             users.append(user_name)
     return users
 
 
-prepared: Dict[float, float] = {}
-
-
-def perf2ExpectedAcceptedCount(m: float, ratings: List[int]) -> float:
-    expectedAcceptedCount: float
-    if m in prepared:
-        expectedAcceptedCount = prepared[m]
-    else:
-        expectedAcceptedCount = 0
-        for rating in ratings:
-            expectedAcceptedCount += 1 / (1 + pow(6, (m - rating) / 400))
-        prepared[m] = expectedAcceptedCount
-    return expectedAcceptedCount
-
-
-def perf2Ranking(x: float, ratings: List[int]) -> float:
-    return perf2ExpectedAcceptedCount(x, ratings) + 0.5
-
-
-def get_borders(ratings: List[int]) -> List[float]:
-    return [perf2Ranking(perf, ratings) for perf in range(400, 2800+1, 400)]
-
-
-rank_memo: Dict[float, float] = {}
-
-
-def get_rated_rank(X: float, ratings: List[int]) -> float:
-    if X in rank_memo:
-        return rank_memo[X]
-    ret: float = 0.5
-    for rating in ratings:
-        ret += 1.0 / (1.0 + pow(6.0, (X - rating) / 400.0))
-    rank_memo[X] = ret
-    return ret
-
-
-def get_inner_perf(rated_rank: int, ratings: List[int]) -> int:
-    upper: float = 6144.0
-    lower: float = -2048.0
-    while upper - lower > 0.5:
-        mid: float = (upper + lower) / 2
-        if (rated_rank > get_rated_rank(mid, ratings)):
-            upper = mid
-        else:
-            lower = mid
-    return round((upper + lower) / 2)
+def get_participants_fingerprint(users: List[str]) -> List[Any]:
+    """参加者の [人数, 名前の一覧の sha256] を返す．"""
+    return [len(users), hashlib.sha256('\n'.join(sorted(users)).encode('utf-8')).hexdigest()]
 
 
 def get_contests(cur: Cursor) -> List[Tuple[str, int, bool]]:
@@ -87,32 +51,108 @@ def get_contests(cur: Cursor) -> List[Tuple[str, int, bool]]:
     return contests
 
 
-def trace_innter_perf() -> Dict[str, int]:
+def compute_perfs(inner_ratings: List[int], recompute: bool) -> Tuple[List[float], List[int]]:
+    """参加者の内部レート一覧から，色境界と順位→内部パフォーマンスを求める．
+
+    Args:
+        inner_ratings (List[int]): 参加者の内部レート一覧（昇順）
+        recompute (bool): 得られた内部パフォーマンスを内部レート的に用いて再計算するか
+
+    Returns:
+        Tuple[List[float], List[int]]: (borders, perfs)
+    """
+    engine: InnerPerformanceEngine = InnerPerformanceEngine(inner_ratings)
+    perfs: List[int] = engine.get_inner_perfs()
+    borders: List[float] = engine.get_borders()
+    if recompute:
+        engine = InnerPerformanceEngine(perfs)
+        borders = engine.get_borders()
+        perfs = engine.get_inner_perfs()
+    return borders, perfs
+
+
+def trace_innter_perf(database: str = 'db.db', jobs: int = 1, perfs_dir: Path = PERFS_DIR,
+                      store: Optional[RatingStateStore] = None, rebuild: bool = False,
+                      prefetch_jobs: int = 4) -> Dict[str, int]:
     """内部レートを計算しながら JSON を出力する．
 
+    各回の参加者の内部レートは前の回までの ac-predictor のデータだけで決まるので，
+    それを順に作ってから，パフォーマンスの計算は jobs > 1 ならプロセスプールで並列に行う．
+    store があれば，前回までに処理したコンテストは計算せず，保存してある内部レートから続きを計算する
+    （参加者が変わったコンテストがあれば，そこから計算し直す）．
+    ac-predictor の内部レートは，足りないコンテストの分を先にまとめて DB の aperfs 表に取得しておく．
+
+    Args:
+        database (str): DB のパス
+        jobs (int): パフォーマンス計算に使うプロセス数
+        perfs_dir (Path): 出力先
+        store (Optional[RatingStateStore]): 途中状態の保存先
+        rebuild (bool): store があっても最初のコンテストから計算し直す
+        prefetch_jobs (int): ac-predictor から並列に取得するコンテスト数
+
     Returns:
         Dict[str, int]: ユーザ名→内部レーティング
     """
     # DB 接続
-    database: str = 'db.db'
     conn: Connection = sqlite3.connect(database)
     cur: Cursor = conn.cursor()
 
     # contest_slugs: List[str] = ['ahc001', 'ahc002', 'ahc003', 'ahc004', 'ahc005']
     contests: List[Tuple[str, int, bool]] = get_contests(cur)
-
+    # AHC001 までのコンテストは，得られた内部パフォーマンスを内部レート的に用いて，
+    # 内部パフォーマンスを再計算する
+    # https://www.dropbox.com/s/ne358pdixfafppm/AHC_rating.pdf?dl=0
+    recomputes: List[bool] = [start_time_unix <= 1614999600 for _, start_time_unix, _ in contests]
+    # 参加者は --follow や reconcile，クロールの続きで後から増えることがあるので，処理済みかどうかの判定に含める
+    metrics: Metrics = Metrics.get_default()
+    users_list: List[List[str]] = []
+    for contest_slug, _, _ in contests:
+        with metrics.timer('users_query'):
+            users_list.append(get_users(cur, contest_slug))
+    keys: List[ContestKey] = [{'contest': contest_slug, 'rated': rated, 'recompute': recompute,
+                               'participants': get_participants_fingerprint(users)}
+                              for (contest_slug, _, rated), recompute, users in zip(contests, recomputes, users_list)]
+
+    aperf_store: AperfStore = AperfStore(database)
+    resume: int = 0
     inner_ratings_dict: Dict[str, int] = {}
-
-    for contest_slug, start_time_unix, rated in contests:
-        prepared.clear()
-        rank_memo.clear()
-
-        users: List[str] = get_users(cur, contest_slug)
+    if store is not None:
+        if rebuild:
+            store.clear()
+        resume = store.get_resume_position(keys)
+        if resume == 0:
+            store.clear()
+        elif resume < len(store.contests):
+            # 途中のコンテストから計算し直すので，その直前までの内部レートを取得済みの aperfs から作り直す
+            replayed: Dict[str, int] = {}
+            for contest_slug, _, rated in contests[:resume]:
+                if rated and (contest_slug != 'ahc001'):
+                    replayed.update(aperf_store.get_inner_ratings(contest_slug))
+            store.truncate(resume, replayed)
+        inner_ratings_dict = dict(store.inner_ratings)
+        # 処理済みのコンテストは，出力がなければ保存してある結果から書き出す
+        for contest_slug, _, _ in contests[:resume]:
+            if not (perfs_dir / f'{contest_slug}.json').exists():
+                write_perfs(perfs_dir, contest_slug, store.read_perfs(contest_slug))
+        print(f'resume from {resume}/{len(contests)} contests')
+    committed_ratings_dict: Dict[str, int] = dict(inner_ratings_dict)
+
+    # コンテストごとに反映する ac-predictor の内部レート
+    updates: List[Dict[str, int]] = []
+    inner_ratings_list: List[List[int]] = []
+
+    with metrics.timer('aperf_prefetch'):
+        aperf_store.prefetch([contest_slug for contest_slug, _, rated in contests[resume:]
+                              if rated and (contest_slug != 'ahc001')], prefetch_jobs)
+    for (contest_slug, start_time_unix, rated), users in zip(contests[resume:], users_list[resume:]):
+        metrics.add('participants', len(users))
+        update: Dict[str, int] = {}
         if rated and (contest_slug != 'ahc001'):
             # Center ではない値を使う
-            airrr = AHCInnerRatingRequestResult.create_from_request(contest_slug)
-            for user_name, inner_rating in airrr.ahc_inner_ratings.items():
-                inner_ratings_dict[user_name] = inner_rating
+            with metrics.timer('aperf_read'):
+                update = aperf_store.get_inner_ratings(contest_slug)
+            inner_ratings_dict.update(update)
+        updates.append(update)
 
         # この回の参加者の内部レート（Center=1000）をつくる
         inner_ratings: List[int] = []
@@ -122,35 +162,68 @@ def trace_innter_perf() -> Dict[str, int]:
             else:
                 inner_ratings.append(1000)
         inner_ratings.sort()
+        inner_ratings_list.append(inner_ratings)
+    aperf_store.close()
+    conn.close()
 
-        # パフォ計算する
-        perfs = [get_inner_perf(i+1, inner_ratings) for i in range(len(inner_ratings))]
-        borders = get_borders(inner_ratings)
-        # AHC001 までのコンテストは，得られた内部パフォーマンスを内部レート的に用いて，
-        # 内部パフォーマンスを再計算する
-        # https://www.dropbox.com/s/ne358pdixfafppm/AHC_rating.pdf?dl=0
-        if start_time_unix <= 1614999600:
-            prepared.clear()
-            rank_memo.clear()
-            borders = get_borders(perfs)
-            perfs = [get_inner_perf(i+1, perfs) for i in range(len(perfs))]
-        # print(perfs)
-        print(f'{contest_slug} -> {borders}')
-
-        # データを JSON に出力する
-        data = {
-            'borders': borders,
-            'perfs': perfs
-        }
-        with open(f'../atcoder-marathon-replay-frontend/public/perfs/{contest_slug}.json', mode='wt', encoding='utf-8') as f:
-            json.dump(data, f, separators=(',', ':'))
+    # パフォ計算する
+    results: Iterable[Tuple[List[float], List[int]]]
+    executor: Optional[ProcessPoolExecutor] = None
+    if jobs > 1:
+        executor = ProcessPoolExecutor(max_workers=jobs)
+        results = executor.map(compute_perfs, inner_ratings_list, recomputes[resume:])
+    else:
+        results = map(compute_perfs, inner_ratings_list, recomputes[resume:])
+
+    try:
+        iterator: Iterator[Tuple[List[float], List[int]]] = iter(results)
+        for key, update in zip(keys[resume:], updates):
+            # 並列なら，結果を待った時間になる
+            with metrics.timer('perf_compute'):
+                borders, perfs = next(iterator)
+            # print(perfs)
+            print(f'{key["contest"]} -> {borders}')
+
+            # データを JSON に出力する
+            with metrics.timer('json_write'):
+                write_perfs(perfs_dir, key['contest'], {
+                    'borders': borders,
+                    'perfs': perfs
+                })
+            if store is not None:
+                committed_ratings_dict.update(update)
+                with metrics.timer('state_commit'):
+                    store.commit(key, committed_ratings_dict, borders, perfs)
+            metrics.add('contests_computed')
+    finally:
+        if executor is not None:
+            executor.shutdown()
 
-    conn.close()
     return inner_ratings_dict
 
 
+def write_perfs(perfs_dir: Path, contest_slug: str, data: Dict[str, List[Any]]) -> None:
+    write_json(perfs_dir / f'{contest_slug}.json', data)
+
+
 def main() -> None:
-    trace_innter_perf()
+    parser = argparse.ArgumentParser(description='コンテストごとの色境界と順位→パフォーマンスを JSON で出力する')
+    parser.add_argument('--database', default='db.db')
+    parser.add_argument('--jobs', type=int, default=1, help='パフォーマンス計算に使うプロセス数')
+    parser.add_argument('--prefetch-jobs', type=int, default=4, help='ac-predictor から並列に取得するコンテスト数')
+    parser.add_argument('--perfs-dir', default=str(PERFS_DIR), help='出力先')
+    parser.add_argument('--state-dir', default='rating_state', help='処理済みのコンテストと内部レートの保存先')
+    parser.add_argument('--no-state', action='store_true', help='途中状態を使わず，保存もしない')
+    parser.add_argument('--rebuild', action='store_true', help='保存してある状態を捨てて最初のコンテストから計算し直す')
+    parser.add_argument('--metrics', metavar='PATH', default=None,
+                        help='段階ごとの時間と件数のレポートを終了時に書き出す（.prom なら Prometheus 形式，それ以外は JSON）')
+    args = parser.parse_args()
+    if args.metrics is not None:
+        metrics: Metrics = Metrics.get_default()
+        metrics.command = 'performance'
+        metrics.write_at_exit(Path(args.metrics))
+    store: Optional[RatingStateStore] = None if args.no_state else RatingStateStore(Path(args.state_dir))
+    trace_innter_perf(args.database, args.jobs, Path(args.perfs_dir), store, args.rebuild, args.prefetch_jobs)
 
 
 if __name__ == '__main__':
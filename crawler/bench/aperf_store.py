@@ -0,0 +1,110 @@
+# Author: iilj
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from lib.AHCInnerRatingRequestResult import AHCInnerRatingRequestResult
+from lib.AperfStore import AperfStore
+from lib.Endpoint import Endpoint
+from lib.StubServer import StubServer
+
+
+def generate_aperfs(rng: random.Random, num_contests: int, num_users: int) -> Dict[str, Dict[str, int]]:
+    """参加者が少しずつ増えていく合成の aperfs を作る．"""
+    aperfs: Dict[str, Dict[str, int]] = {}
+    for i in range(num_contests):
+        users: int = num_users * (i + 1) // num_contests
+        aperfs[f'synth{i + 1:03d}'] = {f'user{k:06d}': max(0, int(rng.gauss(1400, 600))) for k in range(users)}
+    return aperfs
+
+
+def read_legacy(slugs: List[str]) -> float:
+    """従来どおり JSON ファイルを 1 つずつ読んで json.loads する秒数を返す．"""
+    start: float = time.perf_counter()
+    for slug in slugs:
+        AHCInnerRatingRequestResult.create_from_request(slug)
+    return time.perf_counter() - start
+
+
+def read_store(store: AperfStore, slugs: List[str]) -> float:
+    start: float = time.perf_counter()
+    for slug in slugs:
+        store.get_inner_ratings(slug)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='aperfs の DB へのまとめ取得と読み出しを，JSON ファイルごとの取得と比べる')
+    parser.add_argument('--contests', type=int, default=60)
+    parser.add_argument('--users', type=int, default=20000, help='最後のコンテストの内部レートを持つユーザ数')
+    parser.add_argument('--latency', type=float, default=0.1, help='スタブの応答遅延（秒）')
+    parser.add_argument('--jobs', type=int, default=8, help='並列に取得するコンテスト数')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng: random.Random = random.Random(args.seed)
+    aperfs: Dict[str, Dict[str, int]] = generate_aperfs(rng, args.contests, args.users)
+    slugs: List[str] = list(aperfs)
+    cache_dir: Optional[Path] = AHCInnerRatingRequestResult.cache_dir
+    ac_predictor: str = Endpoint.ac_predictor
+    with tempfile.TemporaryDirectory() as tmpdir, StubServer([], latency=args.latency, aperfs=aperfs) as stub:
+        Endpoint.ac_predictor = stub.url
+        try:
+            # 従来：1 コンテストずつ取得して JSON ファイルにキャッシュする
+            AHCInnerRatingRequestResult.cache_dir = Path(tmpdir) / 'json'
+            AHCInnerRatingRequestResult.cache_dir.mkdir()
+            start: float = time.perf_counter()
+            for slug in slugs:
+                assert AHCInnerRatingRequestResult.create_from_request(slug).ahc_inner_ratings == aperfs[slug]
+            sequential_sec: float = time.perf_counter() - start
+            legacy_read_sec: float = read_legacy(slugs)
+
+            # DB にまとめて並列に取得する
+            AHCInnerRatingRequestResult.cache_dir = None
+            requests: int = stub.request_count
+            with AperfStore(os.path.join(tmpdir, 'db.db')) as store:
+                start = time.perf_counter()
+                assert store.prefetch(slugs, args.jobs) == len(slugs)
+                prefetch_sec: float = time.perf_counter() - start
+                assert stub.request_count - requests == len(slugs)
+                # 取得済みなら 2 回目はアクセスしない
+                assert store.prefetch(slugs, args.jobs) == 0 and stub.request_count - requests == len(slugs)
+                for slug in slugs:
+                    assert store.get_inner_ratings(slug) == aperfs[slug], f'{slug}: differs'
+                store_read_sec: float = read_store(store, slugs)
+        finally:
+            AHCInnerRatingRequestResult.cache_dir = cache_dir
+            Endpoint.ac_predictor = ac_predictor
+        print(f'synthetic {args.contests} contests (latency {args.latency}s): '
+              f'fetch sequential {sequential_sec:.2f}s vs prefetch x{args.jobs} {prefetch_sec:.2f}s; '
+              f'read json files {legacy_read_sec:.2f}s vs store {store_read_sec:.2f}s')
+
+        # lib/json/ のキャッシュはネットワークにアクセスせずに取り込める
+        if cache_dir is not None and cache_dir.exists():
+            Endpoint.ac_predictor = 'http://127.0.0.1:9'  # 取得しようとすれば失敗する
+            try:
+                cached: List[str] = sorted(path.stem for path in cache_dir.glob('*.json'))
+                with AperfStore(os.path.join(tmpdir, 'cached.db')) as store:
+                    start = time.perf_counter()
+                    store.prefetch(cached, args.jobs)
+                    import_sec: float = time.perf_counter() - start
+                    for slug in cached:
+                        assert store.get_inner_ratings(slug) == \
+                            AHCInnerRatingRequestResult.create_from_request(slug).ahc_inner_ratings, f'{slug}: differs'
+                    legacy_read_sec = read_legacy(cached)
+                    store_read_sec = read_store(store, cached)
+            finally:
+                Endpoint.ac_predictor = ac_predictor
+            print(f'lib/json {len(cached)} contests: import {import_sec:.2f}s; '
+                  f'read json files {legacy_read_sec:.2f}s vs store {store_read_sec:.2f}s')
+
+
+# $ cd crawler
+# $ python -m bench.aperf_store
+if __name__ == '__main__':
+    main()
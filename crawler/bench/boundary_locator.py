@@ -0,0 +1,138 @@
+# Author: iilj
+
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from multiprocessing import Pipe, get_context
+from multiprocessing.connection import Connection as PipeConnection
+from typing import Any, Dict, List, Optional, Tuple
+
+from bench.crawl_pipeline import read_submissions
+from crawl import crawl, crawl_pipelined
+from lib.Endpoint import Endpoint
+from lib.Metrics import Metrics
+from lib.Migration import connect as migrate_connect
+from lib.RateLimiter import TokenBucketRateLimiter
+from lib.StubServer import StubServer
+from lib.SyntheticAtCoder import SyntheticContest
+
+MODES: List[str] = ['sequential', 'sequential+locate', 'pipeline', 'pipeline+locate']
+
+
+def make_contests(num_contests: int, num_submissions: int, num_practice_submissions: int) -> List[SyntheticContest]:
+    """コンテスト期間の終わりがページの途中にあるもの・ちょうどページの切れ目にあるもの・練習提出がないものを混ぜる．"""
+    contests: List[SyntheticContest] = []
+    for i in range(num_contests):
+        practice: int = 0 if i % 4 == 3 else num_practice_submissions * (i + 1)
+        contests.append(SyntheticContest(i + 1, num_submissions=num_submissions + 7 * i,
+                                         num_practice_submissions=practice))
+    return contests
+
+
+def serve(num_contests: int, num_submissions: int, num_practice_submissions: int, latency: float,
+          conn: PipeConnection) -> None:
+    """別プロセスでスタブサーバを動かす．"""
+    with StubServer(make_contests(num_contests, num_submissions, num_practice_submissions), latency=latency) as stub:
+        conn.send(stub.url)
+        while conn.recv() != 'stop':
+            conn.send(stub.request_count)
+        conn.send(stub.request_count)
+
+
+def truncate(database: str, pagenum: int) -> None:
+    """pagenum ページまでクロールしたところで止まった DB にする．"""
+    conn: sqlite3.Connection = sqlite3.connect(database)
+    conn.execute('DELETE FROM submissions WHERE pagenum > ?', (pagenum,))
+    conn.execute('UPDATE contests SET crawl_completed = 0')
+    conn.commit()
+    conn.close()
+
+
+def run(mode: str, database: str, args: argparse.Namespace, conn: PipeConnection) -> Dict[str, Any]:
+    migrate_connect(database).close()
+    limiter: TokenBucketRateLimiter = TokenBucketRateLimiter(args.rps, capacity=args.rps)
+    metrics: Metrics = Metrics.get_default()
+    metrics.drain()
+    conn.send('count')
+    requests: int = conn.recv()
+    locate: bool = mode.endswith('+locate')
+    start: float = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if mode.startswith('sequential'):
+            crawl(database, limiter, 1, locate=locate)
+        else:
+            crawl_pipelined(database, limiter, args.fetchers, args.parsers, args.queue_size, locate=locate)
+    elapsed: float = time.perf_counter() - start
+    conn.send('count')
+    requests = conn.recv() - requests
+    return {'elapsed': elapsed, 'requests': requests, 'counters': metrics.report()['counters']}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='ページ範囲の二分探索ありとなしでクロールのリクエスト数を比べる')
+    parser.add_argument('--contests', type=int, default=4)
+    parser.add_argument('--submissions', type=int, default=1000, help='1 コンテストあたりのコンテスト期間中の提出数')
+    parser.add_argument('--practice', type=int, default=5000,
+                        help='コンテスト終了後の練習提出数（i 番目のコンテストは i 倍．4 つに 1 つは 0）')
+    parser.add_argument('--latency', type=float, default=0.01, help='スタブの応答遅延（秒）')
+    parser.add_argument('--rps', type=float, default=1000, help='1 秒あたりのリクエスト数')
+    parser.add_argument('--fetchers', type=int, default=2)
+    parser.add_argument('--parsers', type=int, default=2)
+    parser.add_argument('--queue-size', type=int, default=4)
+    parser.add_argument('--resume-page', type=int, default=10, help='このページまでクロール済みの DB からの再開も比べる')
+    args = parser.parse_args()
+
+    parent, child = Pipe()
+    server = get_context('spawn').Process(
+        target=serve, args=(args.contests, args.submissions, args.practice, args.latency, child))
+    server.start()
+    atcoder: str = Endpoint.atcoder
+    try:
+        Endpoint.atcoder = parent.recv()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            results: Dict[str, Dict[str, Any]] = {}
+            rows: Optional[List[Tuple[Any, ...]]] = None
+            for mode in MODES:
+                database: str = os.path.join(tmpdir, f'{mode}.db')
+                results[mode] = run(mode, database, args, parent)
+                # 書き込まれる行（ページ番号を含む）は二分探索なしの逐次のクロールと同じ
+                if rows is None:
+                    rows = read_submissions(database)
+                else:
+                    assert read_submissions(database) == rows, f'{mode}: submissions differ'
+            assert rows is not None
+            # 途中まで書き込んだ DB から再開しても同じ
+            for mode in ('sequential', 'sequential+locate'):
+                database = os.path.join(tmpdir, f'resume-{mode}.db')
+                shutil.copyfile(os.path.join(tmpdir, 'sequential.db'), database)
+                truncate(database, args.resume_page)
+                results[f'resume {mode}'] = run(mode, database, args, parent)
+                assert read_submissions(database) == rows, f'resume {mode}: submissions differ'
+        pages: int = sum(contest.num_pages for contest in make_contests(args.contests, args.submissions, args.practice))
+        print(f'{args.contests} contests, {len(rows)} rows, {pages} pages including practice; submissions identical')
+        for mode, result in results.items():
+            counters: Dict[str, float] = result['counters']
+            detail: List[str] = []
+            if 'boundary_probes' in counters:
+                detail.append(f'{counters["boundary_probes"]:.0f} probes, '
+                              f'{counters.get("boundary_probes_outside", 0):.0f} outside the range')
+            if 'pages_discarded' in counters:
+                detail.append(f'{counters["pages_discarded"]:.0f} speculative pages discarded')
+            print(f'  {mode:>24}: {result["requests"]:5d} requests, {result["elapsed"]:6.2f}s'
+                  + (f' ({"; ".join(detail)})' if len(detail) > 0 else ''))
+    finally:
+        Endpoint.atcoder = atcoder
+        parent.send('stop')
+        parent.recv()
+        server.join()
+
+
+# $ cd crawler
+# $ python -m bench.boundary_locator
+if __name__ == '__main__':
+    main()
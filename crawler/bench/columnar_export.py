@@ -0,0 +1,97 @@
+# Author: iilj
+
+import argparse
+import gzip
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from sqlite3.dbapi2 import Connection, Cursor
+from typing import Any, Callable, Dict, List, Union
+
+from bench.streaming_export import insert_contest
+from export import export_submissions, score_fix_ratio
+from lib.ColumnarSubmissions import decode_columnar_submissions, read_columnar_submissions
+from lib.csv.AHCResultCSV import AHCScoresCSV
+from lib.csv.AHCResultStore import AHCResultStore
+from lib.Migration import migrate
+
+
+def best_of(func: Callable[[], Any], repeat: int) -> float:
+    best: float = float('inf')
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='行形式と列形式の提出一覧のサイズとデコード時間を比べる')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 400000])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng: random.Random = random.Random(args.seed)
+    ahc001_users: List[str] = list(AHCScoresCSV('./lib/csv/result_ahc001.csv').entries.keys())
+    synth_users: List[str] = [f'user{i:05d}' for i in range(args.users)]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        database: str = os.path.join(tmpdir, 'db.db')
+        conn: Connection = sqlite3.connect(database)
+        migrate(conn)
+        AHCResultStore(conn).import_all()
+        submission_id: int = 1
+        contests: List[str] = ['ahc001', 'hokudai-hitachi2020', 'ahc002']
+        submission_id = insert_contest(conn, 'ahc001', ['ahc001_a'], ahc001_users, 20000, submission_id, 1, rng)
+        submission_id = insert_contest(conn, 'hokudai-hitachi2020', list(score_fix_ratio['hokudai-hitachi2020']),
+                                       synth_users, 20000, submission_id, 1000, rng)
+        submission_id = insert_contest(conn, 'ahc002', ['ahc002_a', 'ahc002_b'], synth_users, 20000,
+                                       submission_id, 1, rng)
+        for size in args.sizes:
+            slug: str = f'synth{size}'
+            contests.append(slug)
+            submission_id = insert_contest(conn, slug, [f'{slug}_a'], synth_users, size, submission_id, 1, rng)
+
+        public_dir: Path = Path(tmpdir) / 'public'
+        (public_dir / 'submissions').mkdir(parents=True)
+        cur: Cursor = conn.cursor()
+        for contest in contests:
+            tasks: List[Dict[str, Union[str, int, float]]] = [
+                {'task_slug': row[0]} for row in cur.execute(
+                    'SELECT task_slug FROM tasks WHERE contest_slug = ? ORDER BY label ASC', (contest,))]
+            export_submissions(cur, contest, tasks, public_dir, columnar=True)
+
+            row_path: Path = public_dir / 'submissions' / f'{contest}.json'
+            columnar_path: Path = public_dir / 'submissions' / f'{contest}.columnar.json'
+            with open(row_path, encoding='utf-8') as f:
+                rows = json.load(f)
+            # 往復して，値だけでなく int/float の区別やキー順まで元に戻ることを確かめる
+            decoded = read_columnar_submissions(columnar_path)
+            assert decoded == rows, f'{contest}: round trip differs'
+            assert json.dumps(decoded, separators=(',', ':')).encode('utf-8') == row_path.read_bytes()
+
+            row_bytes: bytes = row_path.read_bytes()
+            columnar_bytes: bytes = columnar_path.read_bytes()
+            row_gz: int = len(gzip.compress(row_bytes))
+            columnar_gz: int = len(gzip.compress(columnar_bytes))
+            row_sec: float = best_of(lambda: json.loads(row_bytes), args.repeat)
+            parse_sec: float = best_of(lambda: json.loads(columnar_bytes), args.repeat)
+            decode_sec: float = best_of(lambda: decode_columnar_submissions(json.loads(columnar_bytes)), args.repeat)
+            print(f'{contest} ({len(rows)} rows): '
+                  f'size {len(row_bytes) / 1024:.0f} -> {len(columnar_bytes) / 1024:.0f} KiB '
+                  f'({len(columnar_bytes) / len(row_bytes):.1%}), '
+                  f'gzip {row_gz / 1024:.0f} -> {columnar_gz / 1024:.0f} KiB ({columnar_gz / row_gz:.1%}), '
+                  f'parse {row_sec * 1000:.1f} -> {parse_sec * 1000:.1f} ms '
+                  f'(parse and rebuild rows {decode_sec * 1000:.1f} ms)')
+        conn.close()
+
+
+# $ cd crawler
+# $ python -m bench.columnar_export
+if __name__ == '__main__':
+    main()
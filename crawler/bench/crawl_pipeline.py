@@ -0,0 +1,117 @@
+# Author: iilj
+
+import argparse
+import contextlib
+import io
+import os
+import sqlite3
+import tempfile
+import time
+from multiprocessing import Pipe, get_context
+from multiprocessing.connection import Connection as PipeConnection
+from typing import Any, Dict, List, Optional, Tuple
+
+from crawl import crawl, crawl_pipelined
+from lib.Endpoint import Endpoint
+from lib.Metrics import Metrics
+from lib.Migration import connect as migrate_connect
+from lib.ParserBackend import BACKEND_NAMES, ParserBackend
+from lib.RateLimiter import TokenBucketRateLimiter
+from lib.StubServer import StubServer
+from lib.SyntheticAtCoder import SyntheticContest
+
+
+def serve(num_contests: int, num_submissions: int, latency: float, conn: PipeConnection) -> None:
+    """別プロセスでスタブサーバを動かす（HTML の生成がクローラと GIL を取り合わないように）．"""
+    contests: List[SyntheticContest] = [
+        SyntheticContest(i + 1, num_submissions=num_submissions, num_practice_submissions=num_submissions // 2)
+        for i in range(num_contests)]
+    with StubServer(contests, latency=latency) as stub:
+        conn.send(stub.url)
+        while conn.recv() != 'stop':
+            conn.send(stub.request_count)
+        conn.send(stub.request_count)
+
+
+def read_submissions(database: str) -> List[Tuple[Any, ...]]:
+    conn: sqlite3.Connection = sqlite3.connect(database)
+    rows: List[Tuple[Any, ...]] = conn.execute('SELECT * FROM submissions ORDER BY submission_id').fetchall()
+    conn.close()
+    return rows
+
+
+def run(mode: str, database: str, args: argparse.Namespace, conn: PipeConnection) -> Dict[str, Any]:
+    migrate_connect(database).close()
+    limiter: TokenBucketRateLimiter = TokenBucketRateLimiter(args.rps, capacity=args.rps)
+    metrics: Metrics = Metrics.get_default()
+    metrics.drain()
+    conn.send('count')
+    requests: int = conn.recv()
+    start: float = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if mode == 'sequential':
+            crawl(database, limiter, 1)
+        else:
+            crawl_pipelined(database, limiter, args.fetchers, args.parsers, args.queue_size)
+    elapsed: float = time.perf_counter() - start
+    conn.send('count')
+    requests = conn.recv() - requests
+    return {'elapsed': elapsed, 'requests': requests, 'report': metrics.report()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='取得・パース・書き込みのパイプラインと，逐次のクロールを比べる')
+    parser.add_argument('--contests', type=int, default=4)
+    parser.add_argument('--submissions', type=int, default=2000, help='1 コンテストあたりのコンテスト期間中の提出数')
+    parser.add_argument('--latency', type=float, default=0.05, help='スタブの応答遅延（秒）')
+    parser.add_argument('--rps', type=float, default=1000, help='1 秒あたりのリクエスト数')
+    parser.add_argument('--parser', choices=BACKEND_NAMES, default='bs4', help='HTML パーサ')
+    parser.add_argument('--fetchers', type=int, default=2)
+    parser.add_argument('--parsers', type=int, default=max(1, (os.cpu_count() or 1) - 1))
+    parser.add_argument('--queue-size', type=int, default=4)
+    args = parser.parse_args()
+
+    ParserBackend.default = args.parser
+    parent, child = Pipe()
+    server = get_context('spawn').Process(target=serve, args=(args.contests, args.submissions, args.latency, child))
+    server.start()
+    atcoder: str = Endpoint.atcoder
+    try:
+        Endpoint.atcoder = parent.recv()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            results: Dict[str, Dict[str, Any]] = {}
+            rows: Optional[List[Tuple[Any, ...]]] = None
+            for mode in ('sequential', 'pipeline'):
+                database: str = os.path.join(tmpdir, f'{mode}.db')
+                results[mode] = run(mode, database, args, parent)
+                # 書き込まれる行（ページ番号を含む）は逐次のクロールと同じ
+                if rows is None:
+                    rows = read_submissions(database)
+                else:
+                    assert read_submissions(database) == rows, f'{mode}: submissions differ'
+        assert rows is not None
+        sequential: Dict[str, Any] = results['sequential']
+        pipeline: Dict[str, Any] = results['pipeline']
+        gauges: Dict[str, Dict[str, float]] = pipeline['report']['gauges']
+        stages: Dict[str, Dict[str, Any]] = pipeline['report']['stages']
+        print(f'{args.contests} contests, {len(rows)} rows, parser={args.parser}, latency={args.latency}s: '
+              f'sequential {sequential["elapsed"]:.2f}s ({sequential["requests"]} requests); '
+              f'pipeline fetchers={args.fetchers} parsers={args.parsers} queue={args.queue_size} '
+              f'{pipeline["elapsed"]:.2f}s ({pipeline["requests"]} requests, '
+              f'{pipeline["requests"] - sequential["requests"]} speculative); submissions identical')
+        print('  queue depth (mean/max): ' + ', '.join(
+            f'{name} {gauge["mean"]:.1f}/{gauge["max"]:.0f}' for name, gauge in gauges.items()))
+        print('  waits: ' + ', '.join(
+            f'{stage} {stages[stage]["total_sec"]:.2f}s' for stage in ('fetch_queue_put_wait', 'page_window_wait',
+                                                                        'writer_wait') if stage in stages))
+    finally:
+        Endpoint.atcoder = atcoder
+        parent.send('stop')
+        parent.recv()
+        server.join()
+
+
+# $ cd crawler
+# $ python -m bench.crawl_pipeline
+if __name__ == '__main__':
+    main()
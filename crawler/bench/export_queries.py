@@ -0,0 +1,107 @@
+# Author: iilj
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from sqlite3.dbapi2 import Connection
+from typing import Dict, List, Tuple
+
+from export import SUBMISSIONS_QUERY
+from lib.Migration import migrate
+from PerformanceExporter import USERS_QUERY
+
+
+# マイグレーション前（バージョン 1）に使っていたクエリ
+LEGACY_SUBMISSIONS_QUERY: str = (
+    "SELECT submission_id, task, time_unix, user_name, score, status, magnification "
+    "FROM submissions WHERE contest = ? AND time_unix >= ("
+    "    SELECT start_time_unix FROM contests WHERE contest_slug = ?"
+    ") AND time_unix < ("
+    "    SELECT end_time_unix FROM contests WHERE contest_slug = ?"
+    ")"
+    "ORDER BY submission_id ASC"
+)
+LEGACY_USERS_QUERY: str = (
+    'SELECT DISTINCT user_name '
+    'FROM submissions WHERE contest = ? AND time_unix >= ('
+    '    SELECT start_time_unix FROM contests WHERE contest_slug = ?'
+    ') AND time_unix < ('
+    '    SELECT end_time_unix FROM contests WHERE contest_slug = ?'
+    ')'
+)
+MAX_PAGENUM_QUERY: str = 'SELECT MAX(pagenum) FROM submissions WHERE contest = ?'
+
+
+def populate(conn: Connection, num_contests: int, rows_per_contest: int, seed: int) -> None:
+    """合成の提出を submissions と contests に入れる．"""
+    rng: random.Random = random.Random(seed)
+    submission_id: int = 1
+    for i in range(num_contests):
+        slug: str = f'synth{i:03d}'
+        start: int = 1600000000 + i * 1209600
+        end: int = start + 691200
+        conn.execute('INSERT INTO contests VALUES (?,?,?,?,?,?,?)', (slug, slug, start, end, 1, 0, 1))
+        rows: List[Tuple[object, ...]] = []
+        for k in range(rows_per_contest):
+            # 1 割はコンテスト終了後の提出
+            time_unix: int = start + int((end - start) * 1.1 * k / rows_per_contest)
+            rows.append((submission_id, slug, f'{slug}_a', k // 20 + 1, time_unix, f'user{rng.randrange(5000):05d}',
+                         'C++', 4003, rng.randrange(10 ** 9), 1000, 'AC', 100, 1000, 1))
+            submission_id += 1
+        conn.executemany('INSERT INTO submissions VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)', rows)
+    conn.commit()
+
+
+def measure(conn: Connection, slugs: List[str], queries: Dict[str, Tuple[str, int]]) -> Dict[str, float]:
+    """各クエリについて，コンテストあたりの平均秒数を返す．"""
+    ret: Dict[str, float] = {}
+    for name, (query, num_params) in queries.items():
+        start: float = time.perf_counter()
+        for slug in slugs:
+            conn.execute(query, (slug,) * num_params).fetchall()
+        ret[name] = (time.perf_counter() - start) / len(slugs)
+    return ret
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='スキーマのマイグレーション前後でエクスポート系クエリの時間を比べる')
+    parser.add_argument('--contests', type=int, default=20)
+    parser.add_argument('--rows-per-contest', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        conn: Connection = sqlite3.connect(os.path.join(tmpdir, 'db.db'))
+        migrate(conn, target=1)
+        populate(conn, args.contests, args.rows_per_contest, args.seed)
+        slugs: List[str] = [f'synth{i:03d}' for i in range(args.contests)]
+        print(f'rows={args.contests * args.rows_per_contest}')
+
+        before: Dict[str, float] = measure(conn, slugs, {
+            'export_submissions': (LEGACY_SUBMISSIONS_QUERY, 3),
+            'get_users': (LEGACY_USERS_QUERY, 3),
+            'max_pagenum': (MAX_PAGENUM_QUERY, 1),
+        })
+        start: float = time.perf_counter()
+        migrate(conn)
+        print(f'migration: {time.perf_counter() - start:.1f}s')
+        after: Dict[str, float] = measure(conn, slugs, {
+            'export_submissions': (SUBMISSIONS_QUERY, 1),
+            'get_users': (USERS_QUERY, 1),
+            'max_pagenum': (MAX_PAGENUM_QUERY, 1),
+        })
+        for query in (SUBMISSIONS_QUERY, USERS_QUERY, MAX_PAGENUM_QUERY):
+            print('plan: ' + ' / '.join(row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {query}', (slugs[0],))))
+        for name in before:
+            print(f'{name}: before={before[name] * 1000:.1f}ms/contest, after={after[name] * 1000:.1f}ms/contest, '
+                  f'speedup={before[name] / max(after[name], 1e-9):.1f}x')
+        conn.close()
+
+
+# $ cd crawler
+# $ python -m bench.export_queries
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+# Author: iilj
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from sqlite3.dbapi2 import Connection
+from typing import Dict, List, Optional
+
+from PerformanceExporter import trace_innter_perf
+from bench.parallel_export import read_outputs
+from lib.Migration import migrate
+from lib.RatingStateStore import RatingStateStore
+
+JSON_DIR: Path = Path(__file__).resolve().parent.parent / 'lib' / 'json'
+
+
+def insert_contests(conn: Connection, slugs: List[str], users_per_contest: int, rng: random.Random) -> None:
+    """ac-predictor のデータがキャッシュ済みのコンテストを，その参加者と新規参加者からなる合成提出で作る．"""
+    for slug in slugs:
+        index: int = int(slug[3:])
+        # 最初のコンテストは内部パフォーマンスを再計算する期間に入れる
+        start_time_unix: int = 1614900000 + 14 * 86400 * (index - 1)
+        end_time_unix: int = start_time_unix + 8 * 86400
+        known: List[str] = []
+        path: Path = JSON_DIR / f'{slug}.json'
+        if path.exists():
+            with open(path, encoding='utf-8') as f:
+                known = list(json.load(f))
+        num_known: int = min(len(known), users_per_contest * 3 // 4)
+        users: List[str] = rng.sample(known, num_known) + [
+            f'new{index:03d}_{i}' for i in range(users_per_contest - num_known)]
+        conn.execute('INSERT INTO contests VALUES (?,?,?,?,1,1,1)', (slug, slug, start_time_unix, end_time_unix))
+        conn.executemany('INSERT INTO submissions (contest, task, pagenum, time_unix, user_name, score, status) '
+                         'VALUES (?,?,1,?,?,0,?)',
+                         [(slug, f'{slug}_a', rng.randrange(start_time_unix, end_time_unix), user, 'AC')
+                          for user in users])
+    conn.commit()
+
+
+def add_users(conn: Connection, slug: str, num_users: int) -> None:
+    """既存のコンテストに，後から取り込まれた提出（--follow や reconcile など）の参加者を足す．"""
+    start_time_unix, end_time_unix = conn.execute('SELECT start_time_unix, end_time_unix FROM contests '
+                                                  'WHERE contest_slug = ?', (slug,)).fetchone()
+    conn.executemany('INSERT INTO submissions (contest, task, pagenum, time_unix, user_name, score, status) '
+                     'VALUES (?,?,2,?,?,0,?)',
+                     [(slug, f'{slug}_a', end_time_unix - 1 - i, f'late_{slug}_{i}', 'AC') for i in range(num_users)])
+    conn.commit()
+
+
+def run(database: str, perfs_dir: Path, state_dir: Optional[Path] = None, rebuild: bool = False) -> float:
+    perfs_dir.mkdir(parents=True, exist_ok=True)
+    store: Optional[RatingStateStore] = RatingStateStore(state_dir) if state_dir is not None else None
+    start: float = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        trace_innter_perf(database, 1, perfs_dir, store, rebuild)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='内部レートの途中状態から続きを計算した結果が，最初から計算した結果と一致するか確かめる')
+    parser.add_argument('--contests', type=int, default=40, help='コンテスト数（ahc001 から）')
+    parser.add_argument('--new', type=int, default=1, help='後から追加するコンテスト数')
+    parser.add_argument('--users', type=int, default=3000, help='1 コンテストあたりの参加者数')
+    parser.add_argument('--late-users', type=int, default=50, help='処理済みのコンテストに後から足す参加者数')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng: random.Random = random.Random(args.seed)
+    slugs: List[str] = [f'ahc{i:03d}' for i in range(1, args.contests + 1)]
+    assert all((JSON_DIR / f'{slug}.json').exists() for slug in slugs[1:]), 'aperfs are not cached'
+    with tempfile.TemporaryDirectory() as tmpdir:
+        database: str = os.path.join(tmpdir, 'db.db')
+        conn: Connection = sqlite3.connect(database)
+        migrate(conn)
+        insert_contests(conn, slugs[:-args.new], args.users, rng)
+
+        incremental_dir: Path = Path(tmpdir) / 'incremental'
+        state_dir: Path = Path(tmpdir) / 'state'
+        first_sec: float = run(database, incremental_dir, state_dir)
+        insert_contests(conn, slugs[-args.new:], args.users, rng)
+        resume_sec: float = run(database, incremental_dir, state_dir)
+        # 処理済みのコンテストの参加者が増えたら，そのコンテストから計算し直す
+        changed: str = slugs[len(slugs) // 2]
+        add_users(conn, changed, args.late_users)
+        conn.close()
+        changed_sec: float = run(database, incremental_dir, state_dir)
+        assert RatingStateStore(state_dir).contests[-1]['contest'] == slugs[-1]
+        full_sec: float = run(database, Path(tmpdir) / 'full')
+        rebuild_sec: float = run(database, Path(tmpdir) / 'rebuild', state_dir, rebuild=True)
+
+        expected: Dict[str, bytes] = read_outputs(Path(tmpdir) / 'full')
+        assert len(expected) == args.contests
+        assert read_outputs(incremental_dir) == expected, 'incremental output differs from full replay'
+        assert read_outputs(Path(tmpdir) / 'rebuild') == expected, '--rebuild output differs from full replay'
+        # 状態が残っていれば，出力先が空でも保存してある結果から書き出せる
+        run(database, Path(tmpdir) / 'restored', state_dir)
+        assert read_outputs(Path(tmpdir) / 'restored') == expected, 'restored output differs from full replay'
+
+    print(f'{args.contests} contests x {args.users} users: first run {first_sec:.2f}s, '
+          f'resume with {args.new} new contests {resume_sec:.2f}s, '
+          f'resume after {args.late_users} users joined {changed} {changed_sec:.2f}s, full replay {full_sec:.2f}s, '
+          f'--rebuild {rebuild_sec:.2f}s; outputs identical')
+
+
+# $ cd crawler
+# $ python -m bench.incremental_perf
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+# Author: iilj
+
+import argparse
+import random
+import time
+from typing import Dict, List, Tuple
+
+from lib.csv.AHCResultStore import CSV_DIR
+from lib.InnerPerformanceEngine import SOLVER_NAMES, InnerPerformanceEngine, SolverName
+
+
+# 以下は InnerPerformanceEngine に置き換える前の PerformanceExporter の実装（結果を照合する基準）
+prepared: Dict[float, float] = {}
+
+
+def perf2ExpectedAcceptedCount(m: float, ratings: List[int]) -> float:
+    expectedAcceptedCount: float
+    if m in prepared:
+        expectedAcceptedCount = prepared[m]
+    else:
+        expectedAcceptedCount = 0
+        for rating in ratings:
+            expectedAcceptedCount += 1 / (1 + pow(6, (m - rating) / 400))
+        prepared[m] = expectedAcceptedCount
+    return expectedAcceptedCount
+
+
+def perf2Ranking(x: float, ratings: List[int]) -> float:
+    return perf2ExpectedAcceptedCount(x, ratings) + 0.5
+
+
+def get_borders(ratings: List[int]) -> List[float]:
+    return [perf2Ranking(perf, ratings) for perf in range(400, 2800+1, 400)]
+
+
+rank_memo: Dict[float, float] = {}
+
+
+def get_rated_rank(X: float, ratings: List[int]) -> float:
+    if X in rank_memo:
+        return rank_memo[X]
+    ret: float = 0.5
+    for rating in ratings:
+        ret += 1.0 / (1.0 + pow(6.0, (X - rating) / 400.0))
+    rank_memo[X] = ret
+    return ret
+
+
+def get_inner_perf(rated_rank: int, ratings: List[int]) -> int:
+    upper: float = 6144.0
+    lower: float = -2048.0
+    while upper - lower > 0.5:
+        mid: float = (upper + lower) / 2
+        if (rated_rank > get_rated_rank(mid, ratings)):
+            upper = mid
+        else:
+            lower = mid
+    return round((upper + lower) / 2)
+
+
+def generate_ratings(num_users: int, seed: int) -> List[int]:
+    """AHC の参加者を模した内部レート一覧を生成する．新規参加者（1000）が多く含まれる．"""
+    rng: random.Random = random.Random(seed)
+    ratings: List[int] = []
+    for _ in range(num_users):
+        if rng.random() < 0.4:
+            ratings.append(1000)
+        else:
+            ratings.append(max(0, int(rng.gauss(1400, 600))))
+    ratings.sort()
+    return ratings
+
+
+def get_historical_sizes() -> List[int]:
+    """lib/csv/result_*.csv の参加者数（昇順）を返す．"""
+    sizes: List[int] = []
+    for path in CSV_DIR.glob('result_*.csv'):
+        with open(path, encoding='utf-8') as f:
+            sizes.append(sum(1 for line in f if line.strip()) - 1)
+    return sorted(sizes)
+
+
+def run_engine(ratings: List[int], solver: SolverName) -> Tuple[float, List[int], List[int], int]:
+    """compute_perfs と同じく，内部パフォーマンスを求めてから，それを内部レートとして求め直す．
+
+    Returns:
+        Tuple[float, List[int], List[int], int]: (秒数, 1 回目の結果, 求め直した結果, 期待順位を計算した探索点の数)
+    """
+    start: float = time.perf_counter()
+    engine: InnerPerformanceEngine = InnerPerformanceEngine(ratings, solver)
+    perfs: List[int] = engine.get_inner_perfs()
+    recomputed_engine: InnerPerformanceEngine = InnerPerformanceEngine(perfs, solver)
+    recomputed: List[int] = recomputed_engine.get_inner_perfs()
+    elapsed: float = time.perf_counter() - start
+    return elapsed, perfs, recomputed, len(engine.evaluated) + len(recomputed_engine.evaluated)
+
+
+def run_reference(ratings: List[int], ranks: List[int]) -> List[int]:
+    prepared.clear()
+    rank_memo.clear()
+    return [get_inner_perf(rank, ratings) for rank in ranks]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='内部パフォーマンス計算のベンチマーク')
+    parser.add_argument('--users', type=int, nargs='+', default=None,
+                        help='参加者数（省略時は lib/csv/ の過去のコンテストの参加者数と 5000, 10000, 20000）')
+    parser.add_argument('--reference-ranks', type=int, default=100,
+                        help='従来実装で計算する順位の数（全順位は遅すぎるので抜き出して外挿する）')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    sizes: List[int] = args.users if args.users is not None else get_historical_sizes() + [5000, 10000, 20000]
+    for num_users in sizes:
+        ratings: List[int] = generate_ratings(num_users, args.seed)
+
+        results: Dict[str, Tuple[float, List[int], List[int], int]] = {
+            solver: run_engine(ratings, solver) for solver in SOLVER_NAMES}
+        _, perfs, recomputed, evaluations = results['newton']
+        # 全順位で solver の結果が一致すること
+        for solver in SOLVER_NAMES:
+            assert results[solver][1] == perfs and results[solver][2] == recomputed, f'{solver}: differs'
+        engine: InnerPerformanceEngine = InnerPerformanceEngine(ratings)
+        prepared.clear()
+        assert engine.get_borders() == get_borders(ratings)
+
+        rng: random.Random = random.Random(args.seed)
+        ranks: List[int] = sorted(rng.sample(range(1, num_users + 1), min(args.reference_ranks, num_users)))
+        start: float = time.perf_counter()
+        reference: List[int] = run_reference(ratings, ranks)
+        reference_sec: float = (time.perf_counter() - start) * num_users / len(ranks)
+        recomputed_reference: List[int] = run_reference(perfs, ranks)
+        mismatches: int = sum(1 for rank, perf in zip(ranks, reference) if perfs[rank - 1] != perf) + \
+            sum(1 for rank, perf in zip(ranks, recomputed_reference) if recomputed[rank - 1] != perf)
+
+        print(f'users={num_users}: ' + ', '.join(f'{solver}={results[solver][0]:.3f}s' for solver in SOLVER_NAMES)
+              + f' (newton evaluated {evaluations / num_users / 2:.2f} points/rank), '
+              f'reference(estimated, first pass)={reference_sec:.1f}s, '
+              f'mismatches={mismatches}/{2 * len(ranks)}')
+
+
+# $ cd crawler
+# $ python -m bench.inner_perf
+if __name__ == '__main__':
+    main()
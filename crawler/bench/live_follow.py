@@ -0,0 +1,146 @@
+# Author: iilj
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Set, Tuple
+
+from crawl import follow_contest
+from lib.Endpoint import Endpoint
+from lib.Migration import connect as migrate_connect
+from lib.ParserBackend import JST
+from lib.RateLimiter import TokenBucketRateLimiter
+from lib.StubServer import StubServer
+from lib.SubmissionListPageRequestResult import SubmissionListPageRequestResult
+from lib.SubmissionWriter import SubmissionWriter
+from lib.SyntheticAtCoder import SyntheticContest
+
+# 比べる列：submission_id, task, time_unix, user_name, score, status, time_consumption, memory_consumption
+Row = Tuple[int, str, int, str, int, str, int, int]
+
+
+def expected_rows(contest: SyntheticContest) -> Set[Row]:
+    """スタブが今返す内容を昇順のページから全件読んだもの（全件クロールし直した場合の結果）．"""
+    rows: Set[Row] = set()
+    for pagenum in range(1, contest.num_pages + 1):
+        result = SubmissionListPageRequestResult.create_from_html(
+            contest.slug, pagenum, contest.submission_list_html(pagenum))
+        rows |= {(d[0], d[2], d[4], d[5], d[8], d[10], d[11], d[12]) for d in result.generate_insert_data()}
+    return rows
+
+
+def actual_rows(database: str, slug: str) -> Set[Row]:
+    conn = sqlite3.connect(database)
+    rows: Set[Row] = set(conn.execute(
+        'SELECT submission_id, task, time_unix, user_name, score, status, time_consumption, memory_consumption '
+        'FROM submissions WHERE contest = ?', (slug,)))
+    conn.close()
+    return rows
+
+
+@contextlib.contextmanager
+def host_time_zone(name: str) -> Iterator[None]:
+    """このプロセスのローカルタイムゾーンを一時的に name にする．"""
+    tz: Optional[str] = os.environ.get('TZ')
+    os.environ['TZ'] = name
+    time.tzset()
+    try:
+        yield
+    finally:
+        if tz is None:
+            del os.environ['TZ']
+        else:
+            os.environ['TZ'] = tz
+        time.tzset()
+
+
+def check_contest_end(limiter: TokenBucketRateLimiter) -> None:
+    """ホストのタイムゾーンによらず，終了時刻を実際の時刻と比べてコンテストが終わったかを判定すること．
+
+    終了後の練習提出がまだないコンテストは，終了時刻と現在時刻の比較だけで終わったと判定する．
+    """
+    cases: List[Tuple[str, timedelta, bool]] = [
+        ('UTC', timedelta(hours=-3), True),  # 日本時間より西：終わって 3 時間たったコンテストを終わったとみなす
+        ('Pacific/Kiritimati', timedelta(hours=3), False),  # 日本時間より東：3 時間後に終わるコンテストを終わったとみなさない
+    ]
+    for name, end_from_now, expected in cases:
+        with host_time_zone(name):
+            contest: SyntheticContest = SyntheticContest(1, num_practice_submissions=0)
+            contest.start_time = datetime.now(JST) + end_from_now - timedelta(minutes=contest.duration_minutes)
+            with tempfile.TemporaryDirectory() as tmpdir, StubServer([contest]) as stub:
+                database: str = os.path.join(tmpdir, 'db.db')
+                migrate_connect(database).close()
+                atcoder: str = Endpoint.atcoder
+                Endpoint.atcoder = stub.url
+                try:
+                    with SubmissionWriter(database) as writer, contextlib.redirect_stdout(io.StringIO()):
+                        completed: bool = follow_contest(writer, contest.slug, limiter)
+                finally:
+                    Endpoint.atcoder = atcoder
+        assert completed == expected, f'TZ={name}: completed={completed}'
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='開催中のコンテストの差分取り込みのリクエスト数と正しさを確かめる')
+    parser.add_argument('--submissions', type=int, default=4000, help='コンテスト期間中の提出数')
+    parser.add_argument('--rounds', type=int, default=30, help='取り込みの回数')
+    parser.add_argument('--new-per-round', type=int, default=60, help='1 回の間に増える提出数の最大値')
+    parser.add_argument('--judging', type=int, default=30, help='ジャッジ中の提出数の最大値')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng: random.Random = random.Random(args.seed)
+    contest: SyntheticContest = SyntheticContest(1, num_submissions=args.submissions, num_practice_submissions=40)
+    # 開催中にする
+    contest.start_time = datetime.now(JST) - timedelta(days=1)
+    contest.num_created = args.submissions // 2
+    contest.num_judged = contest.num_created - args.judging
+
+    limiter: TokenBucketRateLimiter = TokenBucketRateLimiter(1000)
+    with tempfile.TemporaryDirectory() as tmpdir, StubServer([contest]) as stub:
+        database: str = os.path.join(tmpdir, 'db.db')
+        migrate_connect(database).close()
+        atcoder: str = Endpoint.atcoder
+        Endpoint.atcoder = stub.url
+        try:
+            with SubmissionWriter(database) as writer:
+                requests: List[int] = []
+                for i in range(args.rounds + 2):
+                    if i == args.rounds + 1:
+                        # コンテスト終了後の練習提出まで見え，全提出のジャッジが終わった状態
+                        contest.num_created = contest.num_judged = None
+                    elif i > 0:
+                        contest.num_created = min(args.submissions,
+                                                  contest.num_visible + rng.randrange(args.new_per_round + 1))
+                        assert contest.num_judged is not None
+                        contest.num_judged = max(contest.num_judged,
+                                                 contest.num_visible - rng.randrange(args.judging + 1))
+                    before: int = stub.request_count
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        completed: bool = follow_contest(writer, contest.slug, limiter)
+                    requests.append(stub.request_count - before)
+                    assert actual_rows(database, contest.slug) == expected_rows(contest), f'round {i}: rows differ'
+                    assert completed == (i == args.rounds + 1), f'round {i}: completed={completed}'
+        finally:
+            Endpoint.atcoder = atcoder
+
+    refresh: List[int] = requests[1:-1]
+    print(f'initial: {requests[0]} requests ({args.submissions // 2} submissions)')
+    print(f'refresh x{len(refresh)}: {sum(refresh) / len(refresh):.2f} requests on average, max {max(refresh)} '
+          f'(full recrawl: {contest.num_pages} requests)')
+    print(f'after the end: {requests[-1]} requests, crawl_completed')
+
+    check_contest_end(limiter)
+    print('contest end is detected independently of the host time zone')
+
+
+# $ cd crawler
+# $ python -m bench.live_follow
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+# Author: iilj
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from sqlite3.dbapi2 import Connection
+from typing import Any, Dict, List, Tuple
+
+from bench.export_queries import populate
+from export import export_all
+from lib.ExportManifest import ExportManifest
+from lib.Migration import migrate
+from lib.SubmissionWriter import SubmissionWriter
+
+
+def read_outputs(public_dir: Path) -> Dict[str, bytes]:
+    return {str(path.relative_to(public_dir)): path.read_bytes()
+            for path in sorted(public_dir.rglob('*.json'))}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='並列エクスポートのプロセス数に対するスケーリングを測る')
+    parser.add_argument('--contests', type=int, default=16)
+    parser.add_argument('--rows-per-contest', type=int, default=50000)
+    parser.add_argument('--jobs', type=int, nargs='+', default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        database: str = os.path.join(tmpdir, 'db.db')
+        conn: Connection = sqlite3.connect(database)
+        migrate(conn)
+        populate(conn, args.contests, args.rows_per_contest, args.seed)
+        conn.close()
+        print(f'contests={args.contests}, rows={args.contests * args.rows_per_contest}, cpus={os.cpu_count()}')
+
+        baseline_sec: float = 0.0
+        baseline_outputs: Dict[str, bytes] = {}
+        for jobs in sorted(set(args.jobs)):
+            public_dir: Path = Path(tmpdir) / f'public{jobs}'
+            for sub in ('contests', 'tasks', 'submissions'):
+                (public_dir / sub).mkdir(parents=True)
+            manifest: ExportManifest = ExportManifest(Path(tmpdir) / f'manifest{jobs}.json')
+            start: float = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                export_all(database, public_dir, manifest, force=True, jobs=jobs)
+            elapsed: float = time.perf_counter() - start
+
+            outputs: Dict[str, bytes] = read_outputs(public_dir)
+            if not baseline_outputs:
+                baseline_sec, baseline_outputs = elapsed, outputs
+            assert outputs == baseline_outputs, f'jobs={jobs}: output differs'
+            print(f'jobs={jobs}: {elapsed:.2f}s, speedup={baseline_sec / elapsed:.2f}x')
+
+        check_incremental(database, Path(tmpdir))
+
+
+def upsert(database: str, changes: Dict[int, Dict[str, Any]]) -> None:
+    """--follow や reconcile と同じく，SubmissionWriter で提出の行を書き直す（ページ番号 0 は既にある番号を残す）．"""
+    conn: Connection = sqlite3.connect(database)
+    conn.row_factory = sqlite3.Row
+    rows: List[sqlite3.Row] = conn.execute(
+        f'SELECT * FROM submissions WHERE submission_id IN ({",".join("?" * len(changes))}) ORDER BY submission_id',
+        list(changes)).fetchall()
+    conn.close()
+    with SubmissionWriter(database) as writer:
+        for row in rows:
+            data: Dict[str, Any] = {**dict(row), **changes[row['submission_id']], 'pagenum': 0}
+            writer.add_page(row['contest'], 0, [tuple(data.values())])
+
+
+def check_incremental(database: str, tmpdir: Path) -> None:
+    """件数・得点の合計・AC 数が変わらない更新でも，そのコンテストだけが書き出し直されることを確かめる．
+
+    値の変わらない書き直し（--follow で同じ提出を取り直したときなど）では，何も書き出し直さない．
+    """
+    public_dir: Path = tmpdir / 'public-incremental'
+    for sub in ('contests', 'tasks', 'submissions'):
+        (public_dir / sub).mkdir(parents=True)
+    manifest: ExportManifest = ExportManifest(tmpdir / 'manifest-incremental.json')
+    conn: Connection = sqlite3.connect(database)
+    scores: Dict[int, int] = dict(conn.execute('SELECT submission_id, score FROM submissions WHERE submission_id <= 4'))
+    conn.close()
+    # ジャッジ待ちの提出（--follow や reconcile で後から直る）
+    upsert(database, {1: {'status': 'WJ', 'score': 0}})
+    with contextlib.redirect_stdout(io.StringIO()):
+        export_all(database, public_dir, manifest)
+    updates: Dict[str, Tuple[Dict[int, Dict[str, Any]], int]] = {
+        'status only (WJ -> WA at score 0)': ({1: {'status': 'WA'}}, 1),
+        'magnification only': ({2: {'magnification': 2}}, 1),
+        'scores swapped': ({3: {'score': scores[4]}, 4: {'score': scores[3]}}, 1),
+        'nothing changed': ({2: {'magnification': 2}, 3: {'score': scores[4]}}, 0),
+    }
+    for name, (changes, expected) in updates.items():
+        before: Dict[str, bytes] = read_outputs(public_dir)
+        upsert(database, changes)
+        with contextlib.redirect_stdout(io.StringIO()):
+            exported, skipped = export_all(database, public_dir, manifest)
+        assert exported == expected, f'{name}: {exported} contests exported'
+        changed: List[str] = [path for path, data in read_outputs(public_dir).items() if before.get(path) != data]
+        assert changed == ['submissions/synth000.json'][:expected], f'{name}: {changed}'
+        print(f'{name}: re-exported {exported} contest(s), skipped {skipped}')
+
+    # 出力の設定を変えたら，データが同じでもすべて書き出し直す
+    for columnar, checkpoint_every, expected in [(False, 100, 4), (False, 100, 0), (False, 50, 4), (True, 50, 4)]:
+        with contextlib.redirect_stdout(io.StringIO()):
+            exported, skipped = export_all(database, public_dir, manifest,
+                                           columnar=columnar, checkpoint_every=checkpoint_every)
+        name = f'columnar={columnar}, checkpoint_every={checkpoint_every}'
+        assert exported == expected, f'{name}: {exported} contests exported'
+        with open(public_dir / 'standings' / 'synth000' / 'index.json', encoding='utf-8') as f:
+            assert json.load(f)['every'] == checkpoint_every, f'{name}: stale checkpoints'
+        print(f'{name}: re-exported {exported} contest(s), skipped {skipped}')
+
+
+# $ cd crawler
+# $ python -m bench.parallel_export
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# Author: iilj
+
+import argparse
+import time
+from typing import Any, Callable, Dict, List
+
+from lib.ContestListPage import ContestListPage
+from lib.ParserBackend import BACKEND_NAMES
+from lib.SubmissionListPage import SubmissionListPage
+from lib.SyntheticAtCoder import SyntheticContest, contest_list_html
+from lib.TaskListPage import TaskListPage
+
+
+def item_to_dict(item: Any) -> Dict[str, Any]:
+    if hasattr(item, '__slots__'):
+        return {name: getattr(item, name) for name in item.__slots__}
+    return vars(item)
+
+
+def page_to_dict(page: Any) -> Dict[str, Any]:
+    """ページインスタンスを，バックエンド間で比較できる辞書に変換する．"""
+    ret: Dict[str, Any] = {}
+    for key, value in vars(page).items():
+        if isinstance(value, list):
+            ret[key] = [item_to_dict(item) for item in value]
+        else:
+            ret[key] = value
+    return ret
+
+
+def detect_page_class(html: str) -> Callable[..., Any]:
+    if 'var startTime = moment(' in html:
+        return SubmissionListPage
+    if 'fixtime-full' in html:
+        return ContestListPage
+    return TaskListPage
+
+
+def check_differential(name: str, html: str) -> None:
+    """全バックエンドのパース結果が bs4（基準実装）と一致することを確認する．"""
+    page_class: Callable[..., Any] = detect_page_class(html)
+    reference: Dict[str, Any] = page_to_dict(page_class(html, backend="bs4"))
+    for backend in BACKEND_NAMES:
+        result: Dict[str, Any] = page_to_dict(page_class(html, backend=backend))
+        assert result == reference, f'{name}: {backend} differs from bs4'
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='HTML パーサのバックエンド比較（差分チェックとスループット計測）')
+    parser.add_argument('files', nargs='*', help='保存済みのページ（sample.html など）')
+    parser.add_argument('--pages', type=int, default=200, help='計測に使う合成提出一覧ページ数')
+    args = parser.parse_args()
+
+    contest: SyntheticContest = SyntheticContest(1, num_submissions=args.pages * SyntheticContest.rows_per_page)
+    pages: List[str] = [contest.submission_list_html(pagenum) for pagenum in range(1, args.pages + 1)]
+
+    # 差分チェック
+    samples: Dict[str, str] = {
+        'synthetic_contests.html': contest_list_html([SyntheticContest(i) for i in range(1, 10)]),
+        'synthetic_tasks.html': SyntheticContest(1, num_tasks=5).task_list_html(),
+        'synthetic_submissions_empty.html': contest.submission_list_html(args.pages + 10),
+    }
+    for pagenum in range(1, min(args.pages, 20) + 1):
+        samples[f'synthetic_submissions_{pagenum}.html'] = pages[pagenum - 1]
+    for fn in args.files:
+        with open(fn, encoding='utf-8') as f:
+            samples[fn] = f.read()
+    for name, html in samples.items():
+        check_differential(name, html)
+    print(f'differential check: {len(samples)} pages OK')
+
+    # スループット計測
+    rows: int = sum(len(SubmissionListPage(html, backend="bs4").submissions) for html in pages[:1]) * len(pages)
+    for backend in BACKEND_NAMES:
+        start: float = time.perf_counter()
+        for html in pages:
+            SubmissionListPage(html, backend=backend)
+        elapsed: float = time.perf_counter() - start
+        print(f'{backend}: {len(pages) / elapsed:.1f} pages/s, {rows / elapsed:.0f} rows/s')
+
+
+# $ cd crawler
+# $ python -m bench.parser [sample.html ...]
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+// フロントエンドの getRankSequence (src/utils/RankReproducer.ts) をそのまま動かして，結果を JSON で出力する．
+// TypeScript はフロントエンドの node_modules のもの（なければ NODE_PATH 上のもの）でその場でトランスパイルする．
+//
+// $ node bench/rank_reproducer.js <frontend_dir> <submissions.json> <inverted: 0|1> < users.json
+const fs = require('fs');
+const path = require('path');
+
+const [frontendDir, submissionsPath, inverted] = process.argv.slice(2);
+
+let ts;
+try {
+  ts = require(path.join(path.resolve(frontendDir), 'node_modules', 'typescript'));
+} catch (e) {
+  ts = require('typescript');
+}
+
+const cache = new Map();
+const load = (file) => {
+  if (cache.has(file)) return cache.get(file).exports;
+  const source = fs.readFileSync(file, 'utf8');
+  const { outputText } = ts.transpileModule(source, {
+    compilerOptions: {
+      module: ts.ModuleKind.CommonJS,
+      target: ts.ScriptTarget.ES2019,
+    },
+  });
+  const module = { exports: {} };
+  cache.set(file, module);
+  const localRequire = (spec) =>
+    spec.startsWith('.') ? load(path.join(path.dirname(file), `${spec}.ts`)) : require(spec);
+  new Function('exports', 'require', 'module', outputText)(module.exports, localRequire, module);
+  return module.exports;
+};
+
+const { getRankSequence } = load(
+  path.join(path.resolve(frontendDir), 'src', 'utils', 'RankReproducer.ts')
+);
+const submissions = JSON.parse(fs.readFileSync(submissionsPath, 'utf8'));
+const users = JSON.parse(fs.readFileSync(0, 'utf8'));
+const result = {};
+users.forEach((user) => {
+  result[user] = getRankSequence(user, submissions, inverted === '1');
+});
+process.stdout.write(JSON.stringify(result));
@@ -0,0 +1,122 @@
+# Author: iilj
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+from itertools import accumulate
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from export import PUBLIC_DIR, decreasing_order_contest_slugs
+from lib.ColumnarSubmissions import ColumnarSubmissionsEncoder, SubmissionDict
+from lib.RankTimeline import read_rank_sequence, write_rank_timelines
+
+FRONTEND_DIR: Path = PUBLIC_DIR.parent
+
+
+def generate_submissions(rng: random.Random, num_users: int, num_tasks: int, num_submissions: int,
+                         inverted: bool) -> List[SubmissionDict]:
+    """同点・0 点・負の得点・loss の増加などが起きやすい，小さな得点幅の合成提出を作る．"""
+    data: List[SubmissionDict] = []
+    time_unix: int = 1600000000
+    for submission_id in range(1, num_submissions + 1):
+        time_unix += rng.randrange(3)
+        score: int = rng.choice([0, 0, rng.randrange(1, 6), rng.randrange(1, 30)])
+        if not inverted and rng.random() < 0.02:
+            score = -rng.randrange(1, 5)
+        data.append({
+            'submission_id': submission_id,
+            'task': f't{rng.randrange(num_tasks)}',
+            'time_unix': time_unix,
+            'user_name': f'user{rng.randrange(num_users)}',
+            'score': score,
+            'status': rng.choice(['AC', 'AC', 'WA', 'TLE']),
+        })
+    return data
+
+
+def run_reference(submissions_path: Path, inverted: bool, users: List[str]) -> Tuple[Dict[str, Any], float]:
+    """フロントエンドの getRankSequence を node で動かした結果と，その秒数を返す．"""
+    start: float = time.perf_counter()
+    proc = subprocess.run(
+        ['node', str(Path(__file__).with_name('rank_reproducer.js')), str(FRONTEND_DIR), str(submissions_path),
+         '1' if inverted else '0'],
+        input=json.dumps(users), capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout), time.perf_counter() - start
+
+
+def check(name: str, data: List[SubmissionDict], inverted: bool, workdir: Path, sample: int,
+          rng: random.Random) -> None:
+    submissions_path: Path = workdir / f'{name}.json'
+    with open(submissions_path, mode='wt', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'))
+
+    encoder: ColumnarSubmissionsEncoder = ColumnarSubmissionsEncoder()
+    for d in data:
+        encoder.add(d)
+    directory: Path = workdir / 'timelines' / name
+    start: float = time.perf_counter()
+    num_shards: int = write_rank_timelines(
+        directory, list(encoder.users), list(encoder.tasks), list(encoder.statuses),
+        list(accumulate(encoder.time_unix_deltas)), encoder.user_indexes, encoder.task_indexes,
+        encoder.status_indexes, encoder.scores, inverted)
+    replay_sec: float = time.perf_counter() - start
+
+    users: List[str] = list(encoder.users)
+    if 0 < sample < len(users):
+        users = rng.sample(users, sample)
+    expected, reference_sec = run_reference(submissions_path, inverted, users)
+    start = time.perf_counter()
+    for user in users:
+        assert read_rank_sequence(directory, user) == expected[user], f'{name}: {user} differs'
+    lookup_sec: float = (time.perf_counter() - start) / len(users)
+
+    total_bytes: int = sum(path.stat().st_size for path in directory.glob('*.json'))
+    shard_bytes: int = max(path.stat().st_size for path in directory.glob('*.json') if path.name != 'index.json')
+    events: int = sum(len(seq) for seq in expected.values())
+    print(f'{name}: {len(data)} submissions, {len(encoder.users)} users, inverted={inverted}, '
+          f'checked {len(users)} users ({events} events): '
+          f'replay all users {replay_sec:.2f}s vs getRankSequence {reference_sec / len(users) * 1000:.1f} ms/user, '
+          f'lookup {lookup_sec * 1000:.1f} ms/user, '
+          f'{num_shards} shards, total {total_bytes / 2 ** 20:.1f} MiB, '
+          f'largest shard {shard_bytes / 2 ** 10:.0f} KiB + index {(directory / "index.json").stat().st_size / 2 ** 10:.0f} KiB')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='順位の変化点の事前計算がフロントエンドの getRankSequence と一致するか確かめる')
+    parser.add_argument('--contests', nargs='*', default=['ahc001', 'ahc017'],
+                        help='public/submissions にあるコンテストも比べる')
+    parser.add_argument('--synthetic', type=int, default=20, help='合成の提出一覧の数')
+    parser.add_argument('--sample', type=int, default=100, help='実データで比べるユーザ数（0 なら全員）')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng: random.Random = random.Random(args.seed)
+    workdir: Path = Path(tempfile.mkdtemp())
+    try:
+        for i in range(args.synthetic):
+            inverted: bool = i % 2 == 1
+            data: List[SubmissionDict] = generate_submissions(
+                rng, rng.randrange(2, 40), rng.randrange(1, 4), rng.randrange(1, 600), inverted)
+            check(f'synthetic{i:02d}', data, inverted, workdir, 0, rng)
+        for contest in args.contests:
+            path: Path = FRONTEND_DIR / 'public' / 'submissions' / f'{contest}.json'
+            if not path.exists():
+                print(f'{contest}: {path} not found, skipped')
+                continue
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            check(contest, data, contest in decreasing_order_contest_slugs, workdir, args.sample, rng)
+    finally:
+        shutil.rmtree(workdir)
+
+
+# $ cd crawler
+# $ python -m bench.rank_timeline
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+# Author: iilj
+
+import argparse
+import contextlib
+import io
+import os
+import sqlite3
+import tempfile
+from typing import List, Tuple
+
+from bench.live_follow import actual_rows, expected_rows, host_time_zone
+from crawl import crawl_contest, reconcile_contest
+from lib.ContestListPage import ContestListPage
+from lib.Endpoint import Endpoint
+from lib.Migration import connect as migrate_connect
+from lib.RateLimiter import TokenBucketRateLimiter
+from lib.StubServer import StubServer
+from lib.SubmissionWriter import SubmissionWriter
+from lib.SyntheticAtCoder import SyntheticContest, contest_list_html
+
+
+def check_stale_pages(limiter: TokenBucketRateLimiter) -> None:
+    """コンテスト終了前に取得したページの判定がホストのタイムゾーンによらず，再取得で片付くこと．
+
+    期間の提出がちょうどページの切れ目で終わるコンテストの，練習提出だけのページ（行が 1 つもない）も，
+    終了前に取得したことにして再取得すれば，2 回目にはもう対象にならない．
+    """
+    for name in ('UTC', 'Pacific/Kiritimati'):
+        with host_time_zone(name):
+            contest: SyntheticContest = SyntheticContest(2, num_submissions=10 * SyntheticContest.rows_per_page,
+                                                         num_practice_submissions=40)
+            contest_info: ContestListPage.Contest = ContestListPage(contest_list_html([contest])).contests[0]
+            end_time_unix: int = int(contest.end_time.timestamp())
+            with tempfile.TemporaryDirectory() as tmpdir, StubServer([contest]) as stub:
+                database: str = os.path.join(tmpdir, 'db.db')
+                migrate_connect(database).close()
+                atcoder: str = Endpoint.atcoder
+                Endpoint.atcoder = stub.url
+                try:
+                    with SubmissionWriter(database) as writer, contextlib.redirect_stdout(io.StringIO()):
+                        crawl_contest(writer, contest_info, limiter)
+                        pages: List[int] = [row[0] for row in writer.conn.execute(
+                            'SELECT pagenum FROM pages WHERE contest = ? ORDER BY pagenum', (contest.slug,))]
+                        # 行のないページも取得した時刻を記録する
+                        assert pages == list(range(1, 12)), f'TZ={name}: pages={pages}'
+                        writer.conn.execute('UPDATE pages SET crawled_at = ?', (end_time_unix + 3600,))
+                        writer.conn.commit()
+                        assert writer.get_stale_pages(contest.slug) == [], f'TZ={name}: pages crawled after the end'
+                        writer.conn.execute('UPDATE pages SET crawled_at = ?', (end_time_unix - 3600,))
+                        writer.conn.commit()
+                        assert writer.get_stale_pages(contest.slug) == pages, f'TZ={name}: pages crawled before the end'
+                        reconcile_contest(writer, contest.slug, limiter)
+                        assert writer.get_stale_pages(contest.slug) == [], f'TZ={name}: stale pages remain'
+                        assert writer.get_reconcile_targets() == []
+                finally:
+                    Endpoint.atcoder = atcoder
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='疑わしい行だけの再取得のリクエスト数と，全件クロールし直した結果との一致を確かめる')
+    parser.add_argument('--submissions', type=int, default=20000, help='コンテスト期間中の提出数')
+    parser.add_argument('--late', type=int, default=90, help='最初のクロールの後に来た提出数')
+    parser.add_argument('--judging', type=int, default=40, help='最初のクロールのときにジャッジ中だった提出数')
+    parser.add_argument('--stale-pages', type=int, default=3, help='コンテスト終了前に取得したことにする末尾のページ数')
+    args = parser.parse_args()
+
+    contest: SyntheticContest = SyntheticContest(1, num_submissions=args.submissions, num_practice_submissions=0)
+    contest.num_created = args.submissions - args.late
+    contest.num_judged = contest.num_created - args.judging
+    contest_info: ContestListPage.Contest = ContestListPage(contest_list_html([contest])).contests[0]
+
+    limiter: TokenBucketRateLimiter = TokenBucketRateLimiter(1000)
+    with tempfile.TemporaryDirectory() as tmpdir, StubServer([contest]) as stub:
+        database: str = os.path.join(tmpdir, 'db.db')
+        migrate_connect(database).close()
+        atcoder: str = Endpoint.atcoder
+        Endpoint.atcoder = stub.url
+        try:
+            with SubmissionWriter(database) as writer, contextlib.redirect_stdout(io.StringIO()):
+                crawl_contest(writer, contest_info, limiter)
+            crawl_requests: int = stub.request_count
+            # 末尾のページをコンテスト終了前に取得したことにする
+            conn = sqlite3.connect(database)
+            conn.execute('UPDATE pages SET crawled_at = ? WHERE pagenum > (SELECT MAX(pagenum) FROM pages) - ?',
+                         (int(contest.start_time.timestamp()), args.stale_pages))
+            conn.commit()
+            conn.close()
+
+            # その後，ジャッジが終わり，残りの提出も見えるようになる
+            contest.num_created = contest.num_judged = None
+            assert actual_rows(database, contest.slug) != expected_rows(contest)
+            runs: List[Tuple[int, int, int, int]] = []
+            with SubmissionWriter(database) as writer:
+                for _ in range(2):
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        runs.append(reconcile_contest(writer, contest.slug, limiter))
+            assert actual_rows(database, contest.slug) == expected_rows(contest), 'rows differ from a full recrawl'
+        finally:
+            Endpoint.atcoder = atcoder
+
+        conn = sqlite3.connect(database)
+        recorded: List[Tuple[int, int, int, int, int, int, int]] = conn.execute(
+            'SELECT suspicious_rows, stale_pages, requests, rows_inserted, rows_updated, rows_missing, run_id '
+            'FROM reconcile_runs ORDER BY run_id').fetchall()
+        conn.close()
+
+    print(f'initial crawl: {crawl_requests} requests, {args.judging} WJ rows, {args.late} submissions missing')
+    for suspicious_rows, stale_pages, requests, inserted, updated, missing, run_id in recorded:
+        print(f'reconcile run {run_id}: suspicious_rows={suspicious_rows}, stale_pages={stale_pages}, '
+              f'requests={requests}, inserted={inserted}, updated={updated}, missing={missing}')
+    assert [run[0] for run in runs] == [row[2] for row in recorded]
+    print(f'full recrawl: {contest.num_pages} requests')
+
+    check_stale_pages(limiter)
+    print('stale pages are detected independently of the host time zone and cleared by one reconcile run')
+
+
+# $ cd crawler
+# $ python -m bench.reconcile
+if __name__ == '__main__':
+    main()
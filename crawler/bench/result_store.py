@@ -0,0 +1,65 @@
+# Author: iilj
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from lib.csv.AHCResultCSV import AHCScoresCSV
+from lib.csv.AHCResultStore import CSV_DIR, AHCResultStore
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='結果 CSV の DB への取り込みと，毎回 CSV をパースする方法の読み込み時間を比べる')
+    parser.add_argument('--csv-dir', default=str(CSV_DIR))
+    parser.add_argument('--repeat', type=int, default=5, help='読み込みを繰り返す回数')
+    args = parser.parse_args()
+
+    csv_dir: Path = Path(args.csv_dir)
+    contests: List[str] = sorted(path.stem[len('result_'):] for path in csv_dir.glob('result_*.csv'))
+
+    # 従来：使うたびに CSV をパースする
+    start: float = time.perf_counter()
+    for _ in range(args.repeat):
+        expected: Dict[str, AHCScoresCSV] = {
+            contest: AHCScoresCSV(str(csv_dir / f'result_{contest}.csv')) for contest in contests}
+    parse_sec: float = (time.perf_counter() - start) / args.repeat
+
+    with tempfile.TemporaryDirectory() as tmpdir, AHCResultStore.open(os.path.join(tmpdir, 'db.db')) as store:
+        start = time.perf_counter()
+        assert store.import_all(csv_dir) == contests
+        import_sec: float = time.perf_counter() - start
+        # 内容が変わっていなければ取り込み直さない
+        start = time.perf_counter()
+        assert store.import_all(csv_dir) == []
+        reimport_sec: float = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            actual: Dict[str, AHCScoresCSV] = {contest: store.get_scores(contest) for contest in contests}
+        query_sec: float = (time.perf_counter() - start) / args.repeat
+
+        rows: int = 0
+        for contest in contests:
+            assert list(actual[contest].entries) == list(expected[contest].entries), f'{contest}: order differs'
+            assert [vars(entry) for entry in actual[contest].entries.values()] == \
+                [vars(entry) for entry in expected[contest].entries.values()], f'{contest}: entries differ'
+            assert actual[contest].name2provisionalscore == expected[contest].name2provisionalscore
+            assert store.get_provisional_scores(contest) == expected[contest].name2provisionalscore
+            rows += len(expected[contest].entries)
+        # ユーザごとの引き方も，コンテストごとの結果と一致すること
+        name: str = next(iter(expected[contests[0]].entries))
+        assert {contest: vars(entry) for contest, entry in store.get_user_entries(name).items()} == {
+            contest: vars(expected[contest].entries[name]) for contest in contests if name in expected[contest].entries}
+
+    print(f'{len(contests)} contests ({rows} rows): parse csv {parse_sec * 1000:.1f}ms; '
+          f'first import {import_sec * 1000:.1f}ms, re-import (unchanged) {reimport_sec * 1000:.1f}ms, '
+          f'query all {query_sec * 1000:.1f}ms; entries identical')
+
+
+# $ cd crawler
+# $ python -m bench.result_store
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+# Author: iilj
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from sqlite3.dbapi2 import Connection, Cursor
+from typing import Dict, Iterable, Iterator, List, Set, Union
+
+from bench.streaming_export import insert_contest
+from export import (SUBMISSIONS_QUERY, get_last_submission_id_set, get_last_submission_ids, iter_submission_chunks,
+                    score_fix_ratio, write_json_array, write_json_frames)
+from lib.Migration import migrate
+from lib.SubmissionFrame import SubmissionFrame, iter_dicts, normalize_submissions
+
+SubmissionDict = Dict[str, Union[str, int, float]]
+
+MODES: List[str] = ['legacy', 'frame+dicts', 'frame+json']
+
+
+def legacy_iter_submissions(cur: Cursor, contest: str) -> Iterator[SubmissionDict]:
+    """列ごとの補正にする前の iter_submissions（1 行ずつ倍率で割る）"""
+    for row in cur.execute(SUBMISSIONS_QUERY, (contest,)):
+        user_name: str = row[3]
+        if user_name == 'wata_admin':
+            continue
+        yield {
+            'submission_id': row[0],
+            'task': row[1],
+            'time_unix': row[2],
+            'user_name': user_name,
+            'score': row[4] if row[6] == 1 else row[4] / row[6],
+            'status': row[5],
+        }
+
+
+def legacy_fix_score_ratio(data: Iterable[SubmissionDict], problems: Dict[str, float],
+                           last_submission_id_set: Set[int]) -> Iterator[SubmissionDict]:
+    """列ごとの補正にする前の fix_score_ratio"""
+    for d in data:
+        if d['submission_id'] in last_submission_id_set and d['task'] in problems:
+            assert isinstance(d['score'], (int, float))
+            d['score'] *= problems[str(d['task'])]
+        yield d
+
+
+def legacy_normalize(cur: Cursor, contest: str, task: str) -> Iterator[SubmissionDict]:
+    if contest in score_fix_ratio:
+        return legacy_fix_score_ratio(legacy_iter_submissions(cur, contest), score_fix_ratio[contest],
+                                      get_last_submission_id_set(cur, contest))
+    return (d for d in legacy_iter_submissions(cur, contest) if d['task'] == task)
+
+
+def frame_normalize(cur: Cursor, contest: str, task: str) -> Iterator[SubmissionFrame]:
+    if contest in score_fix_ratio:
+        last_submission_ids = get_last_submission_ids(cur, contest)
+        return normalize_submissions(iter_submission_chunks(cur, contest), problems=score_fix_ratio[contest],
+                                     last_submission_ids=last_submission_ids)
+    return normalize_submissions(iter_submission_chunks(cur, contest), task=task)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='提出一覧のスコア補正を，1 行ずつ行う場合と列ごとにまとめて行う場合で比べる')
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng: random.Random = random.Random(args.seed)
+    users: List[str] = [f'user{i:05d}' for i in range(args.users)]
+    # (コンテスト, 問題, 倍率)：係数と倍率で補正する経路と，問題で絞り込む経路
+    contests: Dict[str, List[str]] = {
+        'hokudai-hitachi2020': list(score_fix_ratio['hokudai-hitachi2020']),
+        'hokudai-hitachi2018': list(score_fix_ratio['hokudai-hitachi2018']),
+        'ahc002': ['ahc002_a', 'ahc002_b'],
+    }
+    magnifications: Dict[str, int] = {'hokudai-hitachi2020': 1000, 'hokudai-hitachi2018': 1, 'ahc002': 1}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        database: str = os.path.join(tmpdir, 'db.db')
+        conn: Connection = sqlite3.connect(database)
+        migrate(conn)
+        submission_id: int = 1
+        for contest, task_slugs in contests.items():
+            submission_id = insert_contest(conn, contest, task_slugs, users, args.rows, submission_id,
+                                           magnifications[contest], rng)
+        cur: Cursor = conn.cursor()
+        for contest, task_slugs in contests.items():
+            task: str = task_slugs[0]
+            outputs: Dict[str, bytes] = {}
+            paths: Dict[str, Path] = {name: Path(tmpdir) / f'{contest}.{name}.json' for name in MODES}
+            seconds: Dict[str, float] = {}
+            start: float = time.perf_counter()
+            count: int = sum(1 for _ in legacy_normalize(cur, contest, task))
+            seconds['legacy'] = time.perf_counter() - start
+            start = time.perf_counter()
+            assert sum(len(frame) for frame in frame_normalize(cur, contest, task)) == count
+            seconds['frame'] = time.perf_counter() - start
+            # 補正のあとに JSON に書き出すまで
+            start = time.perf_counter()
+            write_json_array(paths['legacy'], legacy_normalize(cur, contest, task))
+            seconds['legacy+json'] = time.perf_counter() - start
+            start = time.perf_counter()
+            write_json_array(paths['frame+dicts'], iter_dicts(frame_normalize(cur, contest, task)))
+            seconds['frame+dicts'] = time.perf_counter() - start
+            start = time.perf_counter()
+            write_json_frames(paths['frame+json'], frame_normalize(cur, contest, task))
+            seconds['frame+json'] = time.perf_counter() - start
+            for name in MODES:
+                outputs[name] = paths[name].read_bytes()
+            assert outputs['frame+dicts'] == outputs['legacy'] and outputs['frame+json'] == outputs['legacy'], \
+                f'{contest}: output differs'
+            print(f'{contest} ({args.rows} rows, {count} exported): normalize legacy {seconds["legacy"]:.2f}s, '
+                  f'frame {seconds["frame"]:.2f}s; with json legacy {count / seconds["legacy+json"]:.0f} rows/s, '
+                  f'frame+dicts {count / seconds["frame+dicts"]:.0f} rows/s, '
+                  f'frame+json {count / seconds["frame+json"]:.0f} rows/s')
+        conn.close()
+
+
+# $ cd crawler
+# $ python -m bench.score_normalization
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+# Author: iilj
+
+import argparse
+import json
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from export import PUBLIC_DIR
+from lib.StandingsCheckpoints import StandingsCheckpoints, StandingsCheckpointWriter, compute_standings
+from lib.ColumnarSubmissions import SubmissionDict
+
+
+def generate_submissions(rng: random.Random, num_submissions: int, num_users: int,
+                         task_slugs: List[str]) -> List[SubmissionDict]:
+    """10 日間のコンテストを模した合成提出．時刻が提出 ID 順に前後するものや CE も混ぜる．"""
+    data: List[SubmissionDict] = []
+    start: int = 1600000000
+    for k in range(num_submissions):
+        time_unix: int = start + 864000 * k // num_submissions
+        if rng.random() < 0.001:
+            time_unix -= rng.randrange(1, 120)
+        data.append({
+            'submission_id': k + 1,
+            'task': rng.choice(task_slugs),
+            'time_unix': time_unix,
+            'user_name': f'user{int(rng.paretovariate(1.2) * 7) % num_users:05d}',
+            'score': rng.choice([0, rng.randrange(10 ** 6), rng.randrange(10 ** 9)]),
+            'status': rng.choice(['AC', 'AC', 'AC', 'WA', 'TLE', 'RE', 'CE']),
+        })
+    return data
+
+
+def check(name: str, data: List[SubmissionDict], task_slugs: List[str], every: int, queries: int,
+          verify: int, workdir: Path, rng: random.Random) -> None:
+    directory: Path = workdir / name
+    writer: StandingsCheckpointWriter = StandingsCheckpointWriter(directory, task_slugs, every)
+    start: float = time.perf_counter()
+    for d in writer.tee(data):
+        pass
+    writer.close()
+    build_sec: float = time.perf_counter() - start
+    checkpoint_bytes: int = sum(path.stat().st_size for path in directory.glob('*.json'))
+
+    checkpoints: StandingsCheckpoints = StandingsCheckpoints(directory, data)
+    assert checkpoints.task_slugs[:len(task_slugs)] == task_slugs
+    assert set(checkpoints.task_slugs) == set(task_slugs) | {str(d['task']) for d in data}, f'{name}: tasks differ'
+    times: List[int] = [int(d['time_unix']) for d in data]
+    lo, hi = min(times) - 1, max(times) + 1
+    targets: List[int] = [rng.randint(lo, hi) for _ in range(queries)]
+    # 提出と同時刻や，時刻が前後している付近も必ず含める
+    targets += [int(data[rng.randrange(len(data))]['time_unix']) for _ in range(queries // 4)]
+    targets += [b for a, b in zip(times, times[1:]) if b < a][:queries // 4]
+
+    lookup_secs: List[float] = []
+    for t in targets:
+        start = time.perf_counter()
+        checkpoints.get_standings(t)
+        lookup_secs.append(time.perf_counter() - start)
+    full_secs: List[float] = []
+    for t in targets[:verify]:
+        start = time.perf_counter()
+        # 問題一覧にない問題への提出があれば，その問題も列に加わる
+        expected = compute_standings(data, checkpoints.task_slugs, t)
+        full_secs.append(time.perf_counter() - start)
+        actual = checkpoints.get_standings(t)
+        assert [vars(entry) for entry in actual] == [vars(entry) for entry in expected], f'{name}: t={t} differs'
+
+    lookup_secs.sort()
+    print(f'{name}: {len(data)} submissions, {len(targets)} lookups ({len(full_secs)} verified), '
+          f'build {build_sec:.2f}s, {len(checkpoints.positions) - 1} checkpoints {checkpoint_bytes / 2 ** 20:.1f} MiB, '
+          f'lookup mean {statistics.mean(lookup_secs) * 1000:.1f} ms '
+          f'p95 {lookup_secs[int(len(lookup_secs) * 0.95)] * 1000:.1f} ms, '
+          f'full replay mean {statistics.mean(full_secs) * 1000:.1f} ms')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='チェックポイントからの任意時刻の順位表を，全提出からの集計と比べる')
+    parser.add_argument('--contests', nargs='*', default=['ahc001', 'ahc039', 'intro-heuristics'],
+                        help='public/submissions にあるコンテストも比べる')
+    parser.add_argument('--synthetic-submissions', type=int, default=300000)
+    parser.add_argument('--synthetic-users', type=int, default=2000)
+    parser.add_argument('--every', type=int, default=1000, help='チェックポイントの間隔（提出数）')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--verify', type=int, default=50, help='全提出からの集計と照合する問い合わせ数')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng: random.Random = random.Random(args.seed)
+    workdir: Path = Path(tempfile.mkdtemp())
+    try:
+        fixtures: List[Tuple[str, List[SubmissionDict], List[str]]] = []
+        for contest in args.contests:
+            submissions_path: Path = PUBLIC_DIR / 'submissions' / f'{contest}.json'
+            tasks_path: Path = PUBLIC_DIR / 'tasks' / f'{contest}.json'
+            if not submissions_path.exists() or not tasks_path.exists():
+                print(f'{contest}: not found in {PUBLIC_DIR}, skipped')
+                continue
+            with open(submissions_path, encoding='utf-8') as f:
+                data: List[SubmissionDict] = json.load(f)
+            with open(tasks_path, encoding='utf-8') as f:
+                tasks: List[Dict[str, str]] = json.load(f)
+            fixtures.append((contest, data, [task['task_slug'] for task in tasks]))
+        if args.synthetic_submissions > 0:
+            task_slugs: List[str] = ['synth_a', 'synth_b', 'synth_c']
+            fixtures.append(('synthetic', generate_submissions(
+                rng, args.synthetic_submissions, args.synthetic_users, task_slugs), task_slugs))
+            # 問題一覧から漏れた問題への提出が途中から現れても，その問題の列を足して集計する
+            head: List[SubmissionDict] = fixtures[-1][1][:args.synthetic_submissions // 10]
+            fixtures.append(('synthetic (missing task)', [
+                dict(d, task=task_slugs[0]) if d['task'] == task_slugs[2] and k < len(head) // 2 else d
+                for k, d in enumerate(head)], task_slugs[:2]))
+        for name, data, task_slugs in fixtures:
+            check(name, data, task_slugs, args.every, args.queries, args.verify, workdir, rng)
+    finally:
+        shutil.rmtree(workdir)
+
+
+# $ cd crawler
+# $ python -m bench.standings_checkpoints
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+# Author: iilj
+
+import argparse
+import json
+import os
+import random
+import resource
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from sqlite3.dbapi2 import Connection, Cursor
+from typing import Dict, List, Set, Tuple, Union
+
+from export import SUBMISSIONS_QUERY, export_submissions, score_fix_ratio
+from lib.csv.AHCResultCSV import AHCScoresCSV
+from lib.csv.AHCResultStore import AHCResultStore
+from lib.Migration import migrate
+
+
+def legacy_fix_data(mapper: AHCScoresCSV, data: List[Dict[str, Union[str, int, float]]],
+                    last_submission_id_set: Set[int]) -> List[Dict[str, Union[str, int, float]]]:
+    """ストリーミング化する前の AHCScoresCSV.fix_data"""
+    user_score_list_map: Dict[str, List[int]] = {}
+    for d in data:
+        assert isinstance(d['score'], int)
+        assert isinstance(d['user_name'], str)
+        if d['user_name'] in user_score_list_map:
+            ma: int = max(d['score'], user_score_list_map[d['user_name']][-1])
+            user_score_list_map[d['user_name']].append(ma)
+        else:
+            user_score_list_map[d['user_name']] = [d['score']]
+    for d in data:
+        if not (d['submission_id'] in last_submission_id_set):
+            continue
+        assert isinstance(d['user_name'], str)
+        if not (d['user_name'] in mapper.name2provisionalscore):
+            continue
+        provisional_score: int = mapper.name2provisionalscore[d['user_name']]
+        if len(user_score_list_map[d['user_name']]) == 1 or provisional_score > user_score_list_map[d['user_name']][-2]:
+            d['score'] = provisional_score
+        else:
+            d['score'] = -1
+    return data
+
+
+def legacy_export_submissions(cur: Cursor, contest: str, tasks: List[Dict[str, Union[str, int, float]]],
+                              public_dir: Path) -> None:
+    """ストリーミング化する前の export_submissions（全提出をリストにしてから json.dump する）"""
+    data: List[Dict[str, Union[str, int, float]]] = []
+    user_last_submission_id_map: Dict[Tuple[str, str], int] = {}
+    for row in cur.execute(SUBMISSIONS_QUERY, (contest,)):
+        submission_id: int = row[0]
+        task: str = row[1]
+        user_name: str = row[3]
+        if user_name == 'wata_admin':
+            continue
+        data.append({
+            'submission_id': submission_id,
+            'task': task,
+            'time_unix': row[2],
+            'user_name': user_name,
+            'score': row[4] if row[6] == 1 else row[4] / row[6],
+            'status': row[5],
+        })
+        key: Tuple[str, str] = (user_name, task)
+        if not (key in user_last_submission_id_map) or submission_id > user_last_submission_id_map[key]:
+            user_last_submission_id_map[key] = submission_id
+    last_submission_id_set: Set[int] = set(user_last_submission_id_map.values())
+    if contest == 'ahc001':
+        data = legacy_fix_data(AHCScoresCSV('./lib/csv/result_ahc001.csv'), data, last_submission_id_set)
+    elif contest in score_fix_ratio:
+        problems: Dict[str, float] = score_fix_ratio[contest]
+        for d in data:
+            if d['submission_id'] in last_submission_id_set and d['task'] in problems:
+                assert isinstance(d['task'], str)
+                if isinstance(d['score'], int) or isinstance(d['score'], float):
+                    d['score'] *= problems[d['task']]
+    elif contest.startswith('ahc'):
+        data = list(filter(lambda d: d['task'] == tasks[0]['task_slug'], data))
+    with open(public_dir / 'submissions' / f'{contest}.json', mode='wt', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'))
+
+
+def insert_contest(conn: Connection, slug: str, task_slugs: List[str], users: List[str], num_rows: int,
+                   first_submission_id: int, magnification: int, rng: random.Random) -> int:
+    """合成のコンテストと提出を入れて，次の提出 ID を返す．"""
+    start: int = 1600000000
+    end: int = start + 691200
+    conn.execute('INSERT INTO contests VALUES (?,?,?,?,?,?,?)', (slug, slug, start, end, 1, 0, 1))
+    conn.executemany('INSERT INTO tasks VALUES (?,?,?,?,?,?)',
+                     [(slug, task_slug, chr(ord('A') + i), task_slug, 2.0, 1024)
+                      for i, task_slug in enumerate(task_slugs)])
+    rows: List[Tuple[object, ...]] = []
+    for k in range(num_rows):
+        # 1 割はコンテスト終了後の提出
+        time_unix: int = start + int((end - start) * 1.1 * k / num_rows)
+        user_name: str = 'wata_admin' if k % 997 == 0 else rng.choice(users)
+        rows.append((first_submission_id + k, slug, rng.choice(task_slugs), k // 20 + 1, time_unix, user_name,
+                     'C++', 4003, rng.randrange(10 ** 11), 1000, 'AC', 100, 1000, magnification))
+    conn.executemany('INSERT INTO submissions VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)', rows)
+    conn.commit()
+    return first_submission_id + num_rows
+
+
+def get_peak_rss_kib() -> int:
+    """このプロセスのピーク RSS [KiB] を返す．
+
+    ru_maxrss は exec をまたいで親プロセスの値を引き継ぐので，Linux では VmHWM を読む．
+    """
+    try:
+        with open('/proc/self/status', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_export(streaming: bool, database: str, contest: str, public_dir: Path) -> Tuple[float, int]:
+    """新しいプロセスで 1 コンテスト分をエクスポートし，(秒数, 増えたピーク RSS [KiB]) を返す．"""
+    conn: Connection = sqlite3.connect(database)
+    cur: Cursor = conn.cursor()
+    tasks: List[Dict[str, Union[str, int, float]]] = [
+        {'task_slug': row[0]} for row in cur.execute(
+            'SELECT task_slug FROM tasks WHERE contest_slug = ? ORDER BY label ASC', (contest,))]
+    rss_before: int = get_peak_rss_kib()
+    start: float = time.perf_counter()
+    if streaming:
+        export_submissions(cur, contest, tasks, public_dir)
+    else:
+        legacy_export_submissions(cur, contest, tasks, public_dir)
+    elapsed: float = time.perf_counter() - start
+    conn.close()
+    return elapsed, get_peak_rss_kib() - rss_before
+
+
+def measure(streaming: bool, database: str, contest: str, public_dir: Path) -> Tuple[float, int]:
+    # ピーク RSS を測るので，毎回まっさらなプロセスで動かす
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+        return executor.submit(run_export, streaming, database, contest, public_dir).result()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='提出一覧エクスポートのピークメモリを提出数ごとに比べる')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 200000, 400000, 800000])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng: random.Random = random.Random(args.seed)
+    ahc001_users: List[str] = list(AHCScoresCSV('./lib/csv/result_ahc001.csv').entries.keys())
+    synth_users: List[str] = [f'user{i:05d}' for i in range(args.users)]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        database: str = os.path.join(tmpdir, 'db.db')
+        conn: Connection = sqlite3.connect(database)
+        migrate(conn)
+        AHCResultStore(conn).import_all()
+        submission_id: int = 1
+        # スコア補正のある各経路で，新旧の出力が一致することを確かめる
+        parity_contests: List[str] = ['ahc001', 'hokudai-hitachi2020', 'ahc002']
+        submission_id = insert_contest(conn, 'ahc001', ['ahc001_a'], ahc001_users, 20000, submission_id, 1, rng)
+        submission_id = insert_contest(conn, 'hokudai-hitachi2020', list(score_fix_ratio['hokudai-hitachi2020']),
+                                       synth_users, 20000, submission_id, 1000, rng)
+        submission_id = insert_contest(conn, 'ahc002', ['ahc002_a', 'ahc002_b'], synth_users, 20000,
+                                       submission_id, 1, rng)
+        for size in args.sizes:
+            slug: str = f'synth{size}'
+            parity_contests.append(slug)
+            submission_id = insert_contest(conn, slug, [f'{slug}_a'], synth_users, size, submission_id, 1, rng)
+        conn.close()
+
+        dirs: Dict[bool, Path] = {}
+        for streaming in (False, True):
+            dirs[streaming] = Path(tmpdir) / ('streaming' if streaming else 'legacy')
+            (dirs[streaming] / 'submissions').mkdir(parents=True)
+        for contest in parity_contests:
+            results: Dict[bool, Tuple[float, int]] = {
+                streaming: measure(streaming, database, contest, dirs[streaming]) for streaming in (False, True)}
+            legacy_bytes: bytes = (dirs[False] / 'submissions' / f'{contest}.json').read_bytes()
+            streaming_bytes: bytes = (dirs[True] / 'submissions' / f'{contest}.json').read_bytes()
+            assert legacy_bytes == streaming_bytes, f'{contest}: output differs'
+            print(f'{contest}: {len(legacy_bytes) / 2 ** 20:.1f} MiB, '
+                  f'legacy={results[False][0]:.2f}s/+{results[False][1] / 1024:.1f} MiB, '
+                  f'streaming={results[True][0]:.2f}s/+{results[True][1] / 1024:.1f} MiB')
+
+
+# $ cd crawler
+# $ python -m bench.streaming_export
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+# Author: iilj
+
+import argparse
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, List, Tuple
+
+from bench.streaming_export import get_peak_rss_kib
+from lib.PageArchive import PageArchive
+from lib.ParserBackend import JST, ParserBackend
+from lib.SubmissionListPage import SubmissionListPage
+from lib.SubmissionListPageRequestResult import SubmissionListPageRequestResult
+from lib.SyntheticAtCoder import SyntheticContest
+
+MODES: List[str] = ['legacy', 'submissions', 'insert_data']
+
+
+class LegacySubmission:
+    """変更前の SubmissionListPage.Submission と同じ形の提出．
+
+    __dict__ に datetime を含む 14 属性を持ち，文字列は行ごとに別のオブジェクトになる．
+    """
+
+    def __init__(self, submission: SubmissionListPage.Submission) -> None:
+        self.time = submission.time
+        for name in SubmissionListPage.Submission.__slots__:
+            value: Any = getattr(submission, name)
+            # パースのたびに作られていた文字列を再現するため，intern されたものを複製する
+            setattr(self, name, value.encode('utf-8').decode('utf-8') if isinstance(value, str) else value)
+
+
+def parse_all(archive_root: str, contest: str, mode: str) -> Tuple[int, float, int]:
+    """アーカイブ済みの全ページをパースして，結果をすべてメモリに持つ．
+
+    Returns:
+        Tuple[int, float, int]: 行数，秒数，増えたピーク RSS [KiB]
+    """
+    ParserBackend.default = 'lxml'
+    archive: PageArchive = PageArchive(Path(archive_root))
+    rss_before: int = get_peak_rss_kib()
+    start: float = time.perf_counter()
+    records: List[Any] = []
+    for pagenum, _, sha256 in archive.latest_pages(contest):
+        result = SubmissionListPageRequestResult.create_from_html(contest, pagenum, archive.get(sha256))
+        if mode == 'insert_data':
+            records.extend(result.generate_insert_data())
+        else:
+            assert result.submission_list_page is not None
+            submissions: List[SubmissionListPage.Submission] = result.submission_list_page.submissions
+            records.extend(submissions if mode == 'submissions' else map(LegacySubmission, submissions))
+    elapsed: float = time.perf_counter() - start
+    archive.close()
+    return len(records), elapsed, get_peak_rss_kib() - rss_before
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='保存済みのページを全件パースしてメモリに持つときのピークメモリを比べる')
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=5000)
+    args = parser.parse_args()
+
+    contest: SyntheticContest = SyntheticContest(1, num_submissions=args.rows, num_practice_submissions=0,
+                                                 num_users=args.users, num_tasks=2)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        start: float = time.perf_counter()
+        archive: PageArchive = PageArchive(Path(tmpdir))
+        for pagenum in range(1, contest.num_pages + 1):
+            archive.put(contest.slug, pagenum, contest.submission_list_html(pagenum))
+        archive.close()
+        print(f'archived {contest.num_pages} pages ({args.rows} rows) in {time.perf_counter() - start:.1f}s')
+
+        # time プロパティが，旧実装と同じく文字列から直接作った datetime と一致すること
+        page: SubmissionListPage = SubmissionListPage(contest.submission_list_html(1), backend='lxml')
+        assert [submission.time for submission in page.submissions] == [
+            datetime.strptime(contest.submission_time(k).strftime('%Y-%m-%d %H:%M:%S'), '%Y-%m-%d %H:%M:%S')
+            .replace(tzinfo=JST)
+            for k in range(len(page.submissions))]
+
+        for mode in MODES:
+            # ピーク RSS を測るので，毎回まっさらなプロセスで動かす
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+                rows, elapsed, rss_kib = executor.submit(parse_all, tmpdir, contest.slug, mode).result()
+            assert rows == args.rows
+            print(f'{mode}: {elapsed:.1f}s, {rows / elapsed:.0f} rows/s, '
+                  f'+{rss_kib / 1024:.0f} MiB ({rss_kib * 1024 / rows:.0f} bytes/row)')
+
+
+# $ cd crawler
+# $ python -m bench.submission_memory
+if __name__ == '__main__':
+    main()
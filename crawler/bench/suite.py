@@ -0,0 +1,366 @@
+# Author: iilj
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from sqlite3.dbapi2 import Connection, Cursor
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from bench.streaming_export import get_peak_rss_kib
+from crawl import crawl
+from export import export_submissions
+from lib.AHCInnerRatingRequestResult import AHCInnerRatingRequestResult
+from lib.csv.AHCResultStore import AHCResultStore
+from lib.Endpoint import Endpoint
+from lib.Metrics import Metrics
+from lib.Migration import connect as migrate_connect
+from lib.ParserBackend import BACKEND_NAMES, ParserBackend
+from lib.RateLimiter import TokenBucketRateLimiter
+from lib.StubServer import StubServer
+from lib.SubmissionListPage import SubmissionListPage
+from lib.SubmissionListPageRequestResult import SubmissionListPageRequestResult
+from lib.SyntheticAtCoder import SyntheticContest
+from PerformanceExporter import trace_innter_perf
+
+# 結果ファイルの形式を変えたら上げる
+SUITE_FORMAT_VERSION: int = 1
+
+# 後のシナリオは前のシナリオがクロールした DB を使う
+SCENARIOS: List[str] = ['parse', 'crawl', 'export', 'perf']
+
+# シナリオごとに，レイテンシのパーセンタイルを表示する段階
+KEY_STAGES: Dict[str, str] = {
+    'parse': 'parse_page',
+    'crawl': 'http',
+    'export': 'export_contest',
+    'perf': 'perf_compute',
+}
+
+ScenarioResult = Dict[str, Any]
+
+
+def build_contests(params: Dict[str, Any]) -> List[SyntheticContest]:
+    """ahc001（暫定得点つきの結果 CSV で補正する経路）と，synth001 以降のコンテストを作る．"""
+    return [
+        SyntheticContest(i, num_submissions=params['submissions'], num_practice_submissions=params['submissions'] // 10,
+                         num_users=params['users'], num_tasks=params['tasks'], seed=params['seed'],
+                         slug='ahc001' if i == 0 else None)
+        for i in range(params['contests'])
+    ]
+
+
+def write_result_csvs(contests: List[SyntheticContest], csv_dir: Path) -> None:
+    csv_dir.mkdir(parents=True, exist_ok=True)
+    for contest in contests:
+        (csv_dir / f'result_{contest.slug}.csv').write_text(
+            contest.result_csv(provisional=contest.slug == 'ahc001'), encoding='utf-8')
+
+
+def start_metrics() -> Metrics:
+    """シナリオのプロセスで，各回の秒数を残す Metrics を空にして返す．"""
+    metrics: Metrics = Metrics.get_default()
+    metrics.keep_samples = True
+    metrics.drain()
+    return metrics
+
+
+def run_parse(workdir: Path, params: Dict[str, Any]) -> Tuple[float, Dict[str, float], int]:
+    """提出一覧ページを SubmissionListPage でパースする（HTML の生成は測らない）．"""
+    contests: List[SyntheticContest] = build_contests(params)
+    pages: List[str] = [contest.submission_list_html(pagenum)
+                        for contest in contests for pagenum in range(1, contest.num_pages + 1)]
+    metrics: Metrics = start_metrics()
+    rows: int = 0
+    start: float = time.perf_counter()
+    for html in pages:
+        with metrics.timer('parse_page'):
+            rows += len(SubmissionListPage(html, params['parser']).submissions)
+    elapsed: float = time.perf_counter() - start
+    return elapsed, {'pages_per_sec': len(pages) / elapsed, 'rows_per_sec': rows / elapsed}, rows
+
+
+def run_crawl(workdir: Path, params: Dict[str, Any]) -> Tuple[float, Dict[str, float], int]:
+    """スタブサーバに対して crawl を実行し，問題一覧と提出一覧を DB に書き込む．"""
+    contests: List[SyntheticContest] = build_contests(params)
+    database: str = str(workdir / 'crawl.db')
+    if os.path.exists(database):
+        os.remove(database)
+    migrate_connect(database).close()
+    ParserBackend.default = params['parser']
+    SubmissionListPageRequestResult.archive = None
+    with StubServer(contests, latency=params['latency']) as stub:
+        Endpoint.atcoder = stub.url
+        limiter: TokenBucketRateLimiter = TokenBucketRateLimiter(params['rps'], capacity=params['rps'])
+        metrics: Metrics = start_metrics()
+        start: float = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert crawl(database, limiter, params['workers']) == len(contests)
+        elapsed: float = time.perf_counter() - start
+        requests: int = stub.request_count
+    rows: int = int(metrics.counters.get('rows_written', 0))
+    return elapsed, {'requests_per_sec': requests / elapsed, 'rows_per_sec': rows / elapsed}, rows
+
+
+def run_export(workdir: Path, params: Dict[str, Any]) -> Tuple[float, Dict[str, float], int]:
+    """結果 CSV を取り込んでから，クロールした DB の各コンテストを export_submissions で書き出す．"""
+    public_dir: Path = workdir / 'public'
+    shutil.rmtree(public_dir, ignore_errors=True)
+    (public_dir / 'submissions').mkdir(parents=True)
+    database: str = str(workdir / 'export.db')
+    shutil.copyfile(workdir / 'crawl.db', database)
+    conn: Connection = migrate_connect(database)
+    cur: Cursor = conn.cursor()
+    slugs: List[str] = [row[0] for row in cur.execute('SELECT contest_slug FROM contests ORDER BY contest_slug')]
+    metrics: Metrics = start_metrics()
+    start: float = time.perf_counter()
+    with metrics.timer('import_results'):
+        AHCResultStore(conn).import_all(workdir / 'csv')
+    for slug in slugs:
+        tasks: List[Dict[str, Union[str, int, float]]] = [
+            {'task_slug': row[0]} for row in cur.execute(
+                'SELECT task_slug FROM tasks WHERE contest_slug = ? ORDER BY label ASC', (slug,))]
+        with metrics.timer('export_contest'):
+            export_submissions(cur, slug, tasks, public_dir)
+    elapsed: float = time.perf_counter() - start
+    conn.close()
+    rows: int = int(metrics.counters.get('rows_exported', 0))
+    mib: float = metrics.counters.get('bytes_written', 0) / 2 ** 20
+    return elapsed, {'rows_per_sec': rows / elapsed, 'mib_per_sec': mib / elapsed}, rows
+
+
+def run_perf(workdir: Path, params: Dict[str, Any]) -> Tuple[float, Dict[str, float], int]:
+    """スタブの ac-predictor から aperfs を取得して，クロールした DB の全コンテストの内部パフォーマンスを計算する．"""
+    contests: List[SyntheticContest] = build_contests(params)
+    perfs_dir: Path = workdir / 'perfs'
+    shutil.rmtree(perfs_dir, ignore_errors=True)
+    perfs_dir.mkdir()
+    database: str = str(workdir / 'perf.db')
+    shutil.copyfile(workdir / 'crawl.db', database)
+    AHCInnerRatingRequestResult.cache_dir = None
+    aperfs: Dict[str, Dict[str, int]] = {contest.slug: contest.aperfs() for contest in contests}
+    with StubServer([], latency=params['latency'], aperfs=aperfs) as stub:
+        Endpoint.ac_predictor = stub.url
+        metrics: Metrics = start_metrics()
+        start: float = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            trace_innter_perf(database, jobs=1, perfs_dir=perfs_dir)
+        elapsed: float = time.perf_counter() - start
+    participants: int = int(metrics.counters.get('participants', 0))
+    return elapsed, {'contests_per_sec': len(contests) / elapsed, 'participants_per_sec': participants / elapsed}, \
+        participants
+
+
+SCENARIO_FUNCTIONS: Dict[str, Callable[[Path, Dict[str, Any]], Tuple[float, Dict[str, float], int]]] = {
+    'parse': run_parse,
+    'crawl': run_crawl,
+    'export': run_export,
+    'perf': run_perf,
+}
+
+
+def run_scenario(name: str, workdir: str, params: Dict[str, Any]) -> ScenarioResult:
+    """新しいプロセスでシナリオを 1 回実行する．経過時間には合成データの生成やコピーを含めない．"""
+    rss_before: int = get_peak_rss_kib()
+    elapsed, throughput, items = SCENARIO_FUNCTIONS[name](Path(workdir), params)
+    report: Dict[str, Any] = Metrics.get_default().report()
+    return {
+        'elapsed_sec': elapsed,
+        'items': items,
+        'throughput': throughput,
+        'peak_rss_kib': get_peak_rss_kib(),
+        'peak_rss_delta_kib': get_peak_rss_kib() - rss_before,
+        'stages': report['stages'],
+        'counters': report['counters'],
+    }
+
+
+def get_git_revision() -> Tuple[Optional[str], Optional[bool]]:
+    """(HEAD のコミット, 作業ツリーに変更があるか) を返す．git がなければ (None, None)．"""
+    try:
+        commit: str = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, check=True,
+                                     text=True).stdout.strip()
+        status: str = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True,
+                                     check=True, text=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, status != ''
+
+
+def run_suite(params: Dict[str, Any], scenarios: List[str], repeat: int) -> Dict[str, Any]:
+    """シナリオを repeat 回ずつ実行し，経過時間が中央値の回の結果を返す．"""
+    commit, dirty = get_git_revision()
+    results: Dict[str, Any] = {
+        'version': SUITE_FORMAT_VERSION,
+        'commit': commit,
+        'dirty': dirty,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'started_at': int(time.time()),
+        'params': params,
+        'scenarios': {},
+    }
+    with tempfile.TemporaryDirectory() as tmpdir:
+        write_result_csvs(build_contests(params), Path(tmpdir) / 'csv')
+        # export と perf はクロールした DB を使う
+        for name in [name for name in SCENARIOS if name in scenarios or (name == 'crawl' and scenarios != ['parse'])]:
+            runs: List[ScenarioResult] = []
+            for _ in range(repeat if name in scenarios else 1):
+                # ピークメモリをシナリオごとに測るため，毎回新しいプロセスで実行する
+                with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+                    runs.append(executor.submit(run_scenario, name, tmpdir, params).result())
+            if name not in scenarios:
+                continue
+            runs.sort(key=lambda run: run['elapsed_sec'])
+            result: ScenarioResult = runs[len(runs) // 2]
+            result['elapsed_sec_runs'] = [run['elapsed_sec'] for run in runs]
+            results['scenarios'][name] = result
+            print_scenario(name, result)
+    return results
+
+
+def print_scenario(name: str, result: ScenarioResult) -> None:
+    stage: Dict[str, Any] = result['stages'].get(KEY_STAGES[name], {})
+    throughput: str = ', '.join(f'{value:.1f} {unit.replace("_per_sec", "")}/s'
+                                for unit, value in result['throughput'].items())
+    latency: str = ', '.join(f'p{q} {stage[f"p{q}_sec"] * 1000:.2f}ms' for q in (50, 90, 99) if f'p{q}_sec' in stage)
+    print(f'{name:>6}: {result["elapsed_sec"]:.2f}s, {throughput}; {KEY_STAGES[name]} {latency}; '
+          f'peak rss +{result["peak_rss_delta_kib"] / 1024:.1f}MiB ({result["peak_rss_kib"] / 1024:.1f}MiB)')
+
+
+def compare_metrics(base: ScenarioResult, head: ScenarioResult, name: str) -> List[Tuple[str, float, float, bool]]:
+    """比べる値の一覧を (名前, base, head, 大きいほどよいか) で返す．"""
+    metrics: List[Tuple[str, float, float, bool]] = [('elapsed_sec', base['elapsed_sec'], head['elapsed_sec'], False)]
+    for unit in base['throughput']:
+        if unit in head['throughput']:
+            metrics.append((unit, base['throughput'][unit], head['throughput'][unit], True))
+    stage: str = KEY_STAGES[name]
+    for q in (50, 99):
+        key: str = f'p{q}_sec'
+        if key in base['stages'].get(stage, {}) and key in head['stages'].get(stage, {}):
+            metrics.append((f'{stage}.{key}', base['stages'][stage][key], head['stages'][stage][key], False))
+    metrics.append(('peak_rss_delta_kib', base['peak_rss_delta_kib'], head['peak_rss_delta_kib'], False))
+    return metrics
+
+
+def compare(base: Dict[str, Any], head: Dict[str, Any], threshold: float) -> int:
+    """2 つの結果を比べて表示し，threshold を超えて悪化した値の数を返す．"""
+    def describe(results: Dict[str, Any]) -> str:
+        commit: str = (results['commit'] or 'unknown')[:12]
+        return commit + (' (dirty)' if results['dirty'] else '')
+
+    print(f'base {describe(base)} vs head {describe(head)}')
+    if base['params'] != head['params']:
+        print(f'warning: params differ: {base["params"]} vs {head["params"]}')
+    regressions: int = 0
+    for name in SCENARIOS:
+        if name not in base['scenarios'] or name not in head['scenarios']:
+            continue
+        for metric, base_value, head_value, higher_is_better in compare_metrics(
+                base['scenarios'][name], head['scenarios'][name], name):
+            change: float = (head_value - base_value) / base_value if base_value else 0.0
+            worse: bool = (change < -threshold) if higher_is_better else (change > threshold)
+            regressions += worse
+            print(f'{"!" if worse else " "} {name:>6} {metric:<24} {base_value:>14.4f} -> {head_value:>14.4f} '
+                  f'({change * 100:+.1f}%)')
+    return regressions
+
+
+def run_at_commit(revision: str, output: Path, suite_args: List[str]) -> None:
+    """revision を一時的な worktree にチェックアウトして，その版の suite を実行する．"""
+    toplevel: str = subprocess.run(['git', 'rev-parse', '--show-toplevel'], capture_output=True, check=True,
+                                   text=True).stdout.strip()
+    crawler_dir: Path = Path.cwd().resolve().relative_to(toplevel)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        worktree: Path = Path(tmpdir) / 'worktree'
+        subprocess.run(['git', 'worktree', 'add', '--detach', str(worktree), revision], check=True)
+        try:
+            if not (worktree / crawler_dir / 'bench' / 'suite.py').exists():
+                raise RuntimeError(f'{revision} has no bench/suite.py')
+            subprocess.run([sys.executable, '-m', 'bench.suite', '--output', str(output.resolve())] + suite_args,
+                           cwd=worktree / crawler_dir, check=True)
+        finally:
+            subprocess.run(['git', 'worktree', 'remove', '--force', str(worktree)], check=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='合成の AtCoder データで，パース・クロール・エクスポート・パフォーマンス計算を測る')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--contests', type=int, default=6)
+    parser.add_argument('--submissions', type=int, default=4000, help='1 コンテストあたりのコンテスト期間中の提出数')
+    parser.add_argument('--users', type=int, default=500, help='1 コンテストあたりのユーザ数')
+    parser.add_argument('--tasks', type=int, default=1)
+    parser.add_argument('--parser', choices=BACKEND_NAMES, default=ParserBackend.default, help='HTML パーサ')
+    parser.add_argument('--workers', type=int, default=2, help='同時にクロールするコンテスト数')
+    parser.add_argument('--rps', type=float, default=1000, help='クロールの 1 秒あたりのリクエスト数')
+    parser.add_argument('--latency', type=float, default=0.0, help='スタブの応答遅延（秒）')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help='シナリオごとの実行回数（経過時間が中央値の回を採る）')
+    parser.add_argument('--output', metavar='PATH', default=None, help='結果を JSON で書き出す（--commits なら書き出すディレクトリ）')
+    parser.add_argument('--compare', metavar=('BASE', 'HEAD'), nargs=2, default=None,
+                        help='実行せずに，書き出した 2 つの結果を比べる')
+    parser.add_argument('--commits', metavar=('BASE', 'HEAD'), nargs=2, default=None,
+                        help='2 つのコミットをそれぞれ worktree にチェックアウトして実行し，比べる')
+    parser.add_argument('--threshold', type=float, default=0.1, help='悪化とみなす変化率')
+    args = parser.parse_args()
+
+    if args.compare is not None:
+        base: Dict[str, Any] = json.loads(Path(args.compare[0]).read_text(encoding='utf-8'))
+        head: Dict[str, Any] = json.loads(Path(args.compare[1]).read_text(encoding='utf-8'))
+        sys.exit(1 if compare(base, head, args.threshold) > 0 else 0)
+
+    if args.commits is not None:
+        # --commits と --output 以外の引数はそのまま渡す
+        suite_args: List[str] = []
+        skip: int = 0
+        for arg in sys.argv[1:]:
+            if skip > 0:
+                skip -= 1
+            elif arg in ('--commits', '--output'):
+                skip = 2 if arg == '--commits' else 1
+            else:
+                suite_args.append(arg)
+        output_dir: Path = Path(args.output) if args.output is not None else Path(tempfile.mkdtemp())
+        output_dir.mkdir(parents=True, exist_ok=True)
+        paths: List[Path] = []
+        for side, revision in zip(('base', 'head'), args.commits):
+            path: Path = output_dir / f'suite-{side}-{revision.replace("/", "_").replace("~", "_")}.json'
+            run_at_commit(revision, path, suite_args)
+            paths.append(path)
+        print(f'results: {paths[0]}, {paths[1]}')
+        sys.exit(1 if compare(json.loads(paths[0].read_text(encoding='utf-8')),
+                              json.loads(paths[1].read_text(encoding='utf-8')), args.threshold) > 0 else 0)
+
+    params: Dict[str, Any] = {
+        'contests': args.contests,
+        'submissions': args.submissions,
+        'users': args.users,
+        'tasks': args.tasks,
+        'parser': args.parser,
+        'workers': args.workers,
+        'rps': args.rps,
+        'latency': args.latency,
+        'seed': args.seed,
+    }
+    results: Dict[str, Any] = run_suite(params, args.scenarios, args.repeat)
+    if args.output is not None:
+        Path(args.output).write_text(json.dumps(results, indent=2), encoding='utf-8')
+
+
+# $ cd crawler
+# $ python -m bench.suite --output before.json
+# $ python -m bench.suite --output after.json
+# $ python -m bench.suite --compare before.json after.json
+# $ python -m bench.suite --commits HEAD~1 HEAD --output results/
+if __name__ == '__main__':
+    main()
@@ -1,135 +1,463 @@
 # Author: iilj
 
-# import sys
-import time
+import argparse
+import heapq
+import os
 import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import timedelta
+from pathlib import Path
 from sqlite3.dbapi2 import Connection, Cursor
-from typing import List, Optional, Set, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 
+from lib.ContestBoundaryLocator import ContestBoundaryLocator
 from lib.ContestListPage import ContestListPage
 from lib.ContestListPageRequestResult import ContestListPageRequestResult
-from lib.SubmissionListPageRequestResult import DBInsertData, SubmissionListPageRequestResult
+from lib.CrawlPipeline import CrawlPipeline
+from lib.Endpoint import Endpoint
+from lib.Metrics import Metrics
+from lib.Migration import connect as migrate_connect
+from lib.PageArchive import PageArchive
+from lib.ParserBackend import BACKEND_NAMES, BackendName, ParserBackend
+from lib.RateLimiter import TokenBucketRateLimiter
+from lib.StubServer import StubServer
+from lib.SubmissionListPage import SubmissionListPage
+from lib.SubmissionListPageRequestResult import ROWS_PER_PAGE, DBInsertData, SubmissionListPageRequestResult
+from lib.SubmissionWriter import BUMP_REVISION_QUERY, SubmissionWriter
+from lib.SyntheticAtCoder import SyntheticContest
 from lib.TaskListPageRequestResult import TaskDBInsertData, TaskListPageRequestResult
 
 
-def crawl_contest(conn: Connection, cur: Cursor, contest: ContestListPage.Contest) -> None:
+def crawl_contest(writer: SubmissionWriter, contest: ContestListPage.Contest,
+                  limiter: TokenBucketRateLimiter, locate: bool = False) -> None:
+    """コンテストの提出一覧をページ番号順にクロールする．
+
+    locate なら，先に ContestBoundaryLocator でコンテスト期間の提出を含むページの範囲を求め，その範囲だけを取得する
+    （探索で取得したページは取得し直さない）．
+    """
     slug: str = contest.contest_slug
     # 開始するページ番号の決定
-    cur.execute('SELECT MAX(pagenum) FROM submissions WHERE contest = ?', (slug,))
-    pagenum_max_result: Tuple[Optional[int]] = cur.fetchone()
-    pagenum_max: Optional[int] = pagenum_max_result[0]
+    pagenum_max: Optional[int] = writer.get_max_pagenum(slug)
 
     pagenum: int = 1
     if pagenum_max is not None:
         pagenum = pagenum_max + 1
+    locator: Optional[ContestBoundaryLocator] = None
+    last_pagenum: Optional[int] = None
+    if locate:
+        locator = ContestBoundaryLocator(slug, limiter)
+        bounds: Optional[Tuple[int, int]] = locator.locate(pagenum)
+        if bounds is not None:
+            pagenum, last_pagenum = bounds
+            print(f' -> [{slug}] Pages {pagenum}-{last_pagenum} of {locator.page_count} '
+                  f'({locator.requests} requests to locate)')
     # return
     while True:
         # ページ取得
-        result: SubmissionListPageRequestResult = SubmissionListPageRequestResult.create_from_request(
-            slug, pagenum)
+        result: SubmissionListPageRequestResult
+        if locator is not None:
+            result = locator.take(pagenum)
+        else:
+            limiter.acquire()
+            result = SubmissionListPageRequestResult.create_from_request(slug, pagenum)
         # print(result)
         # exit()
 
-        count_result: Tuple[Optional[int]]
-        exists_in_table: bool
         if result.is_closed:
-            print(f' -> Page {result.pagenum}: 404')
+            print(f' -> [{slug}] Page {result.pagenum}: 404')
 
             # コンテスト情報挿入
-            cur.execute('SELECT COUNT(*) FROM contests WHERE contest_slug = ?', (slug,))
-            count_result = cur.fetchone()
-            exists_in_table = (count_result[0] == 1)
-            if not exists_in_table:
-                cur.execute('INSERT INTO contests VALUES (?,?,?,?,?,?,?)',
-                            (slug, contest.contest_name, contest.time_unix,
-                             int((contest.time + timedelta(minutes=contest.duration_minutes)).timestamp()),
-                             1, 1, int(contest.rated)))
-            conn.commit()
+            writer.upsert_contest((slug, contest.contest_name, contest.time_unix,
+                                   int((contest.time + timedelta(minutes=contest.duration_minutes)).timestamp()),
+                                   1, 1, int(contest.rated)))
             break
         else:
             if len(result.submission_list_page.submissions) == 0:
-                print(f' -> Page {result.pagenum}: size={len(result.submission_list_page.submissions)}')
+                print(f' -> [{slug}] Page {result.pagenum}: size={len(result.submission_list_page.submissions)}')
             else:
-                print(f' -> Page {result.pagenum}: size={len(result.submission_list_page.submissions)}, '
+                print(f' -> [{slug}] Page {result.pagenum}: size={len(result.submission_list_page.submissions)}, '
                       f'min={result.submission_list_page.submissions[0].time}, max={result.submission_list_page.submissions[-1].time}')
 
             # コンテスト情報挿入
-            cur.execute('SELECT COUNT(*) FROM contests WHERE contest_slug = ?', (slug,))
-            count_result = cur.fetchone()
-            exists_in_table = (count_result[0] == 1)
-            if not exists_in_table:
-                cur.execute('INSERT INTO contests VALUES (?,?,?,?,?,?,?)',
-                            (slug, result.submission_list_page.contest_title,
-                             result.submission_list_page.contest_starttime_unix,
-                             result.submission_list_page.contest_endtime_unix, 0, 0, int(contest.rated)))
+            writer.upsert_contest((slug, result.submission_list_page.contest_title,
+                                   result.submission_list_page.contest_starttime_unix,
+                                   result.submission_list_page.contest_endtime_unix, 0, 0, int(contest.rated)))
 
         # 提出情報挿入
         seq_of_parameters: List[DBInsertData] = result.generate_insert_data()
-        try:
-            cur.executemany('INSERT INTO submissions VALUES (?,?,?,?,'
-                            '?,?,?,?,?,?,?,?,?,?)', seq_of_parameters)
-        except sqlite3.Error as e:
-            print(e)
+        if not writer.add_page(slug, pagenum, seq_of_parameters):
             break
-        conn.commit()
 
         # 最後のページなら抜ける
-        if result.is_last_page or len(result.submission_list_page.submissions) == 0:
+        if result.is_last_page or len(result.submission_list_page.submissions) == 0 or pagenum == last_pagenum:
             break
         pagenum += 1
-        time.sleep(3)
-    cur.execute('UPDATE contests SET crawl_completed = 1 WHERE contest_slug = ?', (slug,))
-    conn.commit()
+    writer.mark_completed(slug)
+    Metrics.get_default().add('contests_crawled')
 
 
-def crawl_task(conn: Connection, cur: Cursor, contest: ContestListPage.Contest) -> bool:
-    slug: str = contest.contest_slug
-    cur.execute('SELECT COUNT(*) FROM tasks WHERE contest_slug = ?', (slug,))
-    count_result = cur.fetchone()
-    exists_in_table = (count_result[0] > 0)
-    if exists_in_table:
-        print(f' -> There already exists in table')
+def follow_contest(writer: SubmissionWriter, slug: str, limiter: TokenBucketRateLimiter,
+                   rated: bool = True) -> bool:
+    """開催中のコンテストの提出一覧を新しい順に取得し，前回以降の差分だけを取り込む．
+
+    既知の提出 ID に行き当たったところで止める．ただしジャッジ待ち（WJ/WR）のまま保存されている提出があれば，
+    得点と状態を取り直すためにそのうち最も古いものまでは遡る．
+    ページ番号は提出のたびにずれるので使わず，提出 ID だけで差分を判定する．
+
+    Args:
+        writer (SubmissionWriter): 書き込み先
+        slug (str): コンテスト
+        limiter (TokenBucketRateLimiter): レートリミッタ
+        rated (bool): コンテスト情報を新しく挿入するときの rated
+
+    Returns:
+        bool: コンテストが終了しており，ジャッジ待ちの提出も残っていなければ True（crawl_completed にする）
+    """
+    judging_ids: List[int] = writer.get_judging_submission_ids(slug)
+    # この ID 以前の提出を含むページまで取得すれば十分
+    stop_id: Optional[int] = judging_ids[0] if len(judging_ids) > 0 else writer.get_max_submission_id(slug)
+    ended: bool = False
+    pagenum: int = 1
+    while True:
+        limiter.acquire()
+        result: SubmissionListPageRequestResult = SubmissionListPageRequestResult.create_from_request(
+            slug, pagenum, desc=True)
+        if result.is_closed or result.submission_list_page is None:
+            print(f' -> [{slug}] Page {result.pagenum} (desc): 404')
+            break
+        page: SubmissionListPage = result.submission_list_page
+        writer.upsert_contest((slug, page.contest_title, page.contest_starttime_unix,
+                               page.contest_endtime_unix, 0, 0, int(rated)))
+        if pagenum == 1:
+            ended = result.is_last_page or time.time() >= page.contest_endtime_unix
+        seq_of_parameters: List[DBInsertData] = result.generate_insert_data()
+        print(f' -> [{slug}] Page {result.pagenum} (desc): size={len(page.submissions)}, rows={len(seq_of_parameters)}')
+        writer.add_page(slug, 0, seq_of_parameters)
+        if len(page.submissions) == 0 or (
+                stop_id is not None and min(submission.submission_id for submission in page.submissions) <= stop_id):
+            break
+        pagenum += 1
+    writer.flush()
+    if ended and len(writer.get_judging_submission_ids(slug)) == 0:
+        writer.mark_completed(slug)
+        return True
+    return False
+
+
+def follow(database: str, slug: str, limiter: TokenBucketRateLimiter, interval: float,
+           rated: bool = True) -> None:
+    """コンテストが終わってジャッジ待ちの提出がなくなるまで，interval 秒ごとに差分を取り込む．"""
+    with SubmissionWriter(database) as writer:
+        crawl_task(writer, slug, limiter)
+        while True:
+            print(f'[FOLLOW {slug}]')
+            if follow_contest(writer, slug, limiter, rated) or interval <= 0:
+                break
+            with Metrics.get_default().timer('follow_sleep'):
+                time.sleep(interval)
+        print(f'[END {slug}]')
+
+
+def reconcile_contest(writer: SubmissionWriter, slug: str, limiter: TokenBucketRateLimiter,
+                      max_steps: int = 3) -> Tuple[int, int, int, int]:
+    """疑わしい行を含むページだけを取得し直して，変わった提出を書き込む．
+
+    疑わしい行は，WJ/WR/IE のまま保存されている提出と，コンテスト終了前に取得したページの提出である．
+    提出が見積もったページになければ（再ジャッジや非表示でページがずれたとき），
+    提出 ID の大小から前後のページを max_steps ページまで探す．
+    コンテスト終了前に取得したページが最後のページなら，その後ろのページも最後まで取得する．
+
+    Returns:
+        Tuple[int, int, int, int]: リクエスト数，挿入した行数，値が変わった行数，見つからなかった提出数
+    """
+    started_at: int = int(time.time())
+    suspicious: List[Tuple[int, int]] = writer.get_suspicious_submissions(slug)
+    stale_pages: List[int] = writer.get_stale_pages(slug)
+    pagenum_max: Optional[int] = writer.get_max_pagenum(slug)
+    follow_tail: bool = pagenum_max is not None and pagenum_max in stale_pages
+
+    # 提出 ID -> まだ探しているページ番号と，残りの探索ページ数
+    targets: Dict[int, Tuple[int, int]] = {submission_id: (pagenum, max_steps) for submission_id, pagenum in suspicious}
+    queue: List[int] = sorted(set(stale_pages) | {pagenum for pagenum, _ in targets.values()})
+    fetched: Set[int] = set()
+    requests: int = 0
+    inserted: int = 0
+    updated: int = 0
+    missing: int = 0
+    while len(queue) > 0:
+        pagenum: int = heapq.heappop(queue)
+        if pagenum < 1 or pagenum in fetched:
+            continue
+        fetched.add(pagenum)
+        limiter.acquire()
+        result: SubmissionListPageRequestResult = SubmissionListPageRequestResult.create_from_request(slug, pagenum)
+        requests += 1
+        if result.is_closed or result.submission_list_page is None:
+            print(f' -> [{slug}] Page {pagenum}: 404')
+            break
+        page: SubmissionListPage = result.submission_list_page
+        page_inserted, page_updated = writer.reconcile_page(slug, pagenum, result.generate_insert_data())
+        inserted += page_inserted
+        updated += page_updated
+        print(f' -> [{slug}] Page {pagenum}: size={len(page.submissions)}, '
+              f'inserted={page_inserted}, updated={page_updated}')
+
+        ids: List[int] = [submission.submission_id for submission in page.submissions]
+        for submission_id, (target_pagenum, steps) in list(targets.items()):
+            if submission_id in ids:
+                del targets[submission_id]
+            elif target_pagenum == pagenum:
+                # ページがずれていれば，提出 ID の大小から隣のページを探す
+                next_pagenum: int = 0
+                if len(ids) > 0 and submission_id < ids[0]:
+                    next_pagenum = pagenum - 1
+                elif len(ids) > 0 and submission_id > ids[-1]:
+                    next_pagenum = pagenum + 1
+                if next_pagenum == 0 or steps == 0 or next_pagenum in fetched:
+                    # 非表示になったなどで見つからない
+                    missing += 1
+                    del targets[submission_id]
+                else:
+                    targets[submission_id] = (next_pagenum, steps - 1)
+                    heapq.heappush(queue, next_pagenum)
+        if follow_tail and pagenum_max is not None and pagenum >= pagenum_max and not (
+                result.is_last_page or len(page.submissions) < ROWS_PER_PAGE):
+            heapq.heappush(queue, pagenum + 1)
+    missing += len(targets)
+    metrics: Metrics = Metrics.get_default()
+    metrics.add('reconcile_rows_inserted', inserted)
+    metrics.add('reconcile_rows_updated', updated)
+    metrics.add('reconcile_rows_missing', missing)
+    writer.record_reconcile_run(slug, started_at, len(suspicious), len(stale_pages), requests,
+                                inserted, updated, missing)
+    return requests, inserted, updated, missing
+
+
+def reconcile(database: str, limiter: TokenBucketRateLimiter, slugs: List[str]) -> None:
+    """指定したコンテスト（空なら再取得すべきものがあるすべてのコンテスト）を reconcile_contest する．"""
+    with SubmissionWriter(database) as writer:
+        for slug in slugs if len(slugs) > 0 else writer.get_reconcile_targets():
+            print(f'[RECONCILE {slug}]')
+            requests, inserted, updated, missing = reconcile_contest(writer, slug, limiter)
+            print(f'[END {slug}] requests={requests}, inserted={inserted}, updated={updated}, missing={missing}')
+
+
+def crawl_task(writer: SubmissionWriter, slug: str, limiter: TokenBucketRateLimiter) -> bool:
+    if writer.has_tasks(slug):
+        print(f' -> [{slug}] There already exists in table')
         return False
 
+    limiter.acquire()
     tlprr: TaskListPageRequestResult = TaskListPageRequestResult.create_from_request(slug)
     if tlprr.is_closed:
-        print(f' -> Task list: 404')
+        print(f' -> [{slug}] Task list: 404')
         return True
-    print(f' -> Task size: {len(tlprr.task_list_page.tasks)}')
+    print(f' -> [{slug}] Task size: {len(tlprr.task_list_page.tasks)}')
     seq_of_parameters: List[TaskDBInsertData] = tlprr.generate_insert_data()
-    cur.executemany('INSERT INTO tasks VALUES (?,?,?,'
-                    '?,?,?)', seq_of_parameters)
-    conn.commit()
+    writer.insert_tasks(seq_of_parameters)
     return True
 
 
-def crawl(conn: Connection, cur: Cursor) -> None:
+def crawl_one(database: str, contest: ContestListPage.Contest, limiter: TokenBucketRateLimiter,
+              page_window: int = 20, locate: bool = False) -> None:
+    """1 コンテスト分の問題一覧と提出一覧をクロールする．ワーカスレッドごとに DB 接続を開く．"""
+    with SubmissionWriter(database, page_window) as writer:
+        print(f'[START {contest.contest_slug}]')
+        crawl_task(writer, contest.contest_slug, limiter)
+        crawl_contest(writer, contest, limiter, locate)
+        print(f'[END {contest.contest_slug}]')
+
+
+def get_crawl_targets(database: str, limiter: TokenBucketRateLimiter) -> List[ContestListPage.Contest]:
+    """コンテスト一覧を取得し，未完了のコンテストを返す．"""
+    limiter.acquire()
     clprr: ContestListPageRequestResult = ContestListPageRequestResult.create_from_request()
     print(clprr)
     # slugs: List[str] = [contest.contest_slug for contest in clprr.contest_list_page.contests]
+    conn: Connection = migrate_connect(database)
     slugs_crawled: Set[str] = set([row[0]
-                                   for row in cur.execute('SELECT contest_slug FROM contests WHERE crawl_completed = 1')])
+                                   for row in conn.execute('SELECT contest_slug FROM contests WHERE crawl_completed = 1')])
+    conn.close()
 
-    for contest in clprr.contest_list_page.contests:
-        if contest.contest_slug in slugs_crawled:
-            continue
-        print(f'[START {contest.contest_slug}]')
-        if crawl_task(conn, cur, contest):
-            time.sleep(3)
-        crawl_contest(conn, cur, contest)
-        print(f'[END {contest.contest_slug}]')
-        time.sleep(3)
+    return [contest for contest in clprr.contest_list_page.contests if contest.contest_slug not in slugs_crawled]
 
 
-def main() -> None:
-    database: str = 'db.db'
-    conn: Connection = sqlite3.connect(database)
+def crawl(database: str, limiter: TokenBucketRateLimiter, workers: int = 1, page_window: int = 20,
+          locate: bool = False) -> int:
+    """未完了のコンテストを，共有のレートリミッタのもとで workers 並列にクロールする．
+
+    locate なら，各コンテストのコンテスト期間の提出を含むページの範囲を先に求めてから，その範囲だけを取得する．
+
+    Returns:
+        int: クロールしたコンテスト数
+    """
+    targets: List[ContestListPage.Contest] = get_crawl_targets(database, limiter)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # 例外をワーカから呼び出し元に伝播させる
+        for _ in executor.map(lambda contest: crawl_one(database, contest, limiter, page_window, locate),
+                                  targets):
+            pass
+    return len(targets)
+
+
+def crawl_pipelined(database: str, limiter: TokenBucketRateLimiter, fetchers: int = 1, parsers: int = 2,
+                    queue_size: int = 4, page_window: int = 20, locate: bool = False) -> int:
+    """未完了のコンテストを，取得・パース・書き込みを並行に行うパイプラインでクロールする．
+
+    locate なら，各コンテストのコンテスト期間の提出を含むページの範囲を先に求め，その範囲だけを投機なしに取得する．
+
+    Returns:
+        int: クロールしたコンテスト数
+    """
+    targets: List[ContestListPage.Contest] = get_crawl_targets(database, limiter)
+    with SubmissionWriter(database, page_window) as writer:
+        for contest in targets:
+            crawl_task(writer, contest.contest_slug, limiter)
+        CrawlPipeline(writer, limiter, fetchers, parsers, queue_size, locate=locate).run(targets)
+    return len(targets)
+
+
+def reparse_page(task: Tuple[str, int, str, BackendName]) -> List[DBInsertData]:
+    """アーカイブ済みのページ 1 つをパースして挿入データを返す．プロセスプールのワーカで実行する．"""
+    contest, pagenum, object_path, backend = task
+    ParserBackend.default = backend
+    html: str = PageArchive.read_object(Path(object_path))
+    return SubmissionListPageRequestResult.create_from_html(contest, pagenum, html).generate_insert_data()
+
+
+def reparse(database: str, archive: PageArchive, jobs: Optional[int] = None) -> None:
+    """ネットワークにアクセスせず，アーカイブ済みのページから submissions テーブルを作り直す．
+
+    アーカイブにあるページの行だけを削除して入れ直す．アーカイブ導入前にクロールしたページや，
+    --follow で書き込んだ pagenum = 0 の行はアーカイブにないので，そのまま残す．
+    各ページは最後に取得したものを使い，パースはプロセスプールで並列に行う．
+    """
+    metrics: Metrics = Metrics.get_default()
+    conn: Connection = migrate_connect(database)
     cur: Cursor = conn.cursor()
-    crawl(conn, cur)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for contest in archive.contests():
+            tasks: List[Tuple[str, int, str, BackendName]] = [
+                (contest, pagenum, str(archive.object_path(sha256)), ParserBackend.default)
+                for pagenum, _, sha256 in archive.latest_pages(contest)]
+            cur.executemany('DELETE FROM submissions WHERE contest = ? AND pagenum = ?',
+                            [(contest, pagenum) for _, pagenum, _, _ in tasks])
+            rows: int = 0
+            with metrics.timer('reparse'):
+                # map は入力順に結果を返すので，ページ番号順に挿入される
+                for seq_of_parameters in executor.map(reparse_page, tasks, chunksize=8):
+                    # ページのずれで同じ提出が複数ページに現れた場合は，後のページを採用する
+                    cur.executemany('INSERT OR REPLACE INTO submissions VALUES (?,?,?,?,'
+                                    '?,?,?,?,?,?,?,?,?,?)', seq_of_parameters)
+                    rows += len(seq_of_parameters)
+            cur.execute(BUMP_REVISION_QUERY, (contest,))
+            with metrics.timer('sqlite_commit'):
+                conn.commit()
+            metrics.add('pages', len(tasks))
+            metrics.add('rows_written', rows)
+            print(f' -> [{contest}] Reparsed {len(tasks)} pages, {rows} rows')
     conn.close()
 
 
+def dry_run(limiter: TokenBucketRateLimiter, workers: int, num_contests: int,
+            num_submissions: int, latency: float, archive: bool,
+            pipeline: Optional[Tuple[int, int, int]] = None, locate: bool = False) -> None:
+    """ローカルのスタブサーバに対してクロールし，スループットを測る．
+
+    pipeline が (fetchers, parsers, queue_size) なら crawl_pipelined でクロールする．
+    """
+    contests: List[SyntheticContest] = [SyntheticContest(i + 1, num_submissions=num_submissions)
+                                        for i in range(num_contests)]
+    with tempfile.TemporaryDirectory() as tmpdir, StubServer(contests, latency=latency) as stub:
+        database: str = os.path.join(tmpdir, 'db.db')
+        migrate_connect(database).close()
+
+        if archive:
+            SubmissionListPageRequestResult.archive = PageArchive(Path(tmpdir) / 'archive')
+        atcoder: str = Endpoint.atcoder
+        Endpoint.atcoder = stub.url
+        start: float = time.perf_counter()
+        try:
+            if pipeline is not None:
+                crawl_pipelined(database, limiter, *pipeline, locate=locate)
+            else:
+                crawl(database, limiter, workers, locate=locate)
+        finally:
+            Endpoint.atcoder = atcoder
+        elapsed: float = time.perf_counter() - start
+
+        conn = sqlite3.connect(database)
+        rows: int = conn.execute('SELECT COUNT(*) FROM submissions').fetchone()[0]
+        conn.close()
+        mode: str = f'pipeline={pipeline}' if pipeline is not None else f'workers={workers}'
+        if locate:
+            mode += ', locate'
+        print(f'[DRY RUN] contests={num_contests}, {mode}, rps={limiter.rate}: '
+              f'requests={stub.request_count}, rows={rows}, elapsed={elapsed:.2f}s, '
+              f'throughput={stub.request_count / elapsed:.2f} req/s')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='AtCoder のマラソンコンテストの提出一覧をクロールする')
+    parser.add_argument('--database', default='db.db')
+    parser.add_argument('--workers', type=int, default=1, help='同時にクロールするコンテスト数')
+    parser.add_argument('--rps', type=float, default=1 / 3, help='全ワーカ合計の 1 秒あたりのリクエスト数')
+    parser.add_argument('--page-window', type=int, default=20, help='何ページごとに DB にコミットするか')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='取得・パース・書き込みを別々のスレッド・プロセスで並行に行う（--workers は使わない）')
+    parser.add_argument('--fetchers', type=int, default=1, help='--pipeline の取得スレッド数')
+    parser.add_argument('--parsers', type=int, default=2, help='--pipeline のパースプロセス数')
+    parser.add_argument('--queue-size', type=int, default=4, help='--pipeline の取得とパースの間のキューの長さ')
+    parser.add_argument('--locate-boundaries', action='store_true',
+                        help='コンテスト期間の提出を含むページの範囲を二分探索で求めてから，その範囲だけを取得する')
+    parser.add_argument('--parser', choices=BACKEND_NAMES, default=ParserBackend.default, help='HTML パーサ（lxml は高速だが，実際のページでの bs4 との一致は未検証）')
+    parser.add_argument('--archive-dir', default='archive', help='取得したページの保存先')
+    parser.add_argument('--no-archive', action='store_true', help='取得したページを保存しない')
+    parser.add_argument('--reparse', action='store_true',
+                        help='クロールせず，保存済みのページから submissions テーブルを作り直す')
+    parser.add_argument('--jobs', type=int, default=None, help='--reparse のパースに使うプロセス数')
+    parser.add_argument('--follow', metavar='CONTEST', default=None,
+                        help='開催中のコンテストの新しい提出だけを --follow-interval 秒ごとに取り込む')
+    parser.add_argument('--follow-interval', type=float, default=300, help='0 なら 1 回だけ取り込んで終わる')
+    parser.add_argument('--follow-unrated', action='store_true', help='--follow のコンテストを unrated として登録する')
+    parser.add_argument('--reconcile', metavar='CONTEST', nargs='*', default=None,
+                        help='WJ/WR/IE の提出やコンテスト終了前に取得したページだけを取得し直す（省略時は該当するすべてのコンテスト）')
+    parser.add_argument('--dry-run', action='store_true', help='ローカルのスタブサーバに対してクロールする')
+    parser.add_argument('--dry-run-contests', type=int, default=8)
+    parser.add_argument('--dry-run-submissions', type=int, default=200, help='スタブの 1 コンテストあたりの提出数')
+    parser.add_argument('--dry-run-latency', type=float, default=0.05, help='スタブの応答遅延（秒）')
+    parser.add_argument('--metrics', metavar='PATH', default=None,
+                        help='段階ごとの時間と件数のレポートを終了時に書き出す（.prom なら Prometheus 形式，それ以外は JSON）')
+    args = parser.parse_args()
+
+    if args.metrics is not None:
+        metrics: Metrics = Metrics.get_default()
+        metrics.command = 'crawl'
+        metrics.write_at_exit(Path(args.metrics))
+    ParserBackend.default = args.parser
+    limiter: TokenBucketRateLimiter = TokenBucketRateLimiter(args.rps)
+    if args.dry_run:
+        dry_run(limiter, args.workers, args.dry_run_contests, args.dry_run_submissions, args.dry_run_latency,
+                not args.no_archive, (args.fetchers, args.parsers, args.queue_size) if args.pipeline else None,
+                args.locate_boundaries)
+    elif args.follow is not None:
+        follow(args.database, args.follow, limiter, args.follow_interval, not args.follow_unrated)
+    elif args.reconcile is not None:
+        reconcile(args.database, limiter, args.reconcile)
+    elif args.reparse:
+        reparse(args.database, PageArchive(Path(args.archive_dir)), args.jobs)
+    else:
+        if not args.no_archive:
+            SubmissionListPageRequestResult.archive = PageArchive(Path(args.archive_dir))
+        if args.pipeline:
+            crawl_pipelined(args.database, limiter, args.fetchers, args.parsers, args.queue_size, args.page_window,
+                            args.locate_boundaries)
+        else:
+            crawl(args.database, limiter, args.workers, args.page_window, args.locate_boundaries)
+
+
 if __name__ == '__main__':
     # if len(sys.argv) != 2:
     #     print('usage: $ python crawl.py ahc001')
@@ -2,10 +2,28 @@
 
 import sys
 import json
+import time
+import hashlib
+import argparse
 import sqlite3
+from pathlib import Path
 from sqlite3.dbapi2 import Connection, Cursor
-from typing import Dict, List, Set, Tuple, Union
-from lib.csv.AHCResultCSV import AHCScoresCSV
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+import numpy as np
+from lib.AtomicFile import atomic_write, write_json
+from lib.csv.AHCResultStore import AHCResultStore
+from lib.ColumnarSubmissions import ColumnarSubmissionsEncoder
+from lib.ExportManifest import ExportManifest, Fingerprint
+from lib.Metrics import Metrics, MetricsSnapshot
+from lib.RankTimeline import write_rank_timelines
+from lib.StandingsCheckpoints import StandingsCheckpointWriter
+from lib.SubmissionFrame import SubmissionFrame, SubmissionRow, iter_dicts, normalize_submissions
+
+# エクスポート処理の出力が変わるような変更をしたら上げる（全コンテストが書き直される）
+EXPORT_VERSION: int = 1
+PUBLIC_DIR: Path = Path("../atcoder-marathon-replay-frontend/public")
 
 
 score_fix_ratio: Dict[str, Dict[str, float]] = {
@@ -32,80 +50,239 @@ score_fix_ratio: Dict[str, Dict[str, float]] = {
     "hokudai-hitachi2017-1": {"hitachi2017_1_a": 30 / 150},
 }
 
+# loss を小さくするコンテスト（フロントエンドの ChartBlock.tsx の decreasingOrderContestSlugs と揃える）
+decreasing_order_contest_slugs: Set[str] = {
+    "ahc017",
+    "ahc018",
+    "toyota-hc-2023spring",
+    "ahc019",
+    "ahc025",
+    "ahc027",
+    "ahc030",
+    "ahc031",
+    "ahc033",
+    "ahc036",
+    "ahc038",
+    "ahc040",
+    "ahc045",
+    "ahc048",
+    "ahc051",
+    "ahc056",
+}
+
+
+SUBMISSIONS_QUERY: str = (
+    "SELECT s.submission_id, s.task, s.time_unix, s.user_name, s.score, s.status, s.magnification "
+    "FROM submissions AS s JOIN contests AS c ON c.contest_slug = s.contest "
+    "WHERE s.contest = ? AND s.time_unix >= c.start_time_unix AND s.time_unix < c.end_time_unix "
+    "ORDER BY s.submission_id ASC"
+)
+
+
+LAST_SUBMISSION_IDS_QUERY: str = (
+    "SELECT MAX(s.submission_id) "
+    "FROM submissions AS s JOIN contests AS c ON c.contest_slug = s.contest "
+    "WHERE s.contest = ? AND s.time_unix >= c.start_time_unix AND s.time_unix < c.end_time_unix "
+    "GROUP BY s.user_name, s.task"
+)
+
+
+SUBMISSION_CHUNK_SIZE: int = 8192
+
+
+def iter_submission_chunks(
+    cur: Cursor, contest: str, chunk_size: int = SUBMISSION_CHUNK_SIZE
+) -> Iterator[List[SubmissionRow]]:
+    """コンテスト時間内の提出を提出 ID 昇順に chunk_size 件ずつ返す．"""
+    cur.execute(SUBMISSIONS_QUERY, (contest,))
+    while True:
+        rows: List[SubmissionRow] = cur.fetchmany(chunk_size)
+        if len(rows) == 0:
+            return
+        yield rows
+
+
+def iter_submissions(
+    cur: Cursor, contest: str
+) -> Iterator[Dict[str, Union[str, int, float]]]:
+    """コンテスト時間内の提出を提出 ID 昇順に 1 件ずつ返す．"""
+    return iter_dicts(normalize_submissions(iter_submission_chunks(cur, contest)))
+
+
+def get_last_submission_id_set(cur: Cursor, contest: str) -> Set[int]:
+    """(ユーザ, 問題) ごとの最終提出の ID の集合を返す．"""
+    return {row[0] for row in cur.execute(LAST_SUBMISSION_IDS_QUERY, (contest,))}
+
+
+def get_last_submission_ids(cur: Cursor, contest: str) -> np.ndarray:
+    """(ユーザ, 問題) ごとの最終提出の ID を配列で返す．"""
+    return np.fromiter(
+        (row[0] for row in cur.execute(LAST_SUBMISSION_IDS_QUERY, (contest,))),
+        dtype=np.int64,
+    )
+
+
+def write_json_array(path: Path, items: Iterable[object]) -> int:
+    """json.dump(list(items), f, separators=(",", ":")) と同じ内容を，リストを作らずに書き出す．
+
+    書き終えてから置き換えるので，途中で失敗しても前回の出力は壊れない．
+
+    Returns:
+        int: 書き出した要素数
+    """
+    encoder: json.JSONEncoder = json.JSONEncoder(separators=(",", ":"))
+    count: int = 0
+    with atomic_write(path) as f:
+        f.write("[")
+        for i, item in enumerate(items):
+            if i > 0:
+                f.write(",")
+            f.write(encoder.encode(item))
+            count += 1
+        f.write("]")
+    return count
+
+
+def write_json_frames(path: Path, frames: Iterable[SubmissionFrame]) -> int:
+    """write_json_array(path, iter_dicts(frames)) と同じ内容を，提出の辞書を作らずに書き出す．
+
+    チャンクごとに，読み込みとスコアの補正・JSON への変換・書き込みの時間を分けて記録する．
+
+    Returns:
+        int: 書き出した提出数
+    """
+    metrics: Metrics = Metrics.get_default()
+    encoded_strings: Dict[str, str] = {}
+    count: int = 0
+    iterator: Iterator[SubmissionFrame] = iter(frames)
+    with atomic_write(path) as f:
+        f.write("[")
+        while True:
+            with metrics.timer("export_read"):
+                frame: Optional[SubmissionFrame] = next(iterator, None)
+            if frame is None:
+                break
+            if len(frame) == 0:
+                continue
+            with metrics.timer("json_encode"):
+                text: str = frame.to_json(encoded_strings)
+            with metrics.timer("json_write"):
+                if count > 0:
+                    f.write(",")
+                f.write(text)
+            count += len(frame)
+        f.write("]")
+    return count
+
 
 def export_submissions(
     cur: Cursor,
     contest: str = "ahc001",
     tasks: List[Dict[str, Union[str, int, float]]] = [],
+    public_dir: Path = PUBLIC_DIR,
+    columnar: bool = False,
+    timelines: bool = False,
+    checkpoint_every: int = 0,
 ) -> None:
-    data: List[Dict[str, Union[str, int, float]]] = []
-    user_last_submission_id_map: Dict[
-        Tuple[str, str], int
-    ] = {}  # [user_name, task] => submission_id
-    for row in cur.execute(
-        "SELECT submission_id, task, time_unix, user_name, score, status, magnification "
-        "FROM submissions WHERE contest = ? AND time_unix >= ("
-        "    SELECT start_time_unix FROM contests WHERE contest_slug = ?"
-        ") AND time_unix < ("
-        "    SELECT end_time_unix FROM contests WHERE contest_slug = ?"
-        ")"
-        "ORDER BY submission_id ASC",
-        (contest, contest, contest),
-    ):
-        submission_id: int = row[0]
-        task: str = row[1]
-        user_name: str = row[3]
-        if user_name == "wata_admin":
-            continue
-        data.append(
-            {
-                "submission_id": submission_id,
-                "task": task,
-                "time_unix": row[2],
-                "user_name": user_name,
-                "score": row[4] if row[6] == 1 else row[4] / row[6],
-                "status": row[5],
-            }
-        )
-        key: Tuple[str, str] = (user_name, task)
-        if not (key in user_last_submission_id_map):
-            user_last_submission_id_map[key] = submission_id
-        else:
-            if submission_id > user_last_submission_id_map[key]:
-                user_last_submission_id_map[key] = submission_id
-    last_submission_id_set: Set[int] = set(user_last_submission_id_map.values())
+    """コンテストの提出一覧を JSON に書き出す．
+
+    提出はカーソルからチャンクごとに読み，スコアの補正と問題の絞り込みはチャンクの列ごとにまとめて行いながら
+    書き出すので，メモリ使用量は提出数ではなくユーザ数・問題数とチャンクの大きさに比例する．
+    提出の辞書を使う出力（columnar など）がなければ，辞書を作らずに列から直接 JSON にする．
+    columnar なら，列形式の {contest}.columnar.json も併せて書き出す．
+    timelines なら，全ユーザの順位の変化点を timelines/{contest}/ に書き出す．
+    checkpoint_every > 0 なら，その件数ごとの順位表を standings/{contest}/ に書き出す．
+    """
+    data: Iterator[Dict[str, Union[str, int, float]]]
+    frames: Optional[Iterator[SubmissionFrame]] = None
     # for ahc001
     if contest == "ahc001":
-        provisional_score_mapper = AHCScoresCSV("./lib/csv/result_ahc001.csv")
-        data = provisional_score_mapper.fix_data(data, last_submission_id_set)
+        provisional_score_mapper = AHCResultStore(cur.connection).get_scores("ahc001")
+        last_submission_id_set: Set[int] = get_last_submission_id_set(cur, contest)
+        # ユーザごとの最大スコア推移は全提出を見ないと決まらないので，先に 1 回読む
+        score_summaries = provisional_score_mapper.summarize_scores(
+            iter_submissions(cur, contest)
+        )
+        data = provisional_score_mapper.fix_stream(
+            iter_submissions(cur, contest), last_submission_id_set, score_summaries
+        )
     # for hokudai-hitachi2020, etc
     elif contest in score_fix_ratio:
-        problems: Dict[str, float] = score_fix_ratio[contest]
-        for d in data:  # for all submissions
-            if not (d["submission_id"] in last_submission_id_set):
-                continue
-            # assert d['submission_id'] in last_submission_id_set
-            assert isinstance(d["task"], str)
-            if not (d["task"] in problems):
-                continue
-            # assert d['task'] in problems
-            ratio: float = problems[d["task"]]
-            if isinstance(d["score"], int) or isinstance(d["score"], float):
-                d["score"] *= ratio
+        last_submission_ids: np.ndarray = get_last_submission_ids(cur, contest)
+        frames = normalize_submissions(
+            iter_submission_chunks(cur, contest),
+            problems=score_fix_ratio[contest],
+            last_submission_ids=last_submission_ids,
+        )
     elif contest.startswith("ahc"):
         # ahc で始まるときは1問だけ取り扱う
         # -> tasks[0] の task_slug と一致しない場合は無視する
-        data = list(filter(lambda d: d["task"] == tasks[0]["task_slug"], data))
-    with open(
-        f"../atcoder-marathon-replay-frontend/public/submissions/{contest}.json",
-        mode="wt",
-        encoding="utf-8",
-    ) as f:
-        json.dump(data, f, separators=(",", ":"))
+        frames = normalize_submissions(
+            iter_submission_chunks(cur, contest), task=str(tasks[0]["task_slug"])
+        )
+    else:
+        frames = normalize_submissions(iter_submission_chunks(cur, contest))
+    metrics: Metrics = Metrics.get_default()
+    path: Path = public_dir / "submissions" / f"{contest}.json"
+    if frames is not None and not (columnar or timelines or checkpoint_every > 0):
+        # 提出の辞書を使う出力がなければ，列から直接 JSON にする
+        metrics.add("rows_exported", write_json_frames(path, frames))
+        metrics.add("bytes_written", path.stat().st_size)
+        return
+    if frames is not None:
+        data = iter_dicts(frames)
+    encoder: Optional[ColumnarSubmissionsEncoder] = None
+    if columnar or timelines:
+        encoder = ColumnarSubmissionsEncoder()
+        data = encoder.tee(data)
+    checkpoint_writer: Optional[StandingsCheckpointWriter] = None
+    if checkpoint_every > 0:
+        checkpoint_writer = StandingsCheckpointWriter(
+            public_dir / "standings" / contest,
+            [str(task["task_slug"]) for task in tasks],
+            checkpoint_every,
+        )
+        data = checkpoint_writer.tee(data)
+    with metrics.timer("export_rows"):
+        metrics.add("rows_exported", write_json_array(path, data))
+    metrics.add("bytes_written", path.stat().st_size)
+    if checkpoint_writer is not None:
+        with metrics.timer("export_checkpoints"):
+            checkpoint_writer.close()
+    if encoder is not None and columnar:
+        with metrics.timer("export_columnar"):
+            encoder.write(public_dir / "submissions" / f"{contest}.columnar.json")
+    if encoder is not None and timelines:
+        with metrics.timer("export_timelines"):
+            export_rank_timelines(encoder, contest, public_dir)
+
+
+def export_rank_timelines(
+    encoder: ColumnarSubmissionsEncoder, contest: str, public_dir: Path = PUBLIC_DIR
+) -> int:
+    """エクスポートした提出一覧を 1 回だけ再生して，全ユーザの順位の変化点を書き出す．
+
+    フロントエンドの getRankSequence がユーザを選ぶたびにしている計算を前もって行っておくもの．
+
+    Returns:
+        int: シャード数
+    """
+    return write_rank_timelines(
+        public_dir / "timelines" / contest,
+        list(encoder.users),
+        list(encoder.tasks),
+        list(encoder.statuses),
+        list(accumulate(encoder.time_unix_deltas)),
+        encoder.user_indexes,
+        encoder.task_indexes,
+        encoder.status_indexes,
+        encoder.scores,
+        contest in decreasing_order_contest_slugs,
+    )
 
 
 def export_tasks(
-    cur: Cursor, contest_slug: str = "ahc001"
+    cur: Cursor, contest_slug: str = "ahc001", public_dir: Path = PUBLIC_DIR
 ) -> List[Dict[str, Union[str, int, float]]]:
     data: List[Dict[str, Union[str, int, float]]] = []
     for row in cur.execute(
@@ -124,16 +301,13 @@ def export_tasks(
                 "memory_limit_mb": row[5],
             }
         )
-    with open(
-        f"../atcoder-marathon-replay-frontend/public/tasks/{contest_slug}.json",
-        mode="wt",
-        encoding="utf-8",
-    ) as f:
-        json.dump(data, f, separators=(",", ":"))
+    write_json(public_dir / "tasks" / f"{contest_slug}.json", data)
     return data
 
 
-def export_contests(cur: Cursor) -> List[Dict[str, Union[str, int]]]:
+def export_contests(
+    cur: Cursor, public_dir: Path = PUBLIC_DIR
+) -> List[Dict[str, Union[str, int]]]:
     data: List[Dict[str, Union[str, int]]] = []
     for row in cur.execute(
         "SELECT contest_slug, contest_name, start_time_unix, end_time_unix FROM contests "
@@ -148,34 +322,236 @@ def export_contests(cur: Cursor) -> List[Dict[str, Union[str, int]]]:
                 "end_time_unix": row[3],
             }
         )
-    with open(
-        "../atcoder-marathon-replay-frontend/public/contests/contests.json",
-        mode="wt",
-        encoding="utf-8",
-    ) as f:
-        json.dump(data, f, separators=(",", ":"))
+    write_json(public_dir / "contests" / "contests.json", data)
     return data
 
 
-def main() -> None:
-    database: str = "db.db"
+def get_contest_fingerprint(cur: Cursor, contest_slug: str) -> Fingerprint:
+    """コンテストの出力を左右するデータの指紋を返す．これが変わらなければ出力も変わらない．
+
+    提出は件数・最大の提出 ID と，SubmissionWriter などが行を変えるたびに増やす contest_revisions の更新回数で表す．
+    提出を読み直さないので，件数や得点の合計が変わらない更新（WJ → WA や得点の入れ替わりなど）も安く検出できる．
+    """
+    row = cur.execute(
+        "SELECT start_time_unix, end_time_unix FROM contests WHERE contest_slug = ?",
+        (contest_slug,),
+    ).fetchone()
+    count, max_submission_id = cur.execute(
+        "SELECT COUNT(*), MAX(submission_id) FROM submissions WHERE contest = ?",
+        (contest_slug,),
+    ).fetchone()
+    revision_row = cur.execute(
+        "SELECT revision FROM contest_revisions WHERE contest = ?", (contest_slug,)
+    ).fetchone()
+    tasks_hash = hashlib.sha256(
+        json.dumps(
+            cur.execute(
+                "SELECT * FROM tasks WHERE contest_slug = ? ORDER BY task_slug",
+                (contest_slug,),
+            ).fetchall()
+        ).encode("utf-8")
+    ).hexdigest()
+    fingerprint: Fingerprint = {
+        "export_version": EXPORT_VERSION,
+        "submissions": [count, max_submission_id, 0 if revision_row is None else revision_row[0]],
+        "contest_time": [row[0], row[1]],
+        "tasks": tasks_hash,
+        "score_fix_ratio": score_fix_ratio.get(contest_slug),
+    }
+    if contest_slug in decreasing_order_contest_slugs:
+        fingerprint["inverted"] = True
+    if contest_slug == "ahc001":
+        fingerprint["provisional_scores"] = AHCResultStore(cur.connection).get_sha256("ahc001")
+    return fingerprint
+
+
+# ワーカプロセスごとの読み取り専用の DB 接続
+worker_conn: Optional[Connection] = None
+
+
+def init_worker(database: str) -> None:
+    global worker_conn
+    worker_conn = sqlite3.connect(f"file:{database}?mode=ro", uri=True)
+
+
+def init_worker_process(database: str) -> None:
+    init_worker(database)
+    # fork したワーカは親プロセスの計測値を引き継ぐので，二重に数えないよう捨てる
+    Metrics.get_default().drain()
+
+
+def export_contest(
+    contest_slug: str,
+    public_dir: Path,
+    columnar: bool = False,
+    timelines: bool = False,
+    checkpoint_every: int = 0,
+) -> Tuple[float, MetricsSnapshot]:
+    """1 コンテスト分の問題と提出をエクスポートする．ワーカプロセスで実行する．
+
+    Returns:
+        Tuple[float, MetricsSnapshot]: かかった秒数と，このプロセスでそれまでに記録した計測値（呼び出し元で merge する）
+    """
+    assert worker_conn is not None
+    metrics: Metrics = Metrics.get_default()
+    contest_started: float = time.perf_counter()
+    cur: Cursor = worker_conn.cursor()
+    with metrics.timer("export_tasks"):
+        tasks = export_tasks(cur, contest_slug, public_dir)
+    with metrics.timer("export_submissions"):
+        export_submissions(
+            cur, contest_slug, tasks, public_dir, columnar, timelines, checkpoint_every
+        )
+    return time.perf_counter() - contest_started, metrics.drain()
+
+
+def export_all(
+    database: str,
+    public_dir: Path,
+    manifest: ExportManifest,
+    force: bool = False,
+    jobs: int = 1,
+    columnar: bool = False,
+    timelines: bool = False,
+    checkpoint_every: int = 0,
+) -> Tuple[int, int]:
+    """コンテスト一覧と，変化のあったコンテストの問題・提出をエクスポートする．
+
+    コンテスト間に依存はないので，jobs > 1 ならプロセスプールで並列に書き出す．
+    結果の表示とマニフェストの更新はコンテスト一覧の順に行うので，並列数によらず同じになる．
+
+    Returns:
+        Tuple[int, int]: (書き出したコンテスト数, 省略したコンテスト数)
+    """
+    metrics: Metrics = Metrics.get_default()
+    # ahc001 のスコア補正に使う結果 CSV を（変わっていれば）取り込んでおく
+    with AHCResultStore.open(database) as store, metrics.timer("import_results"):
+        imported: List[str] = store.import_all()
+        if len(imported) > 0:
+            print(f"import results of {imported}")
+
     conn: Connection = sqlite3.connect(database)
     cur: Cursor = conn.cursor()
 
     print("export contests list")
-    contests: List[Dict[str, Union[str, int]]] = export_contests(cur)
+    contests: List[Dict[str, Union[str, int]]] = export_contests(cur, public_dir)
     # print(contests)
 
+    contest_names: Dict[str, Union[str, int]] = {
+        str(contest["contest_slug"]): contest["contest_name"] for contest in contests
+    }
+    targets: List[Tuple[str, Fingerprint]] = []
+    skipped: int = 0
     for contest in contests:
         assert isinstance(contest["contest_slug"], str)
         contest_slug: str = contest["contest_slug"]
-        print(
-            f'export tasks and submissions of {contest_slug} ({contest["contest_name"]})'
+        with metrics.timer("fingerprint"):
+            fingerprint: Fingerprint = get_contest_fingerprint(cur, contest_slug)
+        # 出力の種類やチェックポイントの間隔を変えたときも書き出し直す
+        fingerprint["options"] = [columnar, timelines, checkpoint_every]
+        outputs: List[Path] = [
+            public_dir / "tasks" / f"{contest_slug}.json",
+            public_dir / "submissions" / f"{contest_slug}.json",
+        ]
+        if columnar:
+            outputs.append(public_dir / "submissions" / f"{contest_slug}.columnar.json")
+        if timelines:
+            outputs.append(public_dir / "timelines" / contest_slug / "index.json")
+        if checkpoint_every > 0:
+            outputs.append(public_dir / "standings" / contest_slug / "index.json")
+        if not force and manifest.is_fresh(contest_slug, fingerprint, outputs):
+            skipped += 1
+            continue
+        targets.append((contest_slug, fingerprint))
+    conn.close()
+    metrics.add("contests_skipped", skipped)
+
+    slugs: List[str] = [contest_slug for contest_slug, _ in targets]
+    elapsed_list: Iterable[Tuple[float, MetricsSnapshot]]
+    executor: Optional[ProcessPoolExecutor] = None
+    if jobs > 1:
+        executor = ProcessPoolExecutor(
+            max_workers=jobs, initializer=init_worker_process, initargs=(database,)
+        )
+        elapsed_list = executor.map(
+            export_contest,
+            slugs,
+            [public_dir] * len(slugs),
+            [columnar] * len(slugs),
+            [timelines] * len(slugs),
+            [checkpoint_every] * len(slugs),
+        )
+    else:
+        init_worker(database)
+        elapsed_list = (
+            export_contest(slug, public_dir, columnar, timelines, checkpoint_every)
+            for slug in slugs
         )
-        tasks = export_tasks(cur, contest_slug)
-        export_submissions(cur, contest_slug, tasks)
+    try:
+        for (contest_slug, fingerprint), (elapsed, snapshot) in zip(targets, elapsed_list):
+            metrics.merge(snapshot)
+            metrics.add("contests_exported")
+            print(
+                f"export tasks and submissions of {contest_slug} ({contest_names[contest_slug]}) "
+                f"-> {elapsed:.2f}s"
+            )
+            manifest.update(contest_slug, fingerprint)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        elif worker_conn is not None:
+            worker_conn.close()
+        manifest.save()
+    return len(targets), skipped
 
-    conn.close()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="提出一覧などをフロントエンド向けに JSON でエクスポートする")
+    parser.add_argument("--database", default="db.db")
+    parser.add_argument("--manifest", default="export_manifest.json")
+    parser.add_argument("--public-dir", default=str(PUBLIC_DIR), help="出力先（フロントエンドの public）")
+    parser.add_argument("--force", action="store_true", help="変更のないコンテストも書き直す")
+    parser.add_argument("--jobs", type=int, default=1, help="並列にエクスポートするプロセス数")
+    parser.add_argument(
+        "--columnar", action="store_true", help="列形式の提出一覧 ({contest}.columnar.json) も書き出す"
+    )
+    parser.add_argument(
+        "--timelines", action="store_true", help="全ユーザの順位の変化点 (timelines/{contest}/) も書き出す"
+    )
+    parser.add_argument(
+        "--standings-checkpoints",
+        type=int,
+        default=0,
+        metavar="N",
+        help="N 件の提出ごとの順位表 (standings/{contest}/) も書き出す",
+    )
+    parser.add_argument(
+        "--metrics",
+        metavar="PATH",
+        default=None,
+        help="段階ごとの時間と件数のレポートを終了時に書き出す（.prom なら Prometheus 形式，それ以外は JSON）",
+    )
+    args = parser.parse_args()
+
+    if args.metrics is not None:
+        metrics: Metrics = Metrics.get_default()
+        metrics.command = "export"
+        metrics.write_at_exit(Path(args.metrics))
+    started: float = time.perf_counter()
+    exported, skipped = export_all(
+        args.database,
+        Path(args.public_dir),
+        ExportManifest(Path(args.manifest)),
+        args.force,
+        args.jobs,
+        args.columnar,
+        args.timelines,
+        args.standings_checkpoints,
+    )
+    print(
+        f"exported {exported} contests, skipped {skipped} unchanged contests "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
 
 
 if __name__ == "__main__":
@@ -1,13 +1,19 @@
 from __future__ import annotations
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional
 
-import requests
 from requests.models import Response
 import json
 
+from lib.Endpoint import Endpoint
+from lib.HttpClient import HttpClient
+from lib.Metrics import Metrics
+
 
 class AHCInnerRatingRequestResult:
+    # 取得した JSON のキャッシュ先．None ならキャッシュを読み書きしない
+    cache_dir: Optional[Path] = Path(__file__).resolve().parent / 'json'
+
     json_str: str
     ahc_inner_ratings: Dict[str, int]
 
@@ -15,17 +21,19 @@ class AHCInnerRatingRequestResult:
         return (f'<AHCInnerRatingRequestResult ahc_inner_ratings={self.ahc_inner_ratings}>')
 
     def request(self, slug: str) -> None:
-        cache_path = Path(__file__).resolve().parent / 'json' / f'{slug}.json'
-        if cache_path.exists():
+        cache_path: Optional[Path] = None if self.cache_dir is None else self.cache_dir / f'{slug}.json'
+        if cache_path is not None and cache_path.exists():
             self.json_str = cache_path.read_text()
         else:
-            url: str = (f'https://data.ac-predictor.com/aperfs/{slug}.json')
+            url: str = (f'{Endpoint.ac_predictor}/aperfs/{slug}.json')
             headers = {'accept-language': 'ja,en-US;q=0.9,en;q=0.8'}
-            response: Response = requests.get(url, headers=headers)
+            response: Response = HttpClient.get_default().get(url, headers=headers)
             assert response.status_code == 200
             self.json_str = response.text
-            cache_path.write_text(response.text)
-        self.ahc_inner_ratings = json.loads(self.json_str)
+            if cache_path is not None:
+                cache_path.write_text(response.text)
+        with Metrics.get_default().timer('parse_aperfs'):
+            self.ahc_inner_ratings = json.loads(self.json_str)
 
     def get_inner_rating(self, user_name: str) -> int:
         if user_name in self.ahc_inner_ratings:
@@ -0,0 +1,65 @@
+from __future__ import annotations
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Set
+
+from lib.AHCInnerRatingRequestResult import AHCInnerRatingRequestResult
+from lib.Migration import connect
+
+
+class AperfStore:
+    """ac-predictor の内部レート（aperfs/{contest}.json）を DB の aperfs 表にまとめて持つクラス．DB 接続を所有する．
+
+    取得していないコンテストは prefetch でまとめて並列に取得する．
+    取得は AHCInnerRatingRequestResult で行うので，lib/json/ にキャッシュがあればネットワークにはアクセスしない．
+    """
+
+    conn: sqlite3.Connection
+
+    def __init__(self, database: str) -> None:
+        self.conn = connect(database)
+
+    def __repr__(self) -> str:
+        return f'<AperfStore contests={len(self.get_contests())}>'
+
+    def __enter__(self) -> AperfStore:
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def get_contests(self) -> Set[str]:
+        """取得済みのコンテストを返す．"""
+        return {row[0] for row in self.conn.execute('SELECT contest FROM aperf_contests')}
+
+    def put(self, contest: str, inner_ratings: Dict[str, int]) -> None:
+        """コンテストの内部レートを（あれば置き換えて）保存する．"""
+        self.conn.execute('DELETE FROM aperfs WHERE contest = ?', (contest,))
+        self.conn.executemany('INSERT INTO aperfs VALUES (?,?,?)',
+                              ((contest, user_name, aperf) for user_name, aperf in inner_ratings.items()))
+        self.conn.execute('INSERT OR REPLACE INTO aperf_contests VALUES (?,?,?)',
+                          (contest, int(time.time()), len(inner_ratings)))
+        self.conn.commit()
+
+    def prefetch(self, contests: Iterable[str], jobs: int = 4) -> int:
+        """まだ取得していないコンテストの内部レートを jobs 並列に取得して保存する．
+
+        取得は並列に行い，DB への書き込みは呼び出し元のスレッドでコンテストごとに行う．
+
+        Returns:
+            int: 取得したコンテスト数
+        """
+        fetched: Set[str] = self.get_contests()
+        targets: List[str] = [contest for contest in dict.fromkeys(contests) if contest not in fetched]
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            for contest, airrr in zip(targets, executor.map(AHCInnerRatingRequestResult.create_from_request, targets)):
+                self.put(contest, airrr.ahc_inner_ratings)
+        return len(targets)
+
+    def get_inner_ratings(self, contest: str) -> Dict[str, int]:
+        """コンテストのユーザ名→内部レートを 1 回の問い合わせで返す．取得していなければ空になる．"""
+        return dict(self.conn.execute('SELECT user_name, aperf FROM aperfs WHERE contest = ?', (contest,)))
+
+    def close(self) -> None:
+        self.conn.close()
@@ -0,0 +1,36 @@
+from __future__ import annotations
+import contextlib
+import json
+import threading
+from pathlib import Path
+from typing import IO, Any, Iterator
+
+
+@contextlib.contextmanager
+def atomic_write(path: Path, mode: str = 'wt', per_thread: bool = False) -> Iterator[IO[Any]]:
+    """path と同じディレクトリの一時ファイルに書き，書き終えてから path に置き換える．
+
+    途中で失敗しても前回の path は壊れず，読む側が書きかけのファイルを読むこともない．
+    失敗したときは一時ファイルを消す．
+
+    Args:
+        path (Path): 書き出し先
+        mode (str): open のモード（'wt' なら UTF-8 のテキスト，'wb' ならバイナリ）
+        per_thread (bool): 同じ path に複数スレッドから同時に書くことがあるなら True（一時ファイル名をスレッドごとに変える）
+    """
+    suffix: str = f'.{threading.get_ident()}.tmp' if per_thread else '.tmp'
+    tmp_path: Path = path.with_name(f'{path.name}{suffix}')
+    try:
+        with open(tmp_path, mode=mode, encoding=None if 'b' in mode else 'utf-8') as f:
+            yield f
+        tmp_path.replace(path)
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+
+
+def write_json(path: Path, data: Any) -> None:
+    """data を区切りの空白なしの JSON として path に書き出す．"""
+    with atomic_write(path) as f:
+        json.dump(data, f, separators=(',', ':'))
@@ -0,0 +1,34 @@
+from typing import List
+
+
+class BinaryIndexedTree:
+    """フロントエンドの BinaryIndexedTree.ts と同じもの．"""
+
+    data: List[int]
+    length: int
+
+    def __init__(self, length: int) -> None:
+        self.length = length
+        self.data = [0] * (length + 1)
+
+    def __repr__(self) -> str:
+        return f'<BinaryIndexedTree length={self.length}>'
+
+    def sum(self, k: int) -> int:
+        """[0, k] の和を返す．"""
+        ret: int = 0
+        k += 1
+        while k > 0:
+            ret += self.data[k]
+            k -= k & -k
+        return ret
+
+    def add(self, k: int, x: int) -> None:
+        k += 1
+        while k < len(self.data):
+            self.data[k] += x
+            k += k & -k
+
+    def query(self, l: int, r: int) -> int:
+        """[l, r) の和を返す．"""
+        return self.sum(r - 1) - self.sum(l - 1)
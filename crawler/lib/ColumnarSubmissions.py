@@ -0,0 +1,133 @@
+from __future__ import annotations
+import json
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Union
+
+from lib.AtomicFile import write_json
+
+SubmissionDict = Dict[str, Union[str, int, float]]
+
+# 形式を変えたら上げる
+COLUMNAR_FORMAT_VERSION: int = 1
+
+
+class ColumnarSubmissionsEncoder:
+    """提出一覧を列ごとにまとめた，辞書符号化つきの JSON にする．
+
+    行ごとの JSON ではすべての提出でキー名・ユーザ名・問題 slug を繰り返すので，列ごとに持ち，
+
+    - user_name, task, status は辞書（初出順）への添字
+    - submission_id, time_unix は直前の提出との差分
+    - score はそのまま（int と float の区別も保つ）
+
+    とする．
+    """
+
+    users: Dict[str, int]
+    tasks: Dict[str, int]
+    statuses: Dict[str, int]
+    submission_id_deltas: array
+    time_unix_deltas: array
+    user_indexes: array
+    task_indexes: array
+    status_indexes: array
+    scores: List[Union[int, float]]
+    last_submission_id: int
+    last_time_unix: int
+
+    def __init__(self) -> None:
+        self.users = {}
+        self.tasks = {}
+        self.statuses = {}
+        self.submission_id_deltas = array('q')
+        self.time_unix_deltas = array('q')
+        self.user_indexes = array('l')
+        self.task_indexes = array('l')
+        self.status_indexes = array('l')
+        self.scores = []
+        self.last_submission_id = 0
+        self.last_time_unix = 0
+
+    def __repr__(self) -> str:
+        return f'<ColumnarSubmissionsEncoder count={len(self.scores)} users={len(self.users)}>'
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    @staticmethod
+    def __index(dictionary: Dict[str, int], value: str) -> int:
+        index: int = dictionary.get(value, -1)
+        if index < 0:
+            index = dictionary[value] = len(dictionary)
+        return index
+
+    def add(self, d: SubmissionDict) -> None:
+        submission_id = d['submission_id']
+        time_unix = d['time_unix']
+        score = d['score']
+        assert isinstance(submission_id, int) and isinstance(time_unix, int)
+        assert isinstance(score, (int, float))
+        self.submission_id_deltas.append(submission_id - self.last_submission_id)
+        self.time_unix_deltas.append(time_unix - self.last_time_unix)
+        self.last_submission_id = submission_id
+        self.last_time_unix = time_unix
+        self.user_indexes.append(self.__index(self.users, str(d['user_name'])))
+        self.task_indexes.append(self.__index(self.tasks, str(d['task'])))
+        self.status_indexes.append(self.__index(self.statuses, str(d['status'])))
+        self.scores.append(score)
+
+    def tee(self, data: Iterable[SubmissionDict]) -> Iterator[SubmissionDict]:
+        """提出をそのまま流しつつ，自身にも追加する．行形式と同時に書き出すときに使う．"""
+        for d in data:
+            self.add(d)
+            yield d
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'version': COLUMNAR_FORMAT_VERSION,
+            'count': len(self.scores),
+            'users': list(self.users),
+            'tasks': list(self.tasks),
+            'statuses': list(self.statuses),
+            'submission_id': self.submission_id_deltas.tolist(),
+            'time_unix': self.time_unix_deltas.tolist(),
+            'user_name': self.user_indexes.tolist(),
+            'task': self.task_indexes.tolist(),
+            'status': self.status_indexes.tolist(),
+            'score': self.scores,
+        }
+
+    def write(self, path: Path) -> None:
+        write_json(path, self.to_dict())
+
+
+def decode_columnar_submissions(obj: Dict[str, Any]) -> List[SubmissionDict]:
+    """列形式を行形式（export_submissions の JSON と同じ辞書のリスト）に戻す．"""
+    if obj['version'] != COLUMNAR_FORMAT_VERSION:
+        raise ValueError(f'unsupported columnar format version: {obj["version"]}')
+    users: List[str] = obj['users']
+    tasks: List[str] = obj['tasks']
+    statuses: List[str] = obj['statuses']
+    data: List[SubmissionDict] = []
+    submission_id: int = 0
+    time_unix: int = 0
+    for submission_id_delta, time_unix_delta, user_index, task_index, status_index, score in zip(
+            obj['submission_id'], obj['time_unix'], obj['user_name'], obj['task'], obj['status'], obj['score']):
+        submission_id += submission_id_delta
+        time_unix += time_unix_delta
+        data.append({
+            'submission_id': submission_id,
+            'task': tasks[task_index],
+            'time_unix': time_unix,
+            'user_name': users[user_index],
+            'score': score,
+            'status': statuses[status_index],
+        })
+    assert len(data) == obj['count']
+    return data
+
+
+def read_columnar_submissions(path: Path) -> List[SubmissionDict]:
+    with open(path, encoding='utf-8') as f:
+        return decode_columnar_submissions(json.load(f))
@@ -0,0 +1,144 @@
+from __future__ import annotations
+import math
+from typing import Dict, Optional, Tuple
+
+from lib.Metrics import Metrics
+from lib.RateLimiter import TokenBucketRateLimiter
+from lib.SubmissionListPage import SubmissionListPage
+from lib.SubmissionListPageRequestResult import ROWS_PER_PAGE, SubmissionListPageRequestResult
+
+
+class ContestBoundaryLocator:
+    """提出一覧（orderBy=created）のうち，コンテスト期間 [開始時刻, 終了時刻) の提出を含むページの範囲を二分探索で求めるクラス．
+
+    提出は古い順に並ぶので，「先頭の提出が終了時刻より前」なページは前半に，「最後の提出が開始時刻以降」なページは後半に集まる．
+    最初に取得したページのページ送りから総ページ数を読み，それを上限に範囲の最後のページを探す．
+    範囲内のページはどうせクロールで取得するので，行き過ぎた（範囲の外を調べた）ときだけが余計なリクエストになる．
+    そこでそれまでの提出の間隔から終了時刻をまたぐページを見積もって調べ，行き過ぎたら次の 1 回は二分探索にする
+    （練習提出が長く続いても，行き過ぎる回数は高々総ページ数の対数で済む）．
+    取得したページは results に残すので，範囲内のページはクロールで取得し直さなくてよい．
+    """
+
+    slug: str
+    limiter: TokenBucketRateLimiter
+    results: Dict[int, SubmissionListPageRequestResult]  # 取得済みのページ
+    page_count: int  # ページ送りから読んだ総ページ数
+    requests: int
+
+    def __init__(self, slug: str, limiter: TokenBucketRateLimiter) -> None:
+        """
+        Args:
+            slug (str): コンテスト
+            limiter (TokenBucketRateLimiter): レートリミッタ
+        """
+        self.slug = slug
+        self.limiter = limiter
+        self.results = {}
+        self.page_count = 1
+        self.requests = 0
+
+    def __repr__(self) -> str:
+        return f'<ContestBoundaryLocator slug={self.slug} page_count={self.page_count} requests={self.requests}>'
+
+    def fetch(self, pagenum: int) -> SubmissionListPageRequestResult:
+        """ページを取得する（取得済みならそれを返す）．"""
+        result: Optional[SubmissionListPageRequestResult] = self.results.get(pagenum)
+        if result is None:
+            self.limiter.acquire()
+            result = SubmissionListPageRequestResult.create_from_request(self.slug, pagenum)
+            self.results[pagenum] = result
+            self.requests += 1
+        return result
+
+    def take(self, pagenum: int) -> SubmissionListPageRequestResult:
+        """ページを取得する．取得済みならそれを返して手放す（クロールで 1 度ずつ読むとき用）．"""
+        result: Optional[SubmissionListPageRequestResult] = self.results.pop(pagenum, None)
+        if result is None:
+            self.limiter.acquire()
+            result = SubmissionListPageRequestResult.create_from_request(self.slug, pagenum)
+            self.requests += 1
+        return result
+
+    def __starts_before(self, pagenum: int, time_unix: int) -> bool:
+        """ページの先頭の提出が time_unix より前なら True（404 や空のページは False）．"""
+        page: Optional[SubmissionListPage] = self.fetch(pagenum).submission_list_page
+        return page is not None and len(page.submissions) > 0 and page.submissions[0].time_unix < time_unix
+
+    def __ends_before(self, pagenum: int, time_unix: int) -> bool:
+        """ページの最後の提出が time_unix より前なら True（404 や空のページは False）．"""
+        page: Optional[SubmissionListPage] = self.fetch(pagenum).submission_list_page
+        return page is not None and len(page.submissions) > 0 and page.submissions[-1].time_unix < time_unix
+
+    def __interpolate(self, base: int, lo: int, hi: int, time_unix: int) -> int:
+        """base ページから lo ページまでの提出の間隔から，time_unix より前の最後の提出を含むページを見積もる（lo より後，hi より前）．"""
+        base_page: Optional[SubmissionListPage] = self.fetch(base).submission_list_page
+        lo_page: Optional[SubmissionListPage] = self.fetch(lo).submission_list_page
+        assert base_page is not None and lo_page is not None
+        rows: int = (lo - base) * ROWS_PER_PAGE + len(lo_page.submissions)
+        last_time_unix: int = lo_page.submissions[-1].time_unix
+        if rows <= 1 or last_time_unix <= base_page.submissions[0].time_unix:
+            return (lo + hi) // 2
+        seconds_per_row: float = (last_time_unix - base_page.submissions[0].time_unix) / (rows - 1)
+        # 手前にずれる分には無駄にならないので，time_unix より前の提出の数で見積もる
+        rows_before: int = math.ceil((time_unix - last_time_unix) / seconds_per_row) - 1
+        return min(hi - 1, lo + max(1, math.ceil(rows_before / ROWS_PER_PAGE)))
+
+    def locate(self, pagenum: int = 1) -> Optional[Tuple[int, int]]:
+        """pagenum ページ以降で，コンテスト期間の提出を含む最初と最後のページを返す．
+
+        最後のページは crawl_contest が打ち切るページ（終了時刻以降の提出を含むページ）と同じか，
+        期間の終わりがちょうどページの切れ目にあたるときはその 1 つ前になる．
+        期間の提出がなければ，最初のページも最後のページも「先頭の提出が終了時刻より前」な最後のページ（なければ pagenum）にする．
+
+        Args:
+            pagenum (int): 探索を始めるページ番号（再開するときは MAX(pagenum) + 1）
+
+        Returns:
+            Optional[Tuple[int, int]]: (最初のページ, 最後のページ)．pagenum ページが 404 なら None
+        """
+        result: SubmissionListPageRequestResult = self.fetch(pagenum)
+        page: Optional[SubmissionListPage] = result.submission_list_page
+        if result.is_closed or page is None:
+            return None
+        self.page_count = max(pagenum, page.page_count)
+        start_unix: int = page.contest_starttime_unix
+        end_unix: int = page.contest_endtime_unix
+
+        # 最後のページ: 先頭の提出が終了時刻より前な最大のページ
+        # 不変条件: lo はそうであり，hi はそうでない（総ページ数より後のページは空）
+        lo: int = pagenum
+        hi: int = self.page_count + 1
+        bisect: bool = False
+        while hi - lo > 1:
+            if not self.__starts_before(lo, end_unix):
+                hi = lo + 1
+                break
+            if not self.__ends_before(lo, end_unix):
+                # 終了時刻をまたぐページ
+                hi = lo + 1
+                break
+            # 範囲内のページを調べるのはクロールの先取りなので，行き過ぎたときだけ二分探索にする
+            probe: int = (lo + hi) // 2 if bisect else self.__interpolate(pagenum, lo, hi, end_unix)
+            bisect = not self.__starts_before(probe, end_unix)
+            if bisect:
+                hi = probe
+            else:
+                lo = probe
+        last: int = lo
+
+        # 最初のページ: 最後の提出が開始時刻以降な最小のページ（last を超えない）
+        first: int = pagenum
+        if self.__ends_before(first, start_unix):
+            lo, hi = first, last
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                if self.__ends_before(mid, start_unix):
+                    lo = mid
+                else:
+                    hi = mid
+            first = hi
+
+        metrics: Metrics = Metrics.get_default()
+        metrics.add('boundary_probes', self.requests)
+        metrics.add('boundary_probes_outside', sum(1 for probe in self.results if probe < first or probe > last))
+        return first, last
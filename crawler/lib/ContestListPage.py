@@ -3,9 +3,12 @@ from bs4 import BeautifulSoup
 from bs4.element import Tag
 import re
 from datetime import datetime
+import lxml.html
 
 from typing import Literal
 
+from lib.ParserBackend import JST, BackendName, ParserBackend, TABLE_ROWS_XPATH
+
 SubmissionStatus = Literal[
     "AC", "WA", "IE", "OLE", "RE", "TLE", "MLE", "CE", "WJ", "WR"
 ]
@@ -34,20 +37,44 @@ class ContestListPage:
                 table_row (Tag): 行タグ
             """
             table_data_list: List[Tag] = table_row.select("td")
+            contest_tag: Tag = table_data_list[1].find("a")
+            self.__parse(
+                table_data_list[0].get_text(),
+                contest_tag["href"],
+                contest_tag.get_text(),
+                table_data_list[2].get_text(),
+                table_data_list[3].get_text(),
+            )
 
-            time_str: str = table_data_list[0].get_text()
-            self.time = datetime.strptime(time_str, "%Y-%m-%d %H:%M:%S+0900")
+        @classmethod
+        def from_lxml(cls, table_row: lxml.html.HtmlElement) -> "ContestListPage.Contest":
+            """lxml の行要素からコンテストインスタンスを初期化する．__init__ と同じ結果になる．"""
+            self = cls.__new__(cls)
+            table_data_list: List[lxml.html.HtmlElement] = list(table_row.iter("td"))
+            contest_tag: lxml.html.HtmlElement = next(table_data_list[1].iter("a"))
+            self.__parse(
+                table_data_list[0].text_content(),
+                contest_tag.get("href"),
+                contest_tag.text_content(),
+                table_data_list[2].text_content(),
+                table_data_list[3].text_content(),
+            )
+            return self
+
+        def __parse(
+            self, time_str: str, contest_href: str, contest_name: str,
+            duration_str: str, rated_range_str: str
+        ) -> None:
+            self.time = datetime.strptime(time_str, "%Y-%m-%d %H:%M:%S+0900").replace(tzinfo=JST)
             self.time_unix = int(self.time.timestamp())
 
-            contest_tag: Tag = table_data_list[1].find("a")
             contest_href_match: Optional[Match[str]] = self.contest_href_pattern.search(
-                contest_tag["href"]
+                contest_href
             )
             assert contest_href_match is not None
             self.contest_slug = contest_href_match.group(1)
-            self.contest_name = contest_tag.get_text()
+            self.contest_name = contest_name
 
-            duration_str: str = table_data_list[2].get_text()
             duration_match: Optional[Match[str]] = self.duration_pattern.search(
                 duration_str
             )
@@ -56,8 +83,7 @@ class ContestListPage:
             minutes: int = int(duration_match.group(2))
             self.duration_minutes = hours * 60 + minutes
 
-            rated_range_str: str = table_data_list[3].get_text().strip()
-            self.rated = rated_range_str == "All"
+            self.rated = rated_range_str.strip() == "All"
 
         def __repr__(self) -> str:
             return (
@@ -68,12 +94,19 @@ class ContestListPage:
 
     contests: List[Contest]
 
-    def __init__(self, html: str) -> None:
+    def __init__(self, html: str, backend: Optional[BackendName] = None) -> None:
         """HTML をパースしてコンテスト一覧を初期化する．
 
         Args:
             html (str): コンテスト一覧ページの HTML 文字列．
+            backend (Optional[BackendName]): 使用するパーサ．None なら ParserBackend.default
         """
+        if (backend or ParserBackend.default) == "lxml":
+            self.contests = [
+                ContestListPage.Contest.from_lxml(table_row)
+                for table_row in lxml.html.fromstring(html).xpath(TABLE_ROWS_XPATH)
+            ]
+            return
         # get submissions
         soup: BeautifulSoup = BeautifulSoup(html, "html.parser")
         table_rows: List[Tag] = soup.select("div.table-responsive table.table tbody tr")
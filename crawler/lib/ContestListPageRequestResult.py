@@ -1,7 +1,9 @@
 from __future__ import annotations
 from lib.ContestListPage import ContestListPage
+from lib.Endpoint import Endpoint
+from lib.HttpClient import HttpClient
+from lib.Metrics import Metrics
 from typing import List, Tuple
-import requests
 from requests.models import Response
 
 
@@ -14,14 +16,15 @@ class ContestListPageRequestResult:
 
     def get(self) -> None:
         # url: str = (f'https://atcoder.jp/contests/archive?ratedType=0&category=1200&keyword=')
-        url: str = (f'https://atcoder.jp/contests/archive?ratedType=4&category=0&keyword=')
+        url: str = (f'{Endpoint.atcoder}/contests/archive?ratedType=4&category=0&keyword=')
         headers = {'accept-language': 'ja,en-US;q=0.9,en;q=0.8'}
-        response: Response = requests.get(url, headers=headers)
+        response: Response = HttpClient.get_default().get(url, headers=headers)
         assert response.status_code == 200
         self.html = response.text
 
     def parse(self) -> None:
-        self.contest_list_page = ContestListPage(self.html)
+        with Metrics.get_default().timer('parse_contests'):
+            self.contest_list_page = ContestListPage(self.html)
 
     def write_as_sample(self) -> None:
         with open('sample_contests.html', mode='w') as f:
@@ -0,0 +1,406 @@
+from __future__ import annotations
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import timedelta
+from multiprocessing import get_context
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple, Union
+
+from lib.ContestBoundaryLocator import ContestBoundaryLocator
+from lib.ContestListPage import ContestListPage
+from lib.Metrics import Metrics, MetricsSnapshot
+from lib.ParserBackend import BackendName, ParserBackend
+from lib.RateLimiter import TokenBucketRateLimiter
+from lib.SubmissionListPage import SubmissionListPage
+from lib.SubmissionListPageRequestResult import DBInsertData, SubmissionListPageRequestResult
+from lib.SubmissionWriter import SubmissionWriter
+
+# (コンテストの番号, ページ番号)
+PageKey = Tuple[int, int]
+
+
+class FetchedPage(NamedTuple):
+    key: PageKey
+    slug: str
+    html: Optional[str]  # 404 なら None
+
+
+class ParsedPage(NamedTuple):
+    contest_title: str
+    contest_starttime_unix: int
+    contest_endtime_unix: int
+    size: int  # ページの提出数
+    first_time: str
+    last_time: str
+    is_last_page: bool
+    rows: List[DBInsertData]
+
+
+def parse_page(task: Tuple[str, int, str, BackendName]) -> Tuple[ParsedPage, MetricsSnapshot]:
+    """取得したページ 1 つをパースする．プロセスプールのワーカで実行し，ワーカで記録した時間も返す．"""
+    contest, pagenum, html, backend = task
+    ParserBackend.default = backend
+    result: SubmissionListPageRequestResult = SubmissionListPageRequestResult.create_from_html(contest, pagenum, html)
+    page: Optional[SubmissionListPage] = result.submission_list_page
+    assert page is not None
+    parsed: ParsedPage = ParsedPage(
+        page.contest_title, page.contest_starttime_unix, page.contest_endtime_unix, len(page.submissions),
+        str(page.submissions[0].time) if len(page.submissions) > 0 else '',
+        str(page.submissions[-1].time) if len(page.submissions) > 0 else '',
+        result.is_last_page, result.generate_insert_data())
+    return parsed, Metrics.get_default().drain()
+
+
+class PageScheduler:
+    """パイプラインの取得段に，取得するページを (コンテスト, ページ番号) の順に割り当てるクラス．
+
+    コンテストの最後のページ（404，空，コンテスト終了後の提出を含む）が分かるまでは先のページも投機的に割り当て，
+    分かった時点で次のコンテストに進む．last_pages で最初から分かっていれば，その先は割り当てない．
+    書き込みが済んでいないページは max_ahead ページまでしか割り当てない．
+    """
+
+    start_pages: List[int]
+    max_ahead: int
+    last_pages: List[Optional[int]]  # コンテストの最後のページ（分かっていれば）
+    current: int  # 割り当て中のコンテスト
+    next_pagenum: int
+    in_flight: int  # 割り当てたが書き込みも破棄もされていないページ数
+    aborted: bool
+    condition: threading.Condition
+
+    def __init__(self, start_pages: List[int], max_ahead: int,
+                 last_pages: Optional[List[Optional[int]]] = None) -> None:
+        """
+        Args:
+            start_pages (List[int]): コンテストごとの最初に取得するページ番号
+            max_ahead (int): 書き込みが済んでいないページをいくつまで割り当てるか
+            last_pages (Optional[List[Optional[int]]]): コンテストごとの最後のページ番号（分かっていれば）
+        """
+        assert max_ahead >= 1
+        self.start_pages = start_pages
+        self.max_ahead = max_ahead
+        self.last_pages = list(last_pages) if last_pages is not None else [None] * len(start_pages)
+        self.current = 0
+        self.next_pagenum = start_pages[0] if len(start_pages) > 0 else 1
+        self.in_flight = 0
+        self.aborted = False
+        self.condition = threading.Condition()
+
+    def __repr__(self) -> str:
+        return f'<PageScheduler current={self.current} next_pagenum={self.next_pagenum} in_flight={self.in_flight}>'
+
+    def next_page(self) -> Optional[PageKey]:
+        """次に取得するページを返す．すべて割り当て終わったら None を返す．"""
+        metrics: Metrics = Metrics.get_default()
+        with self.condition:
+            start: float = time.perf_counter()
+            waited: bool = False
+            while not self.aborted and self.current < len(self.start_pages) and self.in_flight >= self.max_ahead:
+                waited = True
+                self.condition.wait()
+            if waited:
+                # 書き込み段が追いついていない
+                metrics.observe('page_window_wait', time.perf_counter() - start)
+            # 最後のページまで割り当て終わったコンテストは飛ばす
+            while self.current < len(self.start_pages) and self.is_stale((self.current, self.next_pagenum)):
+                self.current += 1
+                if self.current < len(self.start_pages):
+                    self.next_pagenum = self.start_pages[self.current]
+            if self.aborted or self.current >= len(self.start_pages):
+                return None
+            key: PageKey = (self.current, self.next_pagenum)
+            self.next_pagenum += 1
+            self.in_flight += 1
+            metrics.gauge('pages_in_flight', self.in_flight)
+            return key
+
+    def set_last_page(self, key: PageKey) -> None:
+        """key がそのコンテストの最後のページだと分かったことを伝える．"""
+        index, pagenum = key
+        with self.condition:
+            last_page: Optional[int] = self.last_pages[index]
+            if last_page is not None and last_page <= pagenum:
+                return
+            self.last_pages[index] = pagenum
+            if index == self.current:
+                self.current += 1
+                if self.current < len(self.start_pages):
+                    self.next_pagenum = self.start_pages[self.current]
+            self.condition.notify_all()
+
+    def is_stale(self, key: PageKey) -> bool:
+        """最後のページより後のページなら True．"""
+        index, pagenum = key
+        with self.condition:
+            last_page: Optional[int] = self.last_pages[index]
+            return last_page is not None and pagenum > last_page
+
+    def release(self) -> None:
+        """割り当てたページ 1 つを書き込んだか破棄した．"""
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def abort(self) -> None:
+        with self.condition:
+            self.aborted = True
+            self.condition.notify_all()
+
+
+class CrawlPipeline:
+    """提出一覧のクロールを，取得・パース・書き込みの 3 段に分けて並行に行うクラス．
+
+    - 取得段: fetchers 個のスレッドが，レートリミッタのもとでページを取得し，HTML を長さ queue_size のキューに積む
+    - パース段: parsers 個のプロセスが，HTML をパースして挿入データにする（パースは GIL を持つので，スレッドでは通信と重ならない）
+    - 書き込み段: 呼び出し元のスレッドが 1 つの SubmissionWriter で，コンテスト順・ページ番号順に書き込む
+
+    書き込みの順序と，コンテストの打ち切り条件（404，空のページ，コンテスト終了後の提出を含むページ）は crawl_contest と同じなので，
+    途中で落ちても MAX(pagenum) + 1 から再開できる．最後のページより後に投機的に取得したページは捨てる．
+    locate なら，取得段を動かす前に ContestBoundaryLocator で各コンテストの取得するページの範囲を求めておき，
+    範囲の外は取得しない（探索で取得したページは取得し直さずにパース段に渡す）．
+    各段の待ち時間とキューの長さは Metrics に記録する．
+    """
+
+    writer: SubmissionWriter
+    limiter: TokenBucketRateLimiter
+    fetchers: int
+    parsers: int
+    queue_size: int
+    max_ahead: int
+    locate: bool
+    backend: BackendName
+    slugs: List[str]
+    prefetched: Dict[PageKey, FetchedPage]  # 範囲の探索で取得済みのページ
+    fetch_queue: queue.Queue
+    scheduler: PageScheduler
+    ready: Dict[PageKey, Union[FetchedPage, Future]]
+    parsing: int
+    pending: Set[Future]  # パース段に渡して，まだ結果を受け取っていないもの
+    errors: List[BaseException]
+    condition: threading.Condition
+
+    def __init__(self, writer: SubmissionWriter, limiter: TokenBucketRateLimiter, fetchers: int = 1,
+                 parsers: int = 2, queue_size: int = 4, max_ahead: Optional[int] = None,
+                 locate: bool = False) -> None:
+        """
+        Args:
+            writer (SubmissionWriter): 書き込み先
+            limiter (TokenBucketRateLimiter): 取得段で共有するレートリミッタ
+            fetchers (int): 取得段のスレッド数
+            parsers (int): パース段のプロセス数
+            queue_size (int): 取得段とパース段の間のキューの長さ
+            max_ahead (Optional[int]): 書き込みが済んでいないページをいくつまで取得するか（None なら全段の合計）
+            locate (bool): 取得するページの範囲を先に求めるか
+        """
+        assert fetchers >= 1 and parsers >= 1 and queue_size >= 1
+        self.writer = writer
+        self.limiter = limiter
+        self.fetchers = fetchers
+        self.parsers = parsers
+        self.queue_size = queue_size
+        self.max_ahead = max_ahead if max_ahead is not None else fetchers + queue_size + parsers
+        self.locate = locate
+        self.backend = ParserBackend.default
+        self.slugs = []
+        self.prefetched = {}
+        self.fetch_queue = queue.Queue(maxsize=queue_size)
+        self.scheduler = PageScheduler([], self.max_ahead)
+        self.ready = {}
+        self.parsing = 0
+        self.pending = set()
+        self.errors = []
+        self.condition = threading.Condition()
+
+    def __repr__(self) -> str:
+        return (f'<CrawlPipeline fetchers={self.fetchers} parsers={self.parsers} queue_size={self.queue_size} '
+                f'max_ahead={self.max_ahead} locate={self.locate}>')
+
+    def __fail(self, e: BaseException) -> None:
+        with self.condition:
+            self.errors.append(e)
+            self.condition.notify_all()
+        self.scheduler.abort()
+
+    def __fetch(self) -> None:
+        """取得段のスレッド．"""
+        metrics: Metrics = Metrics.get_default()
+        try:
+            while True:
+                key: Optional[PageKey] = self.scheduler.next_page()
+                if key is None:
+                    break
+                # 取得するまでに最後のページが分かっていれば，取得しない
+                if self.scheduler.is_stale(key):
+                    metrics.add('pages_skipped')
+                    self.scheduler.release()
+                    continue
+                fetched: Optional[FetchedPage] = self.prefetched.pop(key, None)
+                if fetched is None:
+                    slug: str = self.slugs[key[0]]
+                    self.limiter.acquire()
+                    result: SubmissionListPageRequestResult = SubmissionListPageRequestResult(slug, key[1])
+                    result.get()
+                    if result.is_closed:
+                        self.scheduler.set_last_page(key)
+                    fetched = FetchedPage(key, slug, None if result.is_closed else result.html)
+                else:
+                    metrics.add('pages_prefetched')
+                start: float = time.perf_counter()
+                self.fetch_queue.put(fetched)
+                metrics.observe('fetch_queue_put_wait', time.perf_counter() - start)
+                metrics.gauge('fetch_queue_depth', self.fetch_queue.qsize())
+        except BaseException as e:
+            self.__fail(e)
+
+    def __deliver(self, key: PageKey, value: Union[FetchedPage, Future]) -> None:
+        if isinstance(value, Future):
+            with self.condition:
+                self.parsing -= 1
+                self.pending.discard(value)
+            # 終了時に取り消したもの
+            if value.cancelled():
+                return
+            # 最後のページなら，書き込みを待たずに取得段に伝える
+            if value.exception() is None:
+                parsed: ParsedPage = value.result()[0]
+                if parsed.is_last_page or parsed.size == 0:
+                    self.scheduler.set_last_page(key)
+        with self.condition:
+            self.ready[key] = value
+            Metrics.get_default().gauge('reorder_buffer_depth', len(self.ready))
+            self.condition.notify_all()
+
+    def __dispatch(self, executor: ProcessPoolExecutor) -> None:
+        """取得段のキューからパース段にページを渡すスレッド．"""
+        metrics: Metrics = Metrics.get_default()
+        try:
+            while True:
+                fetched: Optional[FetchedPage] = self.fetch_queue.get()
+                if fetched is None:
+                    break
+                if fetched.html is None:
+                    self.__deliver(fetched.key, fetched)
+                    continue
+                with self.condition:
+                    self.parsing += 1
+                    metrics.gauge('parse_queue_depth', self.parsing)
+                future: Future = executor.submit(parse_page, (fetched.slug, fetched.key[1], fetched.html, self.backend))
+                with self.condition:
+                    self.pending.add(future)
+                future.add_done_callback(lambda f, key=fetched.key: self.__deliver(key, f))
+        except BaseException as e:
+            self.__fail(e)
+
+    def __wait_for(self, key: PageKey) -> Union[FetchedPage, Future]:
+        """書き込み段で，次に書き込むページが取得・パースされるまで待つ．途中のページは破棄する．"""
+        metrics: Metrics = Metrics.get_default()
+        start: float = time.perf_counter()
+        with self.condition:
+            while True:
+                if len(self.errors) > 0:
+                    raise self.errors[0]
+                # 書き込み済みのコンテストのページは，投機的に取得した最後のページより後のページ
+                for stale_key in [k for k in self.ready if k[0] < key[0]]:
+                    del self.ready[stale_key]
+                    metrics.add('pages_discarded')
+                    self.scheduler.release()
+                if key in self.ready:
+                    metrics.observe('writer_wait', time.perf_counter() - start)
+                    return self.ready.pop(key)
+                self.condition.wait()
+
+    def run(self, contests: List[ContestListPage.Contest]) -> None:
+        """コンテストを順にクロールする．"""
+        if len(contests) == 0:
+            return
+        metrics: Metrics = Metrics.get_default()
+        self.slugs = [contest.contest_slug for contest in contests]
+        start_pages: List[int] = [(self.writer.get_max_pagenum(slug) or 0) + 1 for slug in self.slugs]
+        last_pages: List[Optional[int]] = [None] * len(contests)
+        if self.locate:
+            for index, slug in enumerate(self.slugs):
+                self.__locate(index, slug, start_pages, last_pages)
+        self.scheduler = PageScheduler(start_pages, self.max_ahead, last_pages)
+        # スレッドを起動したあとに fork しないよう，パースのプロセスは spawn で起動する
+        executor: ProcessPoolExecutor = ProcessPoolExecutor(max_workers=self.parsers, mp_context=get_context('spawn'))
+        threads: List[threading.Thread] = [threading.Thread(target=self.__fetch, daemon=True)
+                                           for _ in range(self.fetchers)]
+        dispatcher: threading.Thread = threading.Thread(target=self.__dispatch, args=(executor,), daemon=True)
+        for thread in threads:
+            thread.start()
+        dispatcher.start()
+        try:
+            for index, contest in enumerate(contests):
+                self.__write_contest(index, contest, start_pages[index])
+                metrics.add('contests_crawled')
+        finally:
+            self.scheduler.abort()
+            # 取得段がキューに積めずに止まっていれば動かす
+            for thread in threads:
+                while thread.is_alive():
+                    try:
+                        self.fetch_queue.get_nowait()
+                    except queue.Empty:
+                        pass
+                    thread.join(timeout=0.01)
+            self.fetch_queue.put(None)
+            dispatcher.join()
+            # まだパースを始めていないページは取り消す（shutdown の cancel_futures は 3.9 以降なので使わない）
+            with self.condition:
+                pending: List[Future] = list(self.pending)
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    def __locate(self, index: int, slug: str, start_pages: List[int], last_pages: List[Optional[int]]) -> None:
+        """コンテストの取得するページの範囲を求め，start_pages と last_pages を書き換える．"""
+        locator: ContestBoundaryLocator = ContestBoundaryLocator(slug, self.limiter)
+        bounds: Optional[Tuple[int, int]] = locator.locate(start_pages[index])
+        if bounds is None:
+            # 404 のページだけを書き込み段に渡す
+            last_pages[index] = start_pages[index]
+        else:
+            start_pages[index], last_pages[index] = bounds
+            print(f' -> [{slug}] Pages {bounds[0]}-{bounds[1]} of {locator.page_count} '
+                  f'({locator.requests} requests to locate)')
+        first_page: int = start_pages[index]
+        last_page: Optional[int] = last_pages[index]
+        assert last_page is not None
+        for pagenum, result in locator.results.items():
+            if first_page <= pagenum <= last_page:
+                self.prefetched[(index, pagenum)] = FetchedPage((index, pagenum), slug,
+                                                                None if result.is_closed else result.html)
+
+    def __write_contest(self, index: int, contest: ContestListPage.Contest, pagenum: int) -> None:
+        """1 コンテスト分のページを順に書き込む．crawl_contest の書き込みと同じ．"""
+        metrics: Metrics = Metrics.get_default()
+        slug: str = contest.contest_slug
+        while True:
+            value: Union[FetchedPage, Future] = self.__wait_for((index, pagenum))
+            self.scheduler.release()
+            if isinstance(value, FetchedPage):
+                print(f' -> [{slug}] Page {pagenum}: 404')
+                self.writer.upsert_contest((slug, contest.contest_name, contest.time_unix,
+                                            int((contest.time + timedelta(minutes=contest.duration_minutes)).timestamp()),
+                                            1, 1, int(contest.rated)))
+                break
+            parsed, snapshot = value.result()
+            metrics.merge(snapshot)
+            if parsed.size == 0:
+                print(f' -> [{slug}] Page {pagenum}: size={parsed.size}')
+            else:
+                print(f' -> [{slug}] Page {pagenum}: size={parsed.size}, min={parsed.first_time}, max={parsed.last_time}')
+            self.writer.upsert_contest((slug, parsed.contest_title, parsed.contest_starttime_unix,
+                                        parsed.contest_endtime_unix, 0, 0, int(contest.rated)))
+            if not self.writer.add_page(slug, pagenum, parsed.rows):
+                break
+            if parsed.is_last_page or parsed.size == 0:
+                break
+            # 求めた範囲の最後のページ（期間の終わりがページの切れ目にあたると，終了後の提出を含まない）
+            if self.locate and self.scheduler.is_stale((index, pagenum + 1)):
+                break
+            pagenum += 1
+        # 書き込みに失敗して打ち切ったときも，先のページは取得しない
+        self.scheduler.set_last_page((index, pagenum))
+        self.writer.mark_completed(slug)
@@ -0,0 +1,5 @@
+class Endpoint:
+    """クローラがアクセスする先のベース URL．ドライランではローカルのスタブサーバに差し替える．"""
+
+    atcoder: str = 'https://atcoder.jp'
+    ac_predictor: str = 'https://data.ac-predictor.com'
@@ -0,0 +1,41 @@
+from __future__ import annotations
+import json
+from pathlib import Path
+from typing import Any, Dict, List
+
+from lib.AtomicFile import atomic_write
+
+Fingerprint = Dict[str, Any]
+
+
+class ExportManifest:
+    """コンテストごとに，前回エクスポートしたときのデータの指紋を記録するマニフェスト．
+
+    指紋が一致し，出力ファイルも残っているコンテストは書き出しを省略できる．
+    """
+
+    path: Path
+    fingerprints: Dict[str, Fingerprint]
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.fingerprints = {}
+        if path.exists():
+            with open(path, encoding="utf-8") as f:
+                self.fingerprints = json.load(f)
+
+    def __repr__(self) -> str:
+        return f"<ExportManifest path={self.path} contests={len(self.fingerprints)}>"
+
+    def is_fresh(self, contest_slug: str, fingerprint: Fingerprint, outputs: List[Path]) -> bool:
+        """前回と指紋が同じで，出力ファイルがすべて存在すれば True を返す．"""
+        return self.fingerprints.get(contest_slug) == fingerprint and all(
+            output.exists() for output in outputs
+        )
+
+    def update(self, contest_slug: str, fingerprint: Fingerprint) -> None:
+        self.fingerprints[contest_slug] = fingerprint
+
+    def save(self) -> None:
+        with atomic_write(self.path) as f:
+            json.dump(self.fingerprints, f, indent=1, sort_keys=True)
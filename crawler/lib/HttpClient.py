@@ -0,0 +1,115 @@
+from __future__ import annotations
+import atexit
+import http.cookiejar
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.models import Response
+from urllib3.util.retry import Retry
+
+from onlinejudge._implementation.utils import default_cookie_path
+
+from lib.Metrics import Metrics
+
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING: str = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+
+class HttpClient:
+    """全ページ取得で共有する HTTP クライアント．
+
+    - 1 つの Session を使い回すので，同じホストへの接続は keep-alive でプールされる
+    - 429 / 5xx は指数バックオフ付きで再試行する（Retry-After ヘッダがあれば従う）
+    - online-judge-tools の Cookie ファイルは実行中に 1 回だけ読み込み，終了時に 1 回だけ保存する
+    """
+
+    default_headers: Dict[str, str] = {'accept-encoding': ACCEPT_ENCODING}
+    retry_status_forcelist = (429, 500, 502, 503, 504)
+
+    __default: Optional[HttpClient] = None
+    __default_lock: threading.Lock = threading.Lock()
+
+    session: requests.Session
+    cookie_path: Optional[Path]
+    timeout: float
+
+    def __init__(self, cookie_path: Optional[Path] = default_cookie_path, pool_maxsize: int = 16,
+                 retries: int = 5, backoff_factor: float = 1.0, timeout: float = 60.0) -> None:
+        """
+        Args:
+            cookie_path (Optional[Path]): Cookie ファイルのパス．None なら Cookie を永続化しない
+            pool_maxsize (int): 1 ホストあたりに保持する接続数（並列クロールのワーカ数以上にする）
+            retries (int): 429 / 5xx / 接続エラー時の最大再試行回数
+            backoff_factor (float): 再試行間隔の係数（backoff_factor * 2^(n-1) 秒）
+            timeout (float): 1 リクエストのタイムアウト秒数
+        """
+        self.cookie_path = cookie_path
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(self.default_headers)
+
+        retry: Retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=self.retry_status_forcelist,
+            allowed_methods=frozenset(['GET']),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter: HTTPAdapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        if cookie_path is not None:
+            cookies: http.cookiejar.LWPCookieJar = http.cookiejar.LWPCookieJar(str(cookie_path))
+            if cookie_path.exists():
+                cookies.load(ignore_discard=True)
+            self.session.cookies = cookies  # type: ignore
+            atexit.register(self.save_cookies)
+
+    def __repr__(self) -> str:
+        return f'<HttpClient cookie_path={self.cookie_path} timeout={self.timeout}>'
+
+    def get(self, url: str, **kwargs: Any) -> Response:
+        kwargs.setdefault('timeout', self.timeout)
+        metrics: Metrics = Metrics.get_default()
+        try:
+            with metrics.timer('http'):
+                response: Response = self.session.get(url, **kwargs)
+        except requests.RequestException:
+            metrics.add('http_errors')
+            raise
+        metrics.add('http_requests')
+        metrics.add('http_bytes', len(response.content))
+        retries: Optional[Retry] = getattr(response.raw, 'retries', None)
+        if retries is not None and len(retries.history) > 0:
+            metrics.add('http_retries', len(retries.history))
+        return response
+
+    def save_cookies(self) -> None:
+        if self.cookie_path is None:
+            return
+        self.cookie_path.parent.mkdir(parents=True, exist_ok=True)
+        self.session.cookies.save(ignore_discard=True)  # type: ignore
+        self.cookie_path.chmod(0o600)
+
+    @classmethod
+    def get_default(cls) -> HttpClient:
+        """プロセス内で共有する HttpClient を返す．"""
+        with cls.__default_lock:
+            if cls.__default is None:
+                cls.__default = cls()
+            return cls.__default
+
+
+# $ cd crawler
+# $ python -m lib.HttpClient
+if __name__ == '__main__':
+    response: Response = HttpClient.get_default().get('https://atcoder.jp/contests/archive')
+    print(response.status_code, response.headers.get('content-encoding'), len(response.content))
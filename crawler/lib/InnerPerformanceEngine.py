@@ -0,0 +1,181 @@
+from __future__ import annotations
+import math
+from typing import Dict, List, Literal, Optional, Tuple
+
+import numpy as np
+
+SolverName = Literal['newton', 'grid']
+SOLVER_NAMES: Tuple[SolverName, ...] = ('newton', 'grid')
+
+
+class InnerPerformanceEngine:
+    """参加者の内部レート一覧から，順位→内部パフォーマンスの対応をまとめて求めるクラス．
+
+    従来の get_inner_perf（bench/inner_perf.py に照合用に残してある）は各順位について [-2048, 6144] を 14 回二分探索するので，
+    探索点は必ず -2048 + 0.5k (k = 1, ..., 16383) のいずれかになる．
+    結果は「期待順位 >= 順位 となる最大の探索点」だけで決まるので，次のどちらかでその探索点を求める．
+
+    - newton: 内部レートの (値, 人数) の組から期待順位とその導関数を求め，探索点の上で Newton 法を行う．
+      順位は昇順なので前の順位の答えから始め，求めた探索点の値は後の順位でも使い回す（既定）
+    - grid: 格子全体で期待順位の曲線を NumPy で一度に計算しておき，全順位をまとめて曲線上でソート済み探索する
+    """
+
+    lower: float = -2048.0
+    upper: float = 6144.0
+    step: float = 0.5
+    chunk_size: int = 1024
+    # NumPy の総和と Python の逐次和の差として許容する幅．これより近い点は厳密に再計算する
+    tolerance: float = 1e-6
+    default_solver: SolverName = 'newton'
+
+    ratings: List[int]
+    solver: SolverName
+    values: np.ndarray
+    counts: np.ndarray
+    grid: np.ndarray
+    curve: Optional[np.ndarray]
+    # 探索点の番号→(期待順位, 導関数)
+    evaluated: Dict[int, Tuple[float, float]]
+
+    def __init__(self, ratings: List[int], solver: Optional[SolverName] = None) -> None:
+        """
+        Args:
+            ratings (List[int]): 参加者の内部レート一覧（昇順）
+            solver (Optional[SolverName]): 順位→内部パフォーマンスの求め方（None なら default_solver）
+        """
+        self.ratings = ratings
+        self.solver = self.default_solver if solver is None else solver
+        # 内部レートは重複が多い（新規参加者は全員 1000）ので，値と人数の組に圧縮する
+        values, counts = np.unique(np.asarray(ratings, dtype=np.float64), return_counts=True)
+        self.values = values
+        self.counts = counts.astype(np.float64)
+        num: int = int(round((self.upper - self.lower) / self.step))
+        self.grid = self.lower + self.step * np.arange(num + 1, dtype=np.float64)
+        self.curve = None
+        self.evaluated = {}
+
+    def __build_curve(self) -> np.ndarray:
+        curve: np.ndarray = np.empty(len(self.grid), dtype=np.float64)
+        log6: float = float(np.log(6.0))
+        for begin in range(0, len(self.grid), self.chunk_size):
+            x: np.ndarray = self.grid[begin:begin + self.chunk_size]
+            exponent: np.ndarray = (x[:, None] - self.values[None, :]) / 400.0
+            curve[begin:begin + len(x)] = 0.5 + (self.counts / (1.0 + np.exp(exponent * log6))).sum(axis=1)
+        # 丸め誤差で単調性が崩れないよう，単調非増加に揃える
+        return np.minimum.accumulate(curve)
+
+    def get_rated_rank(self, X: float) -> float:
+        """従来の get_rated_rank（bench/inner_perf.py）と同じ順序で和を取った期待順位を返す．"""
+        ret: float = 0.5
+        for rating in self.ratings:
+            ret += 1.0 / (1.0 + pow(6.0, (X - rating) / 400.0))
+        return ret
+
+    def get_borders(self) -> List[float]:
+        """色境界（400 刻み）に対応する期待順位を返す．JSON の出力を変えないよう Python の逐次和で計算する．"""
+        borders: List[float] = []
+        for perf in range(400, 2800 + 1, 400):
+            expected_accepted_count: float = 0
+            for rating in self.ratings:
+                expected_accepted_count += 1 / (1 + pow(6, (perf - rating) / 400))
+            borders.append(expected_accepted_count + 0.5)
+        return borders
+
+    def __bisect(self, rated_rank: int) -> int:
+        upper: float = self.upper
+        lower: float = self.lower
+        while upper - lower > 0.5:
+            mid: float = (upper + lower) / 2
+            if rated_rank > self.get_rated_rank(mid):
+                upper = mid
+            else:
+                lower = mid
+        return round((upper + lower) / 2)
+
+    def get_inner_perfs(self) -> List[int]:
+        """1 位から参加者数位までの内部パフォーマンスを返す．
+
+        Returns:
+            List[int]: i 番目が (i+1) 位の内部パフォーマンス
+        """
+        if self.solver == 'newton':
+            return self.__solve_newton()
+        return self.__solve_grid()
+
+    def __evaluate(self, k: int) -> Tuple[float, float]:
+        """探索点 grid[k] での期待順位と，その導関数の値を返す．"""
+        cached: Optional[Tuple[float, float]] = self.evaluated.get(k)
+        if cached is not None:
+            return cached
+        # 1 / (1 + 6^((x - r) / 400)) の r についての和と，x についての微分
+        c: float = math.log(6.0) / 400.0
+        e: np.ndarray = np.exp((self.grid[k] - self.values) * c)
+        s: np.ndarray = self.counts / (1.0 + e)
+        ret: Tuple[float, float] = (0.5 + float(s.sum()), -c * float((s * e / (1.0 + e)).sum()))
+        self.evaluated[k] = ret
+        return ret
+
+    def __expected_rank(self, k: int) -> float:
+        # 端点は探索しないので，f(lower) = +inf，f(upper) = -inf とみなす
+        if k <= 0:
+            return math.inf
+        if k >= len(self.grid) - 1:
+            return -math.inf
+        return self.__evaluate(k)[0]
+
+    def __solve_newton(self) -> List[int]:
+        last: int = len(self.grid) - 1
+        result: List[int] = []
+        if len(self.ratings) == 0:
+            return result
+        # 探索点の番号 lo < hi で，f(grid[lo]) >= rank > f(grid[hi]) を保つ
+        lo: int = 0
+        hi: int = last
+        # 1 位は最高の内部レートの近くから始める
+        k: int = min(max(int(round((self.values[-1] - self.lower) / self.step)), 1), last - 1)
+        for rank in range(1, len(self.ratings) + 1):
+            # f(grid[lo + 1]) < rank - 1 < rank なので，前の順位の上側の探索点はそのまま上端に使える
+            if rank > 1:
+                hi = lo + 1
+                k = lo
+                lo = 0
+            while hi - lo > 1:
+                k = min(max(k, lo + 1), hi - 1)
+                value, derivative = self.__evaluate(k)
+                if value >= rank:
+                    lo = k
+                else:
+                    hi = k
+                if hi - lo <= 1:
+                    break
+                # Newton 法で次の探索点を決め，区間の外に出るなら二分する
+                move: int = int(round((rank - value) / derivative / self.step)) if derivative < 0 else 0
+                if move == 0:
+                    move = 1 if value >= rank else -1
+                k += move
+                if not (lo < k < hi):
+                    k = (lo + hi) // 2
+            # 期待順位が順位に極めて近い探索点があれば，元の二分探索で厳密に求める
+            if self.__expected_rank(lo) - rank < self.tolerance or rank - self.__expected_rank(hi) < self.tolerance:
+                result.append(self.__bisect(rank))
+            else:
+                # f(lower) >= rank を満たす最大の探索点が lower になり，結果は ceil(lower) になる
+                result.append(int(self.lower) + (lo + 1) // 2)
+        return result
+
+    def __solve_grid(self) -> List[int]:
+        if self.curve is None:
+            self.curve = self.__build_curve()
+        ranks: np.ndarray = np.arange(1, len(self.ratings) + 1, dtype=np.float64)
+        # 曲線は単調非増加なので，符号を反転して昇順にしてから探索する
+        # 探索点は端点を除いた grid[1:-1]
+        inner: np.ndarray = -self.curve[1:-1]
+        count_lo: np.ndarray = np.searchsorted(inner, -(ranks + self.tolerance), side='right')
+        count_hi: np.ndarray = np.searchsorted(inner, -(ranks - self.tolerance), side='right')
+        # f(lower) >= rank を満たす最大の探索点が lower になり，結果は ceil(lower) になる
+        perfs: np.ndarray = self.lower + (count_lo + 1) // 2
+        result: List[int] = [int(perf) for perf in perfs]
+        # 曲線が順位に極めて近い点をまたぐ順位は，元の二分探索で厳密に求める
+        for i in np.nonzero(count_lo != count_hi)[0]:
+            result[i] = self.__bisect(int(i) + 1)
+        return result
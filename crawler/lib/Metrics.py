@@ -0,0 +1,220 @@
+from __future__ import annotations
+import atexit
+import contextlib
+import json
+import math
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from lib.AtomicFile import atomic_write
+
+# stage→[回数, 合計秒数, 最大秒数]，カウンタ名→合計値，ゲージ名→[最後の値, 最大値, 合計, 回数]，
+# （keep_samples なら）stage→各回の秒数
+MetricsSnapshot = Dict[str, Dict[str, Any]]
+
+# 形式を変えたら上げる
+METRICS_FORMAT_VERSION: int = 2
+
+PROMETHEUS_PREFIX: str = 'marathon_replay'
+
+# keep_samples のときにレポートに載せるパーセンタイル
+PERCENTILES: List[int] = [50, 90, 99]
+
+
+class Metrics:
+    """実行中の段階（ネットワーク，待機，パース，DB 書き込み，JSON 書き出しなど）ごとの時間と，
+    ページ数・行数・バイト数・再試行回数などのカウンタを集計し，終了時に機械可読なレポートとして書き出すクラス．
+
+    - 段階ごとに回数・合計秒数・最大秒数を持つ（1 ページや 1 コンテストといった粒度で記録し，1 行ごとには記録しない）
+    - キューの長さのように増減する値はゲージとして記録し，最後の値・最大値・平均を持つ
+    - 複数スレッドから同時に記録してよい
+    - ワーカプロセスで記録したものは drain で取り出し，親プロセスで merge する
+    - レポートは拡張子が .prom なら Prometheus のテキスト形式（node_exporter の textfile collector 向け），それ以外は JSON
+    - keep_samples なら各回の秒数も残し，レポートにパーセンタイルを載せる（ベンチマーク用）
+    """
+
+    __default: Optional[Metrics] = None
+    __default_lock: threading.Lock = threading.Lock()
+
+    command: str
+    started_at: float
+    started: float
+    timers: Dict[str, List[float]]
+    counters: Dict[str, float]
+    gauges: Dict[str, List[float]]
+    keep_samples: bool
+    samples: Dict[str, List[float]]
+    lock: threading.Lock
+
+    def __init__(self, command: str = '', keep_samples: bool = False) -> None:
+        """
+        Args:
+            command (str): レポートに載せるコマンド名（crawl, export など）
+            keep_samples (bool): 各回の秒数を残すか
+        """
+        self.command = command
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.timers = {}
+        self.counters = {}
+        self.gauges = {}
+        self.keep_samples = keep_samples
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f'<Metrics command={self.command} timers={len(self.timers)} counters={len(self.counters)}>'
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """stage に seconds 秒かかったことを記録する．"""
+        with self.lock:
+            timer: Optional[List[float]] = self.timers.get(stage)
+            if timer is None:
+                self.timers[stage] = [1, seconds, seconds]
+            else:
+                timer[0] += 1
+                timer[1] += seconds
+                timer[2] = max(timer[2], seconds)
+            if self.keep_samples:
+                self.samples.setdefault(stage, []).append(seconds)
+
+    @contextlib.contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """with ブロックの経過時間を stage の時間として記録する（例外で抜けたときも記録する）．"""
+        start: float = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def add(self, name: str, value: float = 1) -> None:
+        """カウンタ name に value を足す．"""
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name: str, value: float) -> None:
+        """ゲージ name の現在の値を記録する．"""
+        with self.lock:
+            gauge: Optional[List[float]] = self.gauges.get(name)
+            if gauge is None:
+                self.gauges[name] = [value, value, value, 1]
+            else:
+                gauge[0] = value
+                gauge[1] = max(gauge[1], value)
+                gauge[2] += value
+                gauge[3] += 1
+
+    def drain(self) -> MetricsSnapshot:
+        """ここまでの記録を取り出して空にする．"""
+        with self.lock:
+            snapshot: MetricsSnapshot = {'timers': self.timers, 'counters': self.counters, 'gauges': self.gauges,
+                                         'samples': self.samples}
+            self.timers = {}
+            self.counters = {}
+            self.gauges = {}
+            self.samples = {}
+        return snapshot
+
+    def merge(self, snapshot: MetricsSnapshot) -> None:
+        """drain で取り出した記録を足し合わせる．"""
+        with self.lock:
+            for stage, (count, total, maximum) in snapshot['timers'].items():
+                timer: Optional[List[float]] = self.timers.get(stage)
+                if timer is None:
+                    self.timers[stage] = [count, total, maximum]
+                else:
+                    timer[0] += count
+                    timer[1] += total
+                    timer[2] = max(timer[2], maximum)
+            for name, value in snapshot['counters'].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            for name, (last, maximum, total, count) in snapshot.get('gauges', {}).items():
+                gauge: Optional[List[float]] = self.gauges.get(name)
+                if gauge is None:
+                    self.gauges[name] = [last, maximum, total, count]
+                else:
+                    gauge[0] = last
+                    gauge[1] = max(gauge[1], maximum)
+                    gauge[2] += total
+                    gauge[3] += count
+            if self.keep_samples:
+                for stage, seconds in snapshot.get('samples', {}).items():
+                    self.samples.setdefault(stage, []).extend(seconds)
+
+    def report(self) -> Dict[str, Any]:
+        with self.lock:
+            stages: Dict[str, Dict[str, Any]] = {}
+            for stage, (count, total, maximum) in sorted(self.timers.items()):
+                stages[stage] = {'count': int(count), 'total_sec': total, 'max_sec': maximum}
+                if stage in self.samples:
+                    seconds: List[float] = sorted(self.samples[stage])
+                    for q in PERCENTILES:
+                        stages[stage][f'p{q}_sec'] = percentile(seconds, q)
+            return {
+                'version': METRICS_FORMAT_VERSION,
+                'command': self.command,
+                'started_at': int(self.started_at),
+                'elapsed_sec': time.perf_counter() - self.started,
+                'stages': stages,
+                'counters': dict(sorted(self.counters.items())),
+                'gauges': {name: {'last': last, 'max': maximum, 'mean': total / count}
+                           for name, (last, maximum, total, count) in sorted(self.gauges.items())},
+            }
+
+    def to_prometheus(self) -> str:
+        """Prometheus のテキスト形式にする．カウンタ foo は {PROMETHEUS_PREFIX}_foo_total，
+        ゲージ bar は {PROMETHEUS_PREFIX}_bar（最後の値）と {PROMETHEUS_PREFIX}_bar_max になる．
+        """
+        report: Dict[str, Any] = self.report()
+        label: str = f'command="{report["command"]}"'
+        lines: List[str] = [
+            f'# TYPE {PROMETHEUS_PREFIX}_run_started_timestamp_seconds gauge',
+            f'{PROMETHEUS_PREFIX}_run_started_timestamp_seconds{{{label}}} {report["started_at"]}',
+            f'# TYPE {PROMETHEUS_PREFIX}_run_duration_seconds gauge',
+            f'{PROMETHEUS_PREFIX}_run_duration_seconds{{{label}}} {report["elapsed_sec"]!r}',
+        ]
+        for suffix, key in (('seconds_total', 'total_sec'), ('calls_total', 'count'), ('seconds_max', 'max_sec')):
+            lines.append(f'# TYPE {PROMETHEUS_PREFIX}_stage_{suffix} {"gauge" if key == "max_sec" else "counter"}')
+            for stage, timer in report['stages'].items():
+                lines.append(f'{PROMETHEUS_PREFIX}_stage_{suffix}{{{label},stage="{stage}"}} {timer[key]!r}')
+        for name, value in report['counters'].items():
+            metric: str = f'{PROMETHEUS_PREFIX}_{re.sub(r"[^a-zA-Z0-9_]", "_", name)}_total'
+            lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{metric}{{{label}}} {value!r}')
+        for name, gauge in report['gauges'].items():
+            metric = f'{PROMETHEUS_PREFIX}_{re.sub(r"[^a-zA-Z0-9_]", "_", name)}'
+            lines.append(f'# TYPE {metric} gauge')
+            lines.append(f'{metric}{{{label}}} {gauge["last"]!r}')
+            lines.append(f'# TYPE {metric}_max gauge')
+            lines.append(f'{metric}_max{{{label}}} {gauge["max"]!r}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: Path) -> None:
+        """レポートを書き出す．書き終えてから置き換えるので，収集側が書きかけのファイルを読むことはない．"""
+        with atomic_write(path) as f:
+            if path.suffix == '.prom':
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.report(), f, indent=2)
+
+    def write_at_exit(self, path: Path) -> None:
+        """プロセスの終了時（例外で落ちたときも）にレポートを書き出す．"""
+        atexit.register(self.write, path)
+
+    @classmethod
+    def get_default(cls) -> Metrics:
+        """プロセス内で共有する Metrics を返す．"""
+        with cls.__default_lock:
+            if cls.__default is None:
+                cls.__default = cls()
+            return cls.__default
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """昇順に並んだ値の q パーセンタイルを，最近傍順位法で返す．"""
+    assert len(sorted_values) > 0
+    rank: int = max(1, math.ceil(len(sorted_values) * q / 100))
+    return sorted_values[rank - 1]
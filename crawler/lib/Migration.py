@@ -0,0 +1,61 @@
+from __future__ import annotations
+import re
+import sqlite3
+from pathlib import Path
+from typing import List, Match, Optional, Pattern, Tuple
+
+MIGRATIONS_DIR: Path = Path(__file__).resolve().parent.parent / 'migrations'
+
+migration_filename_pattern: Pattern[str] = re.compile(r'^(\d+)_.*\.sql$')
+
+
+def get_migrations(migrations_dir: Path = MIGRATIONS_DIR) -> List[Tuple[int, Path]]:
+    """migrations/NNNN_*.sql をバージョン番号順に返す．"""
+    migrations: List[Tuple[int, Path]] = []
+    for path in migrations_dir.iterdir():
+        match: Optional[Match[str]] = migration_filename_pattern.match(path.name)
+        if match is not None:
+            migrations.append((int(match.group(1)), path))
+    migrations.sort()
+    return migrations
+
+
+def get_version(conn: sqlite3.Connection) -> int:
+    return int(conn.execute('PRAGMA user_version').fetchone()[0])
+
+
+def migrate(conn: sqlite3.Connection, target: Optional[int] = None, verbose: bool = False) -> int:
+    """DB のスキーマを PRAGMA user_version で管理し，未適用のマイグレーションを順に適用する．
+
+    各マイグレーションは 1 トランザクションで適用するので，途中で失敗しても元のバージョンのまま残る．
+    旧 db_create.sql で作った DB（user_version = 0）は，0001 が no-op になり 0002 以降が適用される．
+
+    Args:
+        conn (sqlite3.Connection): 対象の DB 接続
+        target (Optional[int]): このバージョンまで適用する．None なら最新まで
+        verbose (bool): 適用したマイグレーションを表示する
+
+    Returns:
+        int: 適用後のバージョン
+    """
+    version: int = get_version(conn)
+    for number, path in get_migrations():
+        if number <= version or (target is not None and number > target):
+            continue
+        sql: str = path.read_text(encoding='utf-8')
+        try:
+            conn.executescript(f'BEGIN;\n{sql}\nPRAGMA user_version = {number};\nCOMMIT;')
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        version = number
+        if verbose:
+            print(f'applied {path.name}')
+    return version
+
+
+def connect(database: str, timeout: float = 60) -> sqlite3.Connection:
+    """DB に接続し，スキーマを最新にしてから返す．"""
+    conn: sqlite3.Connection = sqlite3.connect(database, timeout=timeout)
+    migrate(conn)
+    return conn
@@ -0,0 +1,90 @@
+from __future__ import annotations
+import gzip
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from lib.AtomicFile import atomic_write
+
+PageArchiveEntry = Tuple[int, int, str]  # pagenum, fetched_at, sha256
+
+
+class PageArchive:
+    """取得した提出一覧ページの HTML を保存しておく，内容アドレス方式のアーカイブ．
+
+    HTML 本体は sha256 をキーに objects/ab/cdef....html.gz として gzip 圧縮で保存し，
+    同じ内容のページは 1 つだけ持つ．(contest, pagenum, fetched_at) → sha256 の対応は
+    index.db に記録する．パーサを変えたときは，ネットワークにアクセスせずにここから再パースできる．
+    """
+
+    root: Path
+    conn: sqlite3.Connection
+    lock: threading.Lock
+
+    def __init__(self, root: Path) -> None:
+        """
+        Args:
+            root (Path): アーカイブのディレクトリ．なければ作成する
+        """
+        self.root = root
+        (root / 'objects').mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(root / 'index.db'), timeout=60, check_same_thread=False)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS pages('
+                          '    contest TEXT,'
+                          '    pagenum INTEGER,'
+                          '    fetched_at INTEGER,'
+                          '    sha256 TEXT,'
+                          '    PRIMARY KEY(contest, pagenum, fetched_at)'
+                          ')')
+        self.conn.commit()
+
+    def __repr__(self) -> str:
+        return f'<PageArchive root={self.root}>'
+
+    def object_path(self, sha256: str) -> Path:
+        return self.root / 'objects' / sha256[:2] / f'{sha256[2:]}.html.gz'
+
+    def put(self, contest: str, pagenum: int, html: str, fetched_at: Optional[int] = None) -> str:
+        """ページを保存する．
+
+        Returns:
+            str: HTML の sha256
+        """
+        data: bytes = html.encode('utf-8')
+        sha256: str = hashlib.sha256(data).hexdigest()
+        path: Path = self.object_path(sha256)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with atomic_write(path, mode='wb', per_thread=True) as f:
+                f.write(gzip.compress(data))
+        with self.lock:
+            self.conn.execute('INSERT OR REPLACE INTO pages VALUES (?,?,?,?)',
+                              (contest, pagenum, int(time.time()) if fetched_at is None else fetched_at, sha256))
+            self.conn.commit()
+        return sha256
+
+    def get(self, sha256: str) -> str:
+        return self.read_object(self.object_path(sha256))
+
+    @staticmethod
+    def read_object(path: Path) -> str:
+        """object_path のファイルを読む．index.db を開かないので，別プロセスからも呼べる．"""
+        return gzip.decompress(path.read_bytes()).decode('utf-8')
+
+    def contests(self) -> List[str]:
+        with self.lock:
+            return [row[0] for row in self.conn.execute('SELECT DISTINCT contest FROM pages ORDER BY contest')]
+
+    def latest_pages(self, contest: str) -> List[PageArchiveEntry]:
+        """各ページ番号について最後に取得したものを，ページ番号順に返す．"""
+        with self.lock:
+            return [(row[0], row[1], row[2]) for row in self.conn.execute(
+                'SELECT pagenum, MAX(fetched_at), sha256 FROM pages WHERE contest = ? '
+                'GROUP BY pagenum ORDER BY pagenum ASC', (contest,))]
+
+    def close(self) -> None:
+        self.conn.close()
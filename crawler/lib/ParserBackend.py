@@ -0,0 +1,29 @@
+from datetime import timedelta, timezone
+from typing import Literal, Tuple
+
+BackendName = Literal["bs4", "lxml"]
+BACKEND_NAMES: Tuple[BackendName, ...] = ("bs4", "lxml")
+
+# AtCoder のページの日時はすべて日本時間（+09:00）．ホストのタイムゾーンによらない UNIX 時刻にするため，これを付けてからパースする
+JST: timezone = timezone(timedelta(hours=9), "JST")
+
+
+class ParserBackend:
+    """ページクラス（SubmissionListPage, TaskListPage, ContestListPage）が使う HTML パーサ．
+
+    bs4 は BeautifulSoup (html.parser) による従来の実装で，結果の基準になる．
+    lxml は対象の表だけを XPath で取り出す高速な実装で，合成ページ（bench/parser.py）では bs4 と同じ結果を返す．
+    実際の AtCoder のページでの一致はまだ確かめていないので，既定は bs4 のままにし，lxml は crawl.py --parser lxml で選ぶ．
+    """
+
+    default: BackendName = "bs4"
+
+
+def class_xpath(class_name: str) -> str:
+    """CSS の .class_name に相当する XPath の述語を返す．"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+
+
+TABLE_ROWS_XPATH: str = (
+    f"//div[{class_xpath('table-responsive')}]//table[{class_xpath('table')}]//tbody//tr"
+)
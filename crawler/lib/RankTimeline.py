@@ -0,0 +1,349 @@
+from __future__ import annotations
+import json
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+from lib.AtomicFile import write_json
+from lib.BinaryIndexedTree import BinaryIndexedTree
+
+Score = Union[int, float]
+RankChartData = Dict[str, Union[str, int, float]]
+
+# 形式を変えたら上げる
+RANK_TIMELINE_FORMAT_VERSION: int = 1
+
+
+class ContestUserState:
+    """フロントエンドの RankReproducer.ts の ContestUserState と同じ規則で，ユーザの得点を持つ．"""
+
+    task_score_map: Dict[int, Score]
+    score: Score
+
+    def __init__(self) -> None:
+        self.task_score_map = {}
+        self.score = 0
+
+    def __repr__(self) -> str:
+        return f'<ContestUserState score={self.score}>'
+
+    def add_submission(self, task: int, val: Score, inverted: bool) -> None:
+        if task in self.task_score_map:
+            # 2回目以降の提出
+            cur_val: Score = self.task_score_map[task]
+            if inverted:
+                # loss 増加
+                if cur_val == 0:
+                    # 前回も今回も 0 点なら無視する
+                    if val == 0:
+                        return
+                elif cur_val < val or val == 0:
+                    return
+            else:
+                # score 減少
+                if cur_val > val:
+                    return
+            self.score += val - cur_val
+        else:
+            # 初回提出
+            self.score += val
+        self.task_score_map[task] = val
+
+
+class RankTimelines:
+    """全ユーザぶんの，getRankSequence の結果に相当する順位・得点の変化点．
+
+    ユーザ t の変化点は (提出の位置 k, 順位) の列で，提出 k のユーザが t なら得点更新（update），
+    そうでなければ t がその提出のユーザに追い抜かれた（overtook）ことを表す．
+    得点はどちらも changes[k] = (更新前の得点, 更新後の得点) から復元できる．
+    """
+
+    positions: List[array]
+    ranks: List[array]
+    changes: Dict[int, Tuple[Score, Score]]
+
+    def __init__(self, num_users: int) -> None:
+        self.positions = [array('l') for _ in range(num_users)]
+        self.ranks = [array('l') for _ in range(num_users)]
+        self.changes = {}
+
+    def __repr__(self) -> str:
+        return f'<RankTimelines users={len(self.positions)} events={self.num_events()}>'
+
+    def num_events(self) -> int:
+        return sum(len(positions) for positions in self.positions)
+
+
+def get_compressed_scores(
+    user_indexes: Sequence[int], task_indexes: Sequence[int], scores: Sequence[Score], inverted: bool
+) -> List[Score]:
+    """一度目のシミュレートで，ありうる得点を並べたもの（座圧の添字→得点）を返す．"""
+    states: Dict[int, ContestUserState] = {}
+    score_set: Set[Score] = {0}
+    for user, task, val in zip(user_indexes, task_indexes, scores):
+        state: Optional[ContestUserState] = states.get(user)
+        if state is None:
+            state = states[user] = ContestUserState()
+        state.add_submission(task, val, inverted)
+        score_set.add(state.score)
+    # 得点に重複はないので，JS の Set を数値順に並べたものと同じになる
+    compressed: List[Score] = sorted(score_set)
+    if inverted:
+        # 0, Max, Max-1, ..., 2, 1 の順にする
+        compressed.reverse()
+        compressed.pop()
+        compressed.insert(0, 0)
+    return compressed
+
+
+def replay_rank_timelines(
+    user_indexes: Sequence[int],
+    task_indexes: Sequence[int],
+    scores: Sequence[Score],
+    num_users: int,
+    inverted: bool,
+) -> RankTimelines:
+    """コンテストの提出を 1 回だけ再生して，全ユーザの順位の変化点を求める．
+
+    getRankSequence はユーザごとに全提出を再生するが，対象ユーザによって変わるのは
+    「誰に追い抜かれたか」の判定だけなので，各ユーザが今いる得点（座圧後の添字）ごとに
+    ユーザを分けて持ち，ある提出で得点が変わったときに，その区間にいるユーザにだけ追い抜きを記録する．
+
+    afterTargetUser の扱いも getRankSequence と同じにする．提出者 u が対象 t と同点の位置から
+    抜け出したとき，追い抜きになるのは「u が最後に得点を変えた時点で t もその得点にいた」か
+    「u がまだ一度も得点を変えていない」場合である．
+
+    Args:
+        user_indexes (Sequence[int]): 提出ごとのユーザ（0 <= . < num_users）
+        task_indexes (Sequence[int]): 提出ごとの問題
+        scores (Sequence[Score]): 提出ごとの得点（エクスポートされる JSON と同じ値）
+        num_users (int): ユーザ数
+        inverted (bool): loss を小さくするコンテストか
+
+    Returns:
+        RankTimelines: 全ユーザの変化点
+    """
+    compressed: List[Score] = get_compressed_scores(user_indexes, task_indexes, scores, inverted)
+    compress: Dict[Score, int] = {}
+    for index, score in enumerate(compressed):
+        compress[score] = index
+
+    timelines: RankTimelines = RankTimelines(num_users)
+    bit: BinaryIndexedTree = BinaryIndexedTree(len(compressed))  # 各得点に何人いるか
+    bit.add(compress[0], len(set(user_indexes)))  # 全員を 0 点として扱う
+
+    # 対象ユーザとしての状態．getRankSequence の curIndex, curRank と同じく 0, 1 から始まる
+    cur_indexes: List[int] = [0] * num_users
+    cur_ranks: List[int] = [1] * num_users
+    # 添字→その添字にいるユーザ→そこに着いた提出の位置（着いた順）
+    buckets: Dict[int, Dict[int, int]] = {0: {user: -1 for user in range(num_users)}}
+    occupied: List[int] = [0]  # ユーザのいる添字（昇順）
+    # 対象ユーザとして一度離れた添字に戻ってきたことがあるユーザのための，(位置, 添字) の履歴
+    histories: List[List[Tuple[int, int]]] = [[(-1, 0)] for _ in range(num_users)]
+    visited: List[Set[int]] = [{0} for _ in range(num_users)]
+    revisitors: Dict[int, Set[int]] = {}
+    # 提出者としての状態：最後に得点を変えた提出の位置
+    states: Dict[int, ContestUserState] = {}
+    last_changes: List[int] = [-1] * num_users
+
+    def index_at(t: int, k: int) -> int:
+        """提出 k の時点での，対象ユーザ t の添字"""
+        history: List[Tuple[int, int]] = histories[t]
+        return history[bisect_left(history, (k, -1)) - 1][1]
+
+    def overtake(t: int, k: int) -> None:
+        cur_ranks[t] += 1
+        timelines.positions[t].append(k)
+        timelines.ranks[t].append(cur_ranks[t])
+
+    for k, (user, task, val) in enumerate(zip(user_indexes, task_indexes, scores)):
+        state: Optional[ContestUserState] = states.get(user)
+        if state is None:
+            state = states[user] = ContestUserState()
+        old_score: Score = state.score
+        state.add_submission(task, val, inverted)
+        new_score: Score = state.score
+        if new_score == old_score:
+            continue
+        timelines.changes[k] = (old_score, new_score)
+        old_index: int = compress[old_score]
+        new_index: int = compress[new_score]
+        bit.add(old_index, -1)
+        bit.add(new_index, 1)
+
+        if old_index < new_index:
+            # 得点がその間にいるユーザは追い抜かれる
+            lo: int = bisect_right(occupied, old_index)
+            hi: int = bisect_left(occupied, new_index)
+            for index in occupied[lo:hi]:
+                for t in buckets[index]:
+                    if t != user:
+                        overtake(t, k)
+            # 同点だったユーザは，最後に得点を変えたときに相手もその得点にいれば追い抜かれる
+            bucket: Optional[Dict[int, int]] = buckets.get(old_index)
+            if bucket is not None:
+                last_change: int = last_changes[user]
+                for t, arrived in bucket.items():
+                    if arrived >= last_change and last_change >= 0:
+                        break
+                    if t != user:
+                        overtake(t, k)
+                if last_change >= 0:
+                    for t in revisitors.get(old_index, ()):
+                        if t != user and bucket[t] >= last_change and index_at(t, last_change) == old_index:
+                            overtake(t, k)
+        last_changes[user] = k
+
+        # 提出者自身の得点更新．curScore 以上の得点を取っている人数が順位
+        rank: int = bit.query(new_index, len(compressed))
+        timelines.positions[user].append(k)
+        timelines.ranks[user].append(rank)
+        cur_ranks[user] = rank
+        cur_index: int = cur_indexes[user]
+        del buckets[cur_index][user]
+        revisitors.get(cur_index, set()).discard(user)
+        if not buckets[cur_index]:
+            del buckets[cur_index]
+            occupied.pop(bisect_left(occupied, cur_index))
+        if new_index not in buckets:
+            buckets[new_index] = {}
+            insort(occupied, new_index)
+        buckets[new_index][user] = k
+        if new_index in visited[user]:
+            revisitors.setdefault(new_index, set()).add(user)
+        visited[user].add(new_index)
+        histories[user].append((k, new_index))
+        cur_indexes[user] = new_index
+    return timelines
+
+
+def write_rank_timelines(
+    directory: Path,
+    users: Sequence[str],
+    tasks: Sequence[str],
+    statuses: Sequence[str],
+    time_unixes: Sequence[int],
+    user_indexes: Sequence[int],
+    task_indexes: Sequence[int],
+    status_indexes: Sequence[int],
+    scores: Sequence[Score],
+    inverted: bool,
+    users_per_shard: int = 64,
+) -> int:
+    """全ユーザの順位の変化点を，ユーザごとに分けたシャードと索引に書き出す．
+
+    - index.json: ユーザ名→シャード番号
+    - {シャード番号}.json: そのシャードのユーザが参照する提出（得点の変化）の表と，
+      ユーザごとの（表の添字, 順位）の列．どちらも差分で持つ
+
+    Returns:
+        int: シャード数
+    """
+    timelines: RankTimelines = replay_rank_timelines(user_indexes, task_indexes, scores, len(users), inverted)
+    num_shards: int = max(1, -(-len(users) // users_per_shard))
+    directory.mkdir(parents=True, exist_ok=True)
+    written: Set[str] = set()
+    for shard in range(num_shards):
+        owners: range = range(shard, len(users), num_shards)
+        positions: List[int] = sorted({k for t in owners for k in timelines.positions[t]})
+        change_indexes: Dict[int, int] = {k: i for i, k in enumerate(positions)}
+        shard_users: Dict[int, int] = {}
+        for k in positions:
+            shard_users.setdefault(user_indexes[k], len(shard_users))
+        shard_timelines: Dict[str, Dict[str, List[int]]] = {}
+        for t in owners:
+            shard_timelines[users[t]] = {
+                'change': delta_encode(change_indexes[k] for k in timelines.positions[t]),
+                'rank': delta_encode(timelines.ranks[t]),
+            }
+        data: Dict[str, Any] = {
+            'version': RANK_TIMELINE_FORMAT_VERSION,
+            'users': [users[u] for u in shard_users],
+            'tasks': list(tasks),
+            'statuses': list(statuses),
+            'changes': {
+                'time_unix': [time_unixes[k] for k in positions],
+                'user': [shard_users[user_indexes[k]] for k in positions],
+                'task': [task_indexes[k] for k in positions],
+                'status': [status_indexes[k] for k in positions],
+                'old_score': [timelines.changes[k][0] for k in positions],
+                'new_score': [timelines.changes[k][1] for k in positions],
+            },
+            'timelines': shard_timelines,
+        }
+        write_json(directory / f'{shard}.json', data)
+        written.add(f'{shard}.json')
+    write_json(directory / 'index.json', {
+        'version': RANK_TIMELINE_FORMAT_VERSION,
+        'inverted': inverted,
+        'shards': num_shards,
+        'users': {user_name: i % num_shards for i, user_name in enumerate(users)},
+    })
+    written.add('index.json')
+    # ユーザが減ってシャード数が減ったときの古いシャードを消す
+    for path in directory.glob('*.json'):
+        if path.name not in written:
+            path.unlink()
+    return num_shards
+
+
+def delta_encode(values: Iterable[int]) -> List[int]:
+    ret: List[int] = []
+    last: int = 0
+    for value in values:
+        ret.append(value - last)
+        last = value
+    return ret
+
+
+def read_rank_sequence(directory: Path, user: str) -> List[RankChartData]:
+    """getRankSequence(user, contestSubmissions, inverted) と同じ列を，索引と 1 シャードだけから返す．"""
+    with open(directory / 'index.json', encoding='utf-8') as f:
+        index: Dict[str, Any] = json.load(f)
+    if index['version'] != RANK_TIMELINE_FORMAT_VERSION:
+        raise ValueError(f'unsupported rank timeline format version: {index["version"]}')
+    if user not in index['users']:
+        return []
+    with open(directory / f'{index["users"][user]}.json', encoding='utf-8') as f:
+        shard: Dict[str, Any] = json.load(f)
+    users: List[str] = shard['users']
+    tasks: List[str] = shard['tasks']
+    statuses: List[str] = shard['statuses']
+    changes: Dict[str, List[Any]] = shard['changes']
+    timeline: Dict[str, List[int]] = shard['timelines'][user]
+
+    seq: List[RankChartData] = []
+    cur_score: Score = 0
+    i: int = 0
+    rank: int = 0
+    for change_delta, rank_delta in zip(timeline['change'], timeline['rank']):
+        i += change_delta
+        rank += rank_delta
+        mover: str = users[changes['user'][i]]
+        if mover == user:
+            cur_score = changes['new_score'][i]
+            seq.append({
+                'user': user,
+                'type': 'update',
+                'time_unix': changes['time_unix'][i],
+                'rank': rank,
+                'score': cur_score,
+                'oldScore': changes['old_score'][i],
+                'task': tasks[changes['task'][i]],
+                'status': statuses[changes['status'][i]],
+            })
+        else:
+            seq.append({
+                'user': user,
+                'type': 'overtook',
+                'time_unix': changes['time_unix'][i],
+                'rank': rank,
+                'score': cur_score,
+                'overtakeUserName': mover,
+                'overtakeUserOldScore': changes['old_score'][i],
+                'overtakeUserNewScore': changes['new_score'][i],
+                'task': tasks[changes['task'][i]],
+                'status': statuses[changes['status'][i]],
+            })
+    return seq
@@ -0,0 +1,53 @@
+from __future__ import annotations
+import threading
+import time
+
+from lib.Metrics import Metrics
+
+
+class TokenBucketRateLimiter:
+    """複数スレッドで共有するトークンバケット方式のレートリミッタ．
+
+    acquire() を呼んだ順にトークンを予約し，足りない分だけ待つ．
+    rate=1/3, capacity=1 ならば従来の「1 リクエストごとに time.sleep(3)」と同じ間隔になる．
+    """
+
+    rate: float
+    capacity: float
+    tokens: float
+    last: float
+    lock: threading.Lock
+
+    def __init__(self, rate: float = 1 / 3, capacity: float = 1.0) -> None:
+        """
+        Args:
+            rate (float): 1 秒あたりに補充されるトークン数（requests per second）
+            capacity (float): バケットの容量（連続で送れるリクエスト数）
+        """
+        assert rate > 0
+        assert capacity >= 1
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f'<TokenBucketRateLimiter rate={self.rate} capacity={self.capacity}>'
+
+    def acquire(self) -> float:
+        """トークンを 1 つ取得する．取得できるまでブロックする．
+
+        Returns:
+            float: 待った秒数
+        """
+        with self.lock:
+            now: float = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            self.tokens -= 1
+            wait: float = max(0.0, -self.tokens / self.rate)
+        if wait > 0:
+            time.sleep(wait)
+            Metrics.get_default().observe('rate_limit_wait', wait)
+        return wait
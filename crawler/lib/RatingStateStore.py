@@ -0,0 +1,93 @@
+from __future__ import annotations
+import json
+from pathlib import Path
+from typing import Any, Dict, List
+
+from lib.AtomicFile import write_json
+
+# (contest, rated, recompute, participants) の辞書．participants は参加者の [人数, 名前の一覧の sha256]
+ContestKey = Dict[str, Any]
+
+# 形式を変えたら上げる
+RATING_STATE_FORMAT_VERSION: int = 2
+
+
+class RatingStateStore:
+    """PerformanceExporter.trace_innter_perf の途中状態を保存しておくストア．
+
+    コンテストを 1 つ処理するごとに，そのコンテストの色境界と順位→内部パフォーマンスを perfs/{contest}.json に，
+    処理済みのコンテスト一覧とその時点のユーザ名→内部レートを state.json に書き出す．
+    次回は処理済みのコンテスト一覧のうち今回の一覧の先頭と一致する部分の続きから計算すればよい
+    （参加者が変わったコンテストがあれば，そこから計算し直す）．
+    """
+
+    directory: Path
+    contests: List[ContestKey]
+    inner_ratings: Dict[str, int]
+
+    def __init__(self, directory: Path) -> None:
+        """
+        Args:
+            directory (Path): 保存先．なければ作成する
+        """
+        self.directory = directory
+        (directory / 'perfs').mkdir(parents=True, exist_ok=True)
+        self.contests = []
+        self.inner_ratings = {}
+        state_path: Path = directory / 'state.json'
+        if state_path.exists():
+            with open(state_path, encoding='utf-8') as f:
+                state: Dict[str, Any] = json.load(f)
+            if state['version'] == RATING_STATE_FORMAT_VERSION:
+                self.contests = state['contests']
+                self.inner_ratings = state['inner_ratings']
+
+    def __repr__(self) -> str:
+        return f'<RatingStateStore directory={self.directory} contests={len(self.contests)}>'
+
+    def get_resume_position(self, contests: List[ContestKey]) -> int:
+        """処理済みのコンテスト一覧と contests の先頭が一致する長さを返す．"""
+        position: int = 0
+        for processed, contest in zip(self.contests, contests):
+            if processed != contest:
+                break
+            position += 1
+        return position
+
+    def clear(self) -> None:
+        self.contests = []
+        self.inner_ratings = {}
+
+    def truncate(self, position: int, inner_ratings: Dict[str, int]) -> None:
+        """処理済みのコンテスト一覧を先頭 position 個に戻す（state.json は次の commit で書き換わる）．
+
+        Args:
+            position (int): 残すコンテスト数
+            inner_ratings (Dict[str, int]): 先頭 position 個のコンテストの結果まで反映したユーザ名→内部レート
+        """
+        self.contests = self.contests[:position]
+        self.inner_ratings = inner_ratings
+
+    def commit(self, contest: ContestKey, inner_ratings: Dict[str, int], borders: List[float],
+               perfs: List[int]) -> None:
+        """コンテストを 1 つ処理し終えた状態を保存する．
+
+        Args:
+            contest (ContestKey): 処理したコンテスト
+            inner_ratings (Dict[str, int]): このコンテストの結果まで反映したユーザ名→内部レート
+            borders (List[float]): 色境界
+            perfs (List[int]): 順位→内部パフォーマンス
+        """
+        # 途中で落ちても state.json が指すコンテストの perfs は必ず揃っているよう，perfs を先に書く
+        write_json(self.directory / 'perfs' / f'{contest["contest"]}.json', {'borders': borders, 'perfs': perfs})
+        self.contests.append(contest)
+        self.inner_ratings = inner_ratings
+        write_json(self.directory / 'state.json', {
+            'version': RATING_STATE_FORMAT_VERSION,
+            'contests': self.contests,
+            'inner_ratings': self.inner_ratings,
+        })
+
+    def read_perfs(self, contest_slug: str) -> Dict[str, Any]:
+        with open(self.directory / 'perfs' / f'{contest_slug}.json', encoding='utf-8') as f:
+            return json.load(f)
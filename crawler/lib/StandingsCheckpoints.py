@@ -0,0 +1,308 @@
+from __future__ import annotations
+import json
+from bisect import bisect_left, bisect_right
+from functools import cmp_to_key
+from itertools import accumulate
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+from lib.AtomicFile import write_json
+
+Score = Union[int, float]
+SubmissionDict = Dict[str, Union[str, int, float]]
+
+# 形式を変えたら上げる
+STANDINGS_CHECKPOINT_FORMAT_VERSION: int = 1
+
+
+class UserStandingsTaskEntry:
+    """フロントエンドの StandingsTable.tsx の UserStandingsTaskEntry"""
+
+    score: Score
+    score_time: int
+    submit_count: int  # CE 以外の提出回数
+    submit_count_ce: int
+
+    def __init__(self, score: Score = 0, score_time: int = 0, submit_count: int = 0, submit_count_ce: int = 0) -> None:
+        self.score = score
+        self.score_time = score_time
+        self.submit_count = submit_count
+        self.submit_count_ce = submit_count_ce
+
+    def __repr__(self) -> str:
+        return (f'<UserStandingsTaskEntry score={self.score} score_time={self.score_time} '
+                f'submit_count={self.submit_count} submit_count_ce={self.submit_count_ce}>')
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, UserStandingsTaskEntry) and vars(self) == vars(other)
+
+
+class UserStandingsEntry(UserStandingsTaskEntry):
+    """フロントエンドの StandingsTable.tsx の UserStandingsEntry"""
+
+    user_name: str
+    rank: int
+    tasks: Dict[str, UserStandingsTaskEntry]  # 問題ごとの得点
+
+    def __init__(self, user_name: str, task_slugs: Iterable[str]) -> None:
+        super().__init__()
+        self.user_name = user_name
+        self.rank = -1
+        self.tasks = {task_slug: UserStandingsTaskEntry() for task_slug in task_slugs}
+
+    def __repr__(self) -> str:
+        return f'<UserStandingsEntry user_name={self.user_name} rank={self.rank} score={self.score}>'
+
+
+def compare_user_standings_entry(a: UserStandingsTaskEntry, b: UserStandingsTaskEntry) -> int:
+    # スコアが高いほうが順位が上
+    if a.score != b.score:
+        return -1 if b.score < a.score else 1
+    if a.score > 0:
+        # 正の得点同士なら
+        if a.score_time != b.score_time:
+            return a.score_time - b.score_time
+        return a.submit_count - b.submit_count
+    # 0 点同士なら
+    return 0
+
+
+class StandingsState:
+    """ある時点までの提出を StandingsTable.tsx と同じ規則で集計した順位表．"""
+
+    task_slugs: List[str]
+    entries: Dict[str, UserStandingsEntry]  # 最初に提出した順
+
+    def __init__(self, task_slugs: Sequence[str]) -> None:
+        self.task_slugs = list(task_slugs)
+        self.entries = {}
+
+    def __repr__(self) -> str:
+        return f'<StandingsState users={len(self.entries)}>'
+
+    def add_submission(self, d: SubmissionDict) -> None:
+        user_name = d['user_name']
+        assert isinstance(user_name, str)
+        entry: Optional[UserStandingsEntry] = self.entries.get(user_name)
+        if entry is None:
+            entry = self.entries[user_name] = UserStandingsEntry(user_name, self.task_slugs)
+        task_slug: str = str(d['task'])
+        if task_slug not in entry.tasks:
+            # 問題一覧にない問題への提出（問題一覧の取得漏れなど）．列を足して，全員に 0 点の欄を作る
+            self.add_task(task_slug)
+        task_entry: UserStandingsTaskEntry = entry.tasks[task_slug]
+        if d['status'] == 'CE':
+            entry.submit_count_ce += 1
+            task_entry.submit_count_ce += 1
+        else:
+            entry.submit_count += 1
+            task_entry.submit_count += 1
+        score = d['score']
+        time_unix = d['time_unix']
+        assert isinstance(score, (int, float)) and isinstance(time_unix, int)
+        if score > task_entry.score:
+            entry.score += score - task_entry.score
+            entry.score_time = time_unix
+            task_entry.score = score
+            task_entry.score_time = time_unix
+
+    def add_task(self, task_slug: str) -> None:
+        self.task_slugs.append(task_slug)
+        for entry in self.entries.values():
+            entry.tasks[task_slug] = UserStandingsTaskEntry()
+
+    def get_standings(self) -> List[UserStandingsEntry]:
+        """順位をつけて，順位表の順に並べたものを返す．"""
+        entries: List[UserStandingsEntry] = sorted(self.entries.values(), key=cmp_to_key(compare_user_standings_entry))
+        prev: int = -1
+        for index, entry in enumerate(entries):
+            if prev == -1:
+                entry.rank = index + 1
+                prev = 0
+            elif entry.score == entries[prev].score and (
+                    entry.score == 0 or (entry.score_time == entries[prev].score_time
+                                         and entry.submit_count == entries[prev].submit_count)):
+                entry.rank = prev + 1
+            else:
+                entry.rank = index + 1
+                prev = index
+        return entries
+
+    def to_dict(self) -> Dict[str, Any]:
+        entries: List[UserStandingsEntry] = list(self.entries.values())
+        ranks: Dict[str, int] = {entry.user_name: entry.rank for entry in self.get_standings()}
+        return {
+            'users': [entry.user_name for entry in entries],
+            'rank': [ranks[entry.user_name] for entry in entries],
+            'score': [entry.score for entry in entries],
+            'score_time': [entry.score_time for entry in entries],
+            'submit_count': [entry.submit_count for entry in entries],
+            'submit_count_ce': [entry.submit_count_ce for entry in entries],
+            'tasks': {
+                task_slug: {
+                    'score': [entry.tasks[task_slug].score for entry in entries],
+                    'score_time': [entry.tasks[task_slug].score_time for entry in entries],
+                    'submit_count': [entry.tasks[task_slug].submit_count for entry in entries],
+                    'submit_count_ce': [entry.tasks[task_slug].submit_count_ce for entry in entries],
+                } for task_slug in self.task_slugs
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, task_slugs: Sequence[str], data: Dict[str, Any]) -> StandingsState:
+        state: StandingsState = cls(task_slugs)
+        for i, user_name in enumerate(data['users']):
+            entry: UserStandingsEntry = UserStandingsEntry(user_name, ())
+            entry.score = data['score'][i]
+            entry.score_time = data['score_time'][i]
+            entry.submit_count = data['submit_count'][i]
+            entry.submit_count_ce = data['submit_count_ce'][i]
+            for task_slug in state.task_slugs:
+                columns: Optional[Dict[str, List[Any]]] = data['tasks'].get(task_slug)
+                if columns is None:
+                    # このチェックポイントより後で初めて提出された，問題一覧にない問題
+                    entry.tasks[task_slug] = UserStandingsTaskEntry()
+                    continue
+                entry.tasks[task_slug] = UserStandingsTaskEntry(
+                    columns['score'][i], columns['score_time'][i],
+                    columns['submit_count'][i], columns['submit_count_ce'][i])
+            state.entries[user_name] = entry
+        return state
+
+
+def compute_standings(submissions: Iterable[SubmissionDict], task_slugs: Sequence[str],
+                      time_unix: int) -> List[UserStandingsEntry]:
+    """time_unix までの提出から，StandingsTable.tsx と同じく先頭から全提出をなめて順位表を作る．"""
+    state: StandingsState = StandingsState(task_slugs)
+    for d in submissions:
+        # filter by datetime
+        assert isinstance(d['time_unix'], int)
+        if d['time_unix'] > time_unix:
+            continue
+        state.add_submission(d)
+    return state.get_standings()
+
+
+class StandingsCheckpointWriter:
+    """提出一覧を書き出しながら，every 件ごとにその時点の順位表を書き出す．
+
+    チェックポイントは「先頭から position 件の提出を集計したもの」である．
+    提出は提出 ID 順に並んでおり，時刻は（ほぼ）単調なので，ある時刻の順位表は
+    その時刻までの提出だけからなる先頭部分のうち最後のチェックポイントから少しだけ再生すれば得られる．
+    """
+
+    directory: Path
+    every: int
+    state: StandingsState
+    positions: List[int]
+    position: int
+
+    def __init__(self, directory: Path, task_slugs: Sequence[str], every: int = 1000) -> None:
+        assert every >= 1
+        self.directory = directory
+        self.every = every
+        self.state = StandingsState(task_slugs)
+        self.positions = []
+        self.position = 0
+        directory.mkdir(parents=True, exist_ok=True)
+
+    def __repr__(self) -> str:
+        return f'<StandingsCheckpointWriter directory={self.directory} every={self.every}>'
+
+    def add(self, d: SubmissionDict) -> None:
+        self.state.add_submission(d)
+        self.position += 1
+        if self.position % self.every == 0:
+            write_json(self.directory / f'{self.position}.json', {
+                'version': STANDINGS_CHECKPOINT_FORMAT_VERSION,
+                'position': self.position,
+                **self.state.to_dict(),
+            })
+            self.positions.append(self.position)
+
+    def tee(self, data: Iterable[SubmissionDict]) -> Iterator[SubmissionDict]:
+        for d in data:
+            self.add(d)
+            yield d
+
+    def close(self) -> None:
+        """索引を書き出し，古いチェックポイントを消す．"""
+        write_json(self.directory / 'index.json', {
+            'version': STANDINGS_CHECKPOINT_FORMAT_VERSION,
+            'tasks': self.state.task_slugs,
+            'count': self.position,
+            'every': self.every,
+            'positions': self.positions,
+        })
+        written = {f'{position}.json' for position in self.positions} | {'index.json'}
+        for path in self.directory.glob('*.json'):
+            if path.name not in written:
+                path.unlink()
+
+
+class StandingsCheckpoints:
+    """チェックポイントと提出一覧から，任意の時刻の順位表を求める．"""
+
+    directory: Path
+    submissions: Sequence[SubmissionDict]
+    task_slugs: List[str]
+    positions: List[int]
+    times: List[int]
+    prefix_max_times: List[int]
+    out_of_order: List[int]
+    cache: Dict[int, Dict[str, Any]]
+
+    def __init__(self, directory: Path, submissions: Sequence[SubmissionDict]) -> None:
+        """
+        Args:
+            directory (Path): StandingsCheckpointWriter の出力先
+            submissions (Sequence[SubmissionDict]): チェックポイントを作ったときと同じ提出一覧
+        """
+        with open(directory / 'index.json', encoding='utf-8') as f:
+            index: Dict[str, Any] = json.load(f)
+        if index['version'] != STANDINGS_CHECKPOINT_FORMAT_VERSION:
+            raise ValueError(f'unsupported standings checkpoint format version: {index["version"]}')
+        if index['count'] != len(submissions):
+            raise ValueError(f'checkpoints were made from {index["count"]} submissions, got {len(submissions)}')
+        self.directory = directory
+        self.submissions = submissions
+        self.task_slugs = index['tasks']
+        self.positions = [0] + index['positions']
+        self.times = [int(d['time_unix']) for d in submissions]
+        # 先頭から i+1 件の最大時刻（広義単調増加）
+        self.prefix_max_times = list(accumulate(self.times, max))
+        # それより前の提出より時刻が前の提出の位置
+        self.out_of_order = [i for i in range(1, len(self.times))
+                             if self.times[i] < self.prefix_max_times[i - 1]]
+        self.cache = {}
+
+    def __repr__(self) -> str:
+        return f'<StandingsCheckpoints directory={self.directory} checkpoints={len(self.positions) - 1}>'
+
+    def load_checkpoint(self, position: int) -> StandingsState:
+        if position == 0:
+            return StandingsState(self.task_slugs)
+        if position not in self.cache:
+            with open(self.directory / f'{position}.json', encoding='utf-8') as f:
+                self.cache[position] = json.load(f)
+        return StandingsState.from_dict(self.task_slugs, self.cache[position])
+
+    def get_state(self, time_unix: int) -> StandingsState:
+        # 先頭 prefix 件はすべて time_unix 以前の提出
+        prefix: int = bisect_right(self.prefix_max_times, time_unix)
+        position: int = self.positions[bisect_right(self.positions, prefix) - 1]
+        state: StandingsState = self.load_checkpoint(position)
+        for d in self.submissions[position:prefix]:
+            state.add_submission(d)
+        # それより後で time_unix 以前の提出は，時刻が前後しているものに限られる
+        for i in self.out_of_order[bisect_left(self.out_of_order, prefix):]:
+            if self.times[i] <= time_unix:
+                state.add_submission(self.submissions[i])
+        return state
+
+    def get_standings(self, time_unix: int) -> List[UserStandingsEntry]:
+        """compute_standings(submissions, task_slugs, time_unix) と同じ順位表を返す．
+
+        問題一覧にない問題への提出があったときは，その問題も含めた self.task_slugs を task_slugs としたものと同じになる．
+        """
+        return self.get_state(time_unix).get_standings()
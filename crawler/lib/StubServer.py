@@ -0,0 +1,104 @@
+from __future__ import annotations
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Match, Optional, Pattern
+from urllib.parse import parse_qs, urlparse
+
+from lib.SyntheticAtCoder import SyntheticContest, contest_list_html
+
+
+class StubServer:
+    """SyntheticContest を AtCoder と同じ URL 体系で返すローカル HTTP サーバ．
+
+    with 文で起動・停止する．url を Endpoint.atcoder に設定するとクローラの向き先になる．
+    aperfs を渡すと ac-predictor の aperfs/{contest}.json も返すので，url を Endpoint.ac_predictor にも設定できる．
+    """
+
+    submissions_path_pattern: Pattern[str] = re.compile(r"^/contests/([^/]+)/submissions$")
+    tasks_path_pattern: Pattern[str] = re.compile(r"^/contests/([^/]+)/tasks$")
+    aperfs_path_pattern: Pattern[str] = re.compile(r"^/aperfs/([^/]+)\.json$")
+
+    contests: Dict[str, SyntheticContest]
+    aperfs: Dict[str, Dict[str, int]]
+    latency: float
+    request_count: int
+    server: ThreadingHTTPServer
+    thread: Optional[threading.Thread]
+    lock: threading.Lock
+
+    def __init__(self, contests: List[SyntheticContest], latency: float = 0.0,
+                 aperfs: Optional[Dict[str, Dict[str, int]]] = None) -> None:
+        """
+        Args:
+            contests (List[SyntheticContest]): 返すコンテスト一覧
+            latency (float): 1 リクエストごとに応答を遅らせる秒数（ネットワーク遅延の模擬）
+            aperfs (Optional[Dict[str, Dict[str, int]]]): コンテスト→ユーザ名→内部レート
+        """
+        self.contests = {contest.slug: contest for contest in contests}
+        self.aperfs = aperfs or {}
+        self.latency = latency
+        self.request_count = 0
+        self.thread = None
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self.__create_handler())
+        self.server.daemon_threads = True
+
+    def __repr__(self) -> str:
+        return f'<StubServer url={self.url} contests={len(self.contests)} request_count={self.request_count}>'
+
+    def __enter__(self) -> StubServer:
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def render(self, path: str, query: Dict[str, List[str]]) -> Optional[str]:
+        """パスに対応する HTML（aperfs は JSON）を返す．存在しないページなら None を返す．"""
+        if path == '/contests/archive':
+            return contest_list_html(list(self.contests.values()))
+        match: Optional[Match[str]] = self.submissions_path_pattern.match(path)
+        if match is not None and match.group(1) in self.contests:
+            pagenum: int = int(query.get('page', ['1'])[0])
+            desc: bool = query.get('desc', ['false'])[0] == 'true'
+            return self.contests[match.group(1)].submission_list_html(pagenum, desc)
+        match = self.tasks_path_pattern.match(path)
+        if match is not None and match.group(1) in self.contests:
+            return self.contests[match.group(1)].task_list_html()
+        match = self.aperfs_path_pattern.match(path)
+        if match is not None and match.group(1) in self.aperfs:
+            return json.dumps(self.aperfs[match.group(1)])
+        return None
+
+    def __create_handler(self) -> type:
+        stub: StubServer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                with stub.lock:
+                    stub.request_count += 1
+                if stub.latency > 0:
+                    time.sleep(stub.latency)
+                url = urlparse(self.path)
+                body: Optional[str] = stub.render(url.path, parse_qs(url.query))
+                encoded: bytes = (body if body is not None else 'Not Found').encode('utf-8')
+                self.send_response(200 if body is not None else 404)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(encoded)))
+                self.end_headers()
+                self.wfile.write(encoded)
+
+            def log_message(self, format: str, *args: object) -> None:
+                pass
+
+        return Handler
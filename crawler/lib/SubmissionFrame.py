@@ -0,0 +1,150 @@
+from __future__ import annotations
+import json
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+SubmissionDict = Dict[str, Union[str, int, float]]
+
+# SUBMISSIONS_QUERY の 1 行（submission_id, task, time_unix, user_name, score, status, magnification）
+SubmissionRow = Tuple[int, str, int, str, int, str, int]
+
+
+class SubmissionFrame:
+    """提出を列ごとの配列で持ち，スコアの補正を列ごとの演算でまとめて行うクラス．
+
+    得点は倍率で割ったり係数を掛けたりしたものだけを float にし，それ以外は int のまま返すので，
+    1 件ずつ補正したときと JSON の出力が一致する．
+    """
+
+    submission_ids: np.ndarray
+    tasks: np.ndarray
+    time_unixes: np.ndarray
+    user_names: np.ndarray
+    scores: np.ndarray
+    statuses: np.ndarray
+    magnifications: np.ndarray
+    fixed_scores: np.ndarray
+    is_float: np.ndarray
+
+    def __init__(self, rows: List[SubmissionRow]) -> None:
+        """
+        Args:
+            rows (List[SubmissionRow]): SUBMISSIONS_QUERY の結果（1 行以上）
+        """
+        submission_ids, tasks, time_unixes, user_names, scores, statuses, magnifications = zip(*rows)
+        self.submission_ids = np.array(submission_ids, dtype=np.int64)
+        self.tasks = np.array(tasks, dtype=object)
+        self.time_unixes = np.array(time_unixes, dtype=np.int64)
+        self.user_names = np.array(user_names, dtype=object)
+        self.scores = np.array(scores, dtype=np.int64)
+        self.statuses = np.array(statuses, dtype=object)
+        self.magnifications = np.array(magnifications, dtype=np.int64)
+        # row[4] if row[6] == 1 else row[4] / row[6]
+        self.is_float = self.magnifications != 1
+        self.fixed_scores = self.scores.astype(np.float64)
+        self.fixed_scores[self.is_float] /= self.magnifications[self.is_float]
+
+    def __repr__(self) -> str:
+        return f'<SubmissionFrame count={len(self)}>'
+
+    def __len__(self) -> int:
+        return len(self.submission_ids)
+
+    def select(self, mask: np.ndarray) -> None:
+        """mask が True の行だけを残す．"""
+        self.submission_ids = self.submission_ids[mask]
+        self.tasks = self.tasks[mask]
+        self.time_unixes = self.time_unixes[mask]
+        self.user_names = self.user_names[mask]
+        self.scores = self.scores[mask]
+        self.statuses = self.statuses[mask]
+        self.magnifications = self.magnifications[mask]
+        self.fixed_scores = self.fixed_scores[mask]
+        self.is_float = self.is_float[mask]
+
+    def apply_score_ratio(self, problems: Dict[str, float], last_submission_ids: np.ndarray) -> None:
+        """最終提出のスコアに問題ごとの係数を掛ける．
+
+        Args:
+            problems (Dict[str, float]): 問題 slug→係数
+            last_submission_ids (np.ndarray): (ユーザ, 問題) ごとの最終提出の ID
+        """
+        is_last: np.ndarray = np.isin(self.submission_ids, last_submission_ids)
+        for task, ratio in problems.items():
+            mask: np.ndarray = is_last & (self.tasks == task)
+            self.fixed_scores[mask] *= ratio
+            self.is_float |= mask
+
+    def __columns(self) -> Iterator[Tuple[int, str, int, str, Union[int, float], str]]:
+        # 補正したものだけ float，それ以外は int
+        scores: List[Union[int, float]] = np.where(
+            self.is_float, self.fixed_scores.astype(object), self.scores.astype(object)).tolist()
+        return zip(self.submission_ids.tolist(), self.tasks.tolist(), self.time_unixes.tolist(),
+                   self.user_names.tolist(), scores, self.statuses.tolist())
+
+    def to_dicts(self) -> List[SubmissionDict]:
+        """export.iter_submissions が返すのと同じ形の辞書のリストにする．"""
+        return [
+            {
+                'submission_id': submission_id,
+                'task': task,
+                'time_unix': time_unix,
+                'user_name': user_name,
+                'score': score,
+                'status': status,
+            }
+            for submission_id, task, time_unix, user_name, score, status in self.__columns()
+        ]
+
+    def to_json(self, encoded_strings: Dict[str, str]) -> str:
+        """to_dicts の各要素を json.dumps(d, separators=(',', ':')) したものを ',' でつないだ文字列を，辞書を作らずに返す．
+
+        Args:
+            encoded_strings (Dict[str, str]): 文字列→JSON 文字列のキャッシュ（ユーザ名などは何度も現れるので使い回す）
+        """
+        def encode(value: str) -> str:
+            ret: Optional[str] = encoded_strings.get(value)
+            if ret is None:
+                ret = encoded_strings[value] = json.dumps(value)
+            return ret
+
+        # json は int も float も repr と同じ表記で書き出す
+        return ','.join([
+            '{"submission_id":%d,"task":%s,"time_unix":%d,"user_name":%s,"score":%r,"status":%s}' % (
+                submission_id, encode(task), time_unix, encode(user_name), score, encode(status))
+            for submission_id, task, time_unix, user_name, score, status in self.__columns()
+        ])
+
+
+def normalize_submissions(
+    chunks: Iterable[List[SubmissionRow]],
+    problems: Optional[Dict[str, float]] = None,
+    last_submission_ids: Optional[np.ndarray] = None,
+    task: Optional[str] = None,
+) -> Iterator[SubmissionFrame]:
+    """提出のチャンクごとに SubmissionFrame を作り，スコアを補正して返す．
+
+    Args:
+        chunks (Iterable[List[SubmissionRow]]): 提出 ID 昇順の提出のチャンク
+        problems (Optional[Dict[str, float]]): 最終提出に掛ける問題ごとの係数
+        last_submission_ids (Optional[np.ndarray]): problems を指定するときの，(ユーザ, 問題) ごとの最終提出の ID
+        task (Optional[str]): 指定すればその問題の提出だけを返す
+    """
+    for rows in chunks:
+        frame: SubmissionFrame = SubmissionFrame(rows)
+        mask: np.ndarray = frame.user_names != 'wata_admin'
+        if task is not None:
+            mask &= frame.tasks == task
+        if not mask.all():
+            frame.select(mask)
+        if problems is not None:
+            assert last_submission_ids is not None
+            frame.apply_score_ratio(problems, last_submission_ids)
+        yield frame
+
+
+def iter_dicts(frames: Iterable[SubmissionFrame]) -> Iterator[SubmissionDict]:
+    """各 SubmissionFrame の提出を辞書にして 1 件ずつ返す．"""
+    return chain.from_iterable(frame.to_dicts() for frame in frames)
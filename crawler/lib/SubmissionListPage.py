@@ -1,12 +1,16 @@
-from typing import Dict, List, Match, Optional, Pattern
+from typing import Dict, List, Match, Optional, Pattern, Tuple
 from bs4 import BeautifulSoup
 from bs4.element import Tag
 from urllib.parse import ParseResult, urlparse, parse_qs
 import re
+import sys
 from datetime import datetime
+import lxml.html
 
 from typing import Literal
 
+from lib.ParserBackend import JST, BackendName, ParserBackend, TABLE_ROWS_XPATH, class_xpath
+
 SubmissionStatus = Literal[
     "AC", "WA", "IE", "OLE", "RE", "TLE", "MLE", "CE", "WJ", "WR"
 ]
@@ -16,9 +20,17 @@ class SubmissionListPage:
     """提出一覧ページの1つを表すクラス．コンストラクタ内で HTML をパースする．"""
 
     class Submission:
-        """提出インスタンス"""
+        """提出インスタンス
+
+        アーカイブ全体を再パースするときなどに数百万個作られるので，__slots__ で __dict__ を持たせず，
+        提出時刻は time_unix だけを持つ．コンテスト名などの繰り返し現れる文字列は intern して共有する．
+        """
+
+        __slots__ = (
+            "time_unix", "contest", "task", "user_name", "lang_name", "lang_id", "score", "magnification",
+            "submission_id", "source_length", "status", "time_consumption", "memory_consumption",
+        )
 
-        time: datetime
         time_unix: int
         contest: str
         task: str
@@ -36,6 +48,12 @@ class SubmissionListPage:
         task_href_pattern: Pattern[str] = re.compile(r"/contests/([^/]+)/tasks/([^/]+)")
         user_href_pattern: Pattern[str] = re.compile(r"/users/([^/]+)")
         score_href_pattern: Pattern[str] = re.compile(r"(-?\d+)\.(\d+)")
+        lang_id_pattern: Pattern[str] = re.compile(r"[?&]f\.Language=(\d+)")
+        # ジャッジ中の提出は "3/50" や "3/50 WA" のように進捗が表示される
+        judging_pattern: Pattern[str] = re.compile(r"\d+/\d+( [A-Z]+)?")
+        time_pattern: Pattern[str] = re.compile(
+            r"^(\d{4})-(\d\d)-(\d\d) (\d\d):(\d\d):(\d\d)\+0900$"
+        )
 
         def __init__(self, table_row: Tag) -> None:
             """提出一覧ページ内のテーブルのある行タグから，提出インスタンスを初期化する．
@@ -46,16 +64,17 @@ class SubmissionListPage:
             table_data_list: List[Tag] = table_row.select("td")
 
             time_str: str = table_data_list[0].get_text()
-            self.time = datetime.strptime(time_str, "%Y-%m-%d %H:%M:%S+0900")
-            self.time_unix = int(self.time.timestamp())
+            self.time_unix = int(
+                datetime.strptime(time_str, "%Y-%m-%d %H:%M:%S+0900").replace(tzinfo=JST).timestamp()
+            )
 
             task_tag: Tag = table_data_list[1].find("a")
             task_href_match: Optional[Match[str]] = self.task_href_pattern.search(
                 task_tag["href"]
             )
             assert task_href_match is not None
-            self.contest = task_href_match.group(1)
-            self.task = task_href_match.group(2)
+            self.contest = sys.intern(task_href_match.group(1))
+            self.task = sys.intern(task_href_match.group(2))
 
             user_name_tag: Tag = table_data_list[2].find("a")
             # self.user_name = user_name_tag.get_text()
@@ -63,10 +82,10 @@ class SubmissionListPage:
                 user_name_tag["href"]
             )
             assert user_href_match is not None
-            self.user_name = user_href_match.group(1)
+            self.user_name = sys.intern(user_href_match.group(1))
 
             lnag_tag: Tag = table_data_list[3].find("a")
-            self.lang_name = lnag_tag.get_text()
+            self.lang_name = sys.intern(lnag_tag.get_text())
             lang_url_parse_result: ParseResult = urlparse(lnag_tag["href"])
             lang_url_query_dict: Dict[str, List[str]] = parse_qs(
                 lang_url_parse_result.query
@@ -119,6 +138,98 @@ class SubmissionListPage:
                 self.time_consumption = -1
                 self.memory_consumption = -1
 
+        @classmethod
+        def from_lxml(cls, table_row: lxml.html.HtmlElement) -> "SubmissionListPage.Submission":
+            """lxml の行要素から提出インスタンスを初期化する．__init__ と同じ結果になる．
+
+            strptime や urlparse/parse_qs を使わず，正規表現 1 回ずつで値を取り出す．
+
+            Args:
+                table_row (lxml.html.HtmlElement): 行要素
+            """
+            self = cls.__new__(cls)
+            table_data_list: List[lxml.html.HtmlElement] = list(table_row.iter("td"))
+
+            time_str: str = table_data_list[0].text_content()
+            time_match: Optional[Match[str]] = self.time_pattern.match(time_str)
+            time: datetime
+            if time_match is not None:
+                time = datetime(*map(int, time_match.groups()), tzinfo=JST)
+            else:
+                time = datetime.strptime(time_str, "%Y-%m-%d %H:%M:%S+0900").replace(tzinfo=JST)
+            self.time_unix = int(time.timestamp())
+
+            task_href_match: Optional[Match[str]] = self.task_href_pattern.search(
+                next(table_data_list[1].iter("a")).get("href")
+            )
+            assert task_href_match is not None
+            self.contest = sys.intern(task_href_match.group(1))
+            self.task = sys.intern(task_href_match.group(2))
+
+            user_href_match: Optional[Match[str]] = self.user_href_pattern.search(
+                next(table_data_list[2].iter("a")).get("href")
+            )
+            assert user_href_match is not None
+            self.user_name = sys.intern(user_href_match.group(1))
+
+            lang_tag: lxml.html.HtmlElement = next(table_data_list[3].iter("a"))
+            self.lang_name = sys.intern(lang_tag.text_content())
+            lang_id_match: Optional[Match[str]] = self.lang_id_pattern.search(
+                lang_tag.get("href")
+            )
+            assert lang_id_match is not None
+            self.lang_id = int(lang_id_match.group(1))
+
+            score_str: str = table_data_list[4].text_content()
+            score_href_match: Optional[Match[str]] = self.score_href_pattern.search(
+                score_str
+            )
+            if score_href_match is not None:
+                score_fst: int = int(score_href_match.group(1))
+                score_snd_str: str = score_href_match.group(2)
+                score_snd: int = int(score_snd_str)
+                self.magnification = pow(10, len(score_snd_str))
+                if score_fst >= 0:
+                    self.score = score_fst * self.magnification + score_snd
+                else:
+                    self.score = score_fst * self.magnification - score_snd
+            else:
+                self.score = int(score_str)
+                self.magnification = 1
+            self.submission_id = int(table_data_list[4].get("data-id"))
+
+            self.source_length = int(table_data_list[5].text_content().split(" ")[0])
+
+            self.status = self.__str_to_status(
+                next(table_data_list[6].iter("span")).text_content()
+            )
+
+            if (
+                self.status != "CE"
+                and self.status != "IE"
+                and self.status != "WJ"
+                and self.status != "WR"
+            ):
+                time_consumption_str: str = table_data_list[7].text_content()
+                if time_consumption_str.startswith(">"):
+                    self.time_consumption = int(time_consumption_str.split(" ")[1])
+                else:
+                    self.time_consumption = int(time_consumption_str.split(" ")[0])
+
+                memory_consumption_str: str = table_data_list[8].text_content()
+                if memory_consumption_str.startswith(">"):
+                    self.memory_consumption = int(memory_consumption_str.split(" ")[1])
+                else:
+                    self.memory_consumption = int(memory_consumption_str.split(" ")[0])
+            else:
+                self.time_consumption = -1
+                self.memory_consumption = -1
+            return self
+
+        @property
+        def time(self) -> datetime:
+            return datetime.fromtimestamp(self.time_unix, JST)
+
         def __repr__(self) -> str:
             return (
                 "<Submission "
@@ -149,6 +260,8 @@ class SubmissionListPage:
                 return "WJ"
             if status_str == "WR":
                 return "WR"
+            if self.judging_pattern.fullmatch(status_str) is not None:
+                return "WJ"
             msg: str = f"Invalid submission status: {status_str}"
             raise Exception(msg)
 
@@ -158,24 +271,42 @@ class SubmissionListPage:
     pattern_endtime: Pattern[str] = re.compile(
         r'var endTime = moment\("(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)\+09:00"\);'
     )
+    # ページ送りのリンク（先頭・前後・最後のページ）
+    pattern_page_link: Pattern[str] = re.compile(
+        r"""<a href=['"]/contests/[^'"]*/submissions\?[^'"]*\bpage=(\d+)['"]"""
+    )
     contest_starttime: datetime
     contest_starttime_unix: int
     contest_endtime: datetime
     contest_endtime_unix: int
     contest_title: str
+    page_count: int  # ページ送りに載っている最大のページ番号（ページ送りがなければ 1）
     submissions: List[Submission]
 
-    def __init__(self, html: str) -> None:
+    contest_title_xpath: str = (
+        f"//*[@id='navbar-collapse']//ul[{class_xpath('nav')} and {class_xpath('navbar-nav')}]"
+        f"//li//a[{class_xpath('contest-title')}]"
+    )
+
+    def __init__(self, html: str, backend: Optional[BackendName] = None) -> None:
         """HTML をパースして提出一覧を初期化する．
 
         Args:
             html (str): 提出一覧ページの HTML 文字列．
+            backend (Optional[BackendName]): 使用するパーサ．None なら ParserBackend.default
         """
         # get contest start/end time
         self.contest_starttime = self.__extract_datetime(html, self.pattern_starttime)
         self.contest_starttime_unix = int(self.contest_starttime.timestamp())
         self.contest_endtime = self.__extract_datetime(html, self.pattern_endtime)
         self.contest_endtime_unix = int(self.contest_endtime.timestamp())
+        self.page_count = max(
+            [int(pagenum) for pagenum in self.pattern_page_link.findall(html)], default=1
+        )
+
+        if (backend or ParserBackend.default) == "lxml":
+            self.submissions, self.contest_title = self.__parse_lxml(html)
+            return
 
         # get submissions
         soup: BeautifulSoup = BeautifulSoup(html, "html.parser")
@@ -190,6 +321,15 @@ class SubmissionListPage:
         )[0]
         self.contest_title = contset_title_tag.get_text()
 
+    def __parse_lxml(self, html: str) -> Tuple[List[Submission], str]:
+        document: lxml.html.HtmlElement = lxml.html.fromstring(html)
+        submissions: List[SubmissionListPage.Submission] = [
+            SubmissionListPage.Submission.from_lxml(table_row)
+            for table_row in document.xpath(TABLE_ROWS_XPATH)
+        ]
+        contest_title: str = document.xpath(self.contest_title_xpath)[0].text_content()
+        return submissions, contest_title
+
     def __extract_datetime(self, html: str, pattern: Pattern[str]) -> datetime:
         result: Optional[Match[str]] = pattern.search(html)
         assert result is not None
@@ -199,7 +339,7 @@ class SubmissionListPage:
         hour: int = int(result.group(4))
         minute: int = int(result.group(5))
         second: int = int(result.group(6))
-        return datetime(year, month, day, hour, minute, second)
+        return datetime(year, month, day, hour, minute, second, tzinfo=JST)
 
     def __repr__(self) -> str:
         return (
@@ -1,54 +1,61 @@
 from __future__ import annotations
 from typing import List, Optional, Tuple
-import requests
 from requests.models import Response
-from requests.sessions import Session
 
+from lib.Endpoint import Endpoint
+from lib.HttpClient import HttpClient
+from lib.Metrics import Metrics
+from lib.PageArchive import PageArchive
 from lib.SubmissionListPage import SubmissionListPage, SubmissionStatus
 
-from onlinejudge._implementation.utils import (
-    default_cookie_path,
-    with_cookiejar,
-    get_default_session,
-)
-
 DBInsertData = Tuple[
     int, str, str, int, int, str, str, int, int, int, SubmissionStatus, int, int, int
 ]
 
+# 提出一覧 1 ページあたりの提出数
+ROWS_PER_PAGE: int = 20
+
 
 class SubmissionListPageRequestResult:
+    # 設定されていれば，取得したページをすべてアーカイブに保存する
+    archive: Optional[PageArchive] = None
+
     contest: str
     pagenum: int
+    desc: bool  # 新しい提出から並べたページか
     html: str
     submission_list_page: Optional[SubmissionListPage]
     is_last_page: bool
     is_closed: bool
 
-    def __init__(self, contest: str = "ahc001", pagenum: int = 1) -> None:
+    def __init__(self, contest: str = "ahc001", pagenum: int = 1, desc: bool = False) -> None:
         self.contest = contest
         self.pagenum = pagenum
+        self.desc = desc
 
     def __repr__(self) -> str:
         return (
-            f"<SubmissionListPageRequestResult contest={self.contest} pagenum={self.pagenum} "
+            f"<SubmissionListPageRequestResult contest={self.contest} pagenum={self.pagenum} desc={self.desc} "
             f"is_last_page={self.is_last_page} submission_list_page={self.submission_list_page}>"
         )
 
     def get(self) -> None:
         url: str = (
-            f"https://atcoder.jp/contests/{self.contest}/submissions?"
-            f"f.LanguageName=&f.Status=&f.Task=&f.User=&orderBy=created&page={self.pagenum}"
+            f"{Endpoint.atcoder}/contests/{self.contest}/submissions?"
+            f"f.LanguageName=&f.Status=&f.Task=&f.User=&orderBy=created"
+            f"{'&desc=true' if self.desc else ''}&page={self.pagenum}"
         )
-        sess: Session
-        with with_cookiejar(get_default_session(), path=default_cookie_path) as sess:
-            response: Response = sess.get(url)
+        response: Response = HttpClient.get_default().get(url)
         if response.status_code == 404:
             self.is_closed = True
         else:
             assert response.status_code == 200
             self.is_closed = False
         self.html = response.text
+        # 新しい順のページは提出のたびに中身がずれるので，ページ番号をキーにするアーカイブには保存しない
+        if not self.is_closed and not self.desc and self.archive is not None:
+            with Metrics.get_default().timer("archive_put"):
+                self.archive.put(self.contest, self.pagenum, self.html)
 
     def read_sample_html(self) -> None:
         with open("sample.html") as f:
@@ -63,17 +70,21 @@ class SubmissionListPageRequestResult:
             self.submission_list_page = None
             self.is_last_page = True
         else:
-            self.submission_list_page = SubmissionListPage(self.html)
+            metrics: Metrics = Metrics.get_default()
+            with metrics.timer("parse_submissions"):
+                self.submission_list_page = SubmissionListPage(self.html)
+            metrics.add("pages")
+            metrics.add("rows_parsed", len(self.submission_list_page.submissions))
             self.is_last_page = any(
-                submission.time >= self.submission_list_page.contest_endtime
+                submission.time_unix >= self.submission_list_page.contest_endtime_unix
                 for submission in self.submission_list_page.submissions
             )
 
     @classmethod
     def create_from_request(
-        cls, contest: str = "ahc001", pagenum: int = 1
+        cls, contest: str = "ahc001", pagenum: int = 1, desc: bool = False
     ) -> SubmissionListPageRequestResult:
-        res: SubmissionListPageRequestResult = cls(contest, pagenum)
+        res: SubmissionListPageRequestResult = cls(contest, pagenum, desc)
         res.get()
         res.parse()
         return res
@@ -87,16 +98,27 @@ class SubmissionListPageRequestResult:
         res.parse()
         return res
 
+    @classmethod
+    def create_from_html(
+        cls, contest: str, pagenum: int, html: str
+    ) -> SubmissionListPageRequestResult:
+        res: SubmissionListPageRequestResult = cls(contest, pagenum)
+        res.html = html
+        res.is_closed = False
+        res.parse()
+        return res
+
     def generate_insert_data(self) -> List[DBInsertData]:
         ls: List[DBInsertData] = []
         if self.submission_list_page is not None:
             for submission in self.submission_list_page.submissions:
-                if submission.time < self.submission_list_page.contest_endtime:
+                if submission.time_unix < self.submission_list_page.contest_endtime_unix:
                     data: DBInsertData = (
                         submission.submission_id,
                         submission.contest,
                         submission.task,
-                        self.pagenum,
+                        # 新しい順のページ番号は昇順のページ番号と対応しないので 0（不明）にする
+                        0 if self.desc else self.pagenum,
                         submission.time_unix,
                         submission.user_name,
                         submission.lang_name,
@@ -0,0 +1,244 @@
+from __future__ import annotations
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from lib.Metrics import Metrics
+from lib.Migration import connect
+from lib.SubmissionListPageRequestResult import ROWS_PER_PAGE, DBInsertData
+from lib.TaskListPageRequestResult import TaskDBInsertData
+
+ContestDBInsertData = Tuple[str, str, int, int, int, int, int]
+
+# ページ番号が 0（新しい順のページから取ったので不明）のときは，既にあるページ番号を残す
+# 値の変わらない行は更新しない（total_changes に数えない）
+UPSERT_SUBMISSIONS_QUERY: str = (
+    'INSERT INTO submissions VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?) '
+    'ON CONFLICT(submission_id) DO UPDATE SET '
+    'pagenum = CASE WHEN excluded.pagenum > 0 THEN excluded.pagenum ELSE submissions.pagenum END, '
+    'score = excluded.score, status = excluded.status, '
+    'time_consumption = excluded.time_consumption, memory_consumption = excluded.memory_consumption, '
+    'magnification = excluded.magnification '
+    'WHERE (excluded.pagenum > 0 AND excluded.pagenum IS NOT submissions.pagenum) '
+    'OR (excluded.score, excluded.status, excluded.time_consumption, excluded.memory_consumption, '
+    'excluded.magnification) IS NOT (submissions.score, submissions.status, submissions.time_consumption, '
+    'submissions.memory_consumption, submissions.magnification)'
+)
+
+# 提出の行を変えたコンテストの更新回数を増やす（export.py はこれで書き出し直すかを決める）
+BUMP_REVISION_QUERY: str = (
+    'INSERT INTO contest_revisions VALUES (?, 1) '
+    'ON CONFLICT(contest) DO UPDATE SET revision = revision + 1'
+)
+
+
+class SubmissionWriter:
+    """クローラの DB 書き込みをまとめて行うクラス．DB 接続を所有する．
+
+    提出は page_window ページ分をメモリにためてから 1 トランザクションで書き込む．
+    既にある提出は得点・状態などを上書きするので，ジャッジ中だった提出や再ジャッジされた提出も取り直せる．
+    トランザクションはページ単位でしか区切らないので，途中で落ちても DB には
+    「あるページまでの全提出」だけが残り，MAX(pagenum) + 1 から再開すれば取りこぼしは出ない．
+    書き込みは短いトランザクションで行うので，並列クロールの他のワーカを長く待たせない．
+    """
+
+    conn: sqlite3.Connection
+    page_window: int
+    pending: List[Tuple[str, int, int, List[DBInsertData]]]  # contest, pagenum, crawled_at, 提出
+    pending_contests: List[ContestDBInsertData]
+    known_contests: Set[str]
+
+    def __init__(self, database: str, page_window: int = 20, synchronous: str = 'NORMAL',
+                 cache_size_kib: int = 65536) -> None:
+        """
+        Args:
+            database (str): DB のパス
+            page_window (int): 何ページごとにコミットするか
+            synchronous (str): PRAGMA synchronous の値（WAL では NORMAL でも DB は壊れない）
+            cache_size_kib (int): PRAGMA cache_size（KiB）
+        """
+        assert page_window >= 1
+        assert synchronous.upper() in ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+        self.conn = connect(database)
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        self.conn.execute(f'PRAGMA synchronous = {synchronous.upper()}')
+        self.conn.execute(f'PRAGMA cache_size = {-cache_size_kib}')
+        self.page_window = page_window
+        self.pending = []
+        self.pending_contests = []
+        self.known_contests = set()
+
+    def __repr__(self) -> str:
+        return f'<SubmissionWriter page_window={self.page_window} pending={len(self.pending)}>'
+
+    def __enter__(self) -> SubmissionWriter:
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def get_max_pagenum(self, slug: str) -> Optional[int]:
+        """コミット済みの最大ページ番号を返す．"""
+        row: Tuple[Optional[int]] = self.conn.execute(
+            'SELECT MAX(pagenum) FROM submissions WHERE contest = ?', (slug,)).fetchone()
+        return row[0]
+
+    def get_max_submission_id(self, slug: str) -> Optional[int]:
+        row: Tuple[Optional[int]] = self.conn.execute(
+            'SELECT MAX(submission_id) FROM submissions WHERE contest = ?', (slug,)).fetchone()
+        return row[0]
+
+    def get_judging_submission_ids(self, slug: str) -> List[int]:
+        """ジャッジ待ち（WJ/WR）のまま保存されている提出 ID を昇順で返す．"""
+        return [row[0] for row in self.conn.execute(
+            "SELECT submission_id FROM submissions WHERE contest = ? AND status IN ('WJ', 'WR') "
+            'ORDER BY submission_id', (slug,))]
+
+    def get_suspicious_submissions(self, slug: str) -> List[Tuple[int, int]]:
+        """再取得すべき提出（WJ/WR/IE のまま保存されているもの）の (提出 ID, ページ番号) を返す．
+
+        ページ番号が 0（新しい順のページから取った）ものは，それより前の提出数から昇順のページ番号を見積もる．
+        """
+        return [(submission_id, pagenum if pagenum > 0 else self.conn.execute(
+            'SELECT COUNT(*) FROM submissions WHERE contest = ? AND submission_id < ?',
+            (slug, submission_id)).fetchone()[0] // ROWS_PER_PAGE + 1)
+            for submission_id, pagenum in self.conn.execute(
+                "SELECT submission_id, pagenum FROM submissions WHERE contest = ? AND status IN ('WJ', 'WR', 'IE') "
+                'ORDER BY submission_id', (slug,)).fetchall()]
+
+    def get_stale_pages(self, slug: str) -> List[int]:
+        """コンテスト終了前に取得したページの番号を返す．
+
+        pages.crawled_at も contests.end_time_unix も，ホストのタイムゾーンによらない UNIX 時刻である．
+        """
+        return [row[0] for row in self.conn.execute(
+            'SELECT pagenum FROM pages JOIN contests ON pages.contest = contests.contest_slug '
+            'WHERE pages.contest = ? AND pages.crawled_at < contests.end_time_unix ORDER BY pagenum', (slug,))]
+
+    def get_reconcile_targets(self) -> List[str]:
+        """再取得すべき提出かページがあるコンテストを返す．"""
+        return [row[0] for row in self.conn.execute(
+            "SELECT DISTINCT contest FROM submissions WHERE status IN ('WJ', 'WR', 'IE') "
+            'UNION SELECT pages.contest FROM pages JOIN contests ON pages.contest = contests.contest_slug '
+            'WHERE pages.crawled_at < contests.end_time_unix ORDER BY 1')]
+
+    def reconcile_page(self, slug: str, pagenum: int, seq_of_parameters: List[DBInsertData]) -> Tuple[int, int]:
+        """再取得した 1 ページ分の提出を書き込んでコミットする．
+
+        Returns:
+            Tuple[int, int]: 新しく挿入した行数と，値が変わった行数
+        """
+        self.flush()
+        stored: Dict[int, Tuple[Any, ...]] = {}
+        for i in range(0, len(seq_of_parameters), 500):
+            chunk: List[DBInsertData] = seq_of_parameters[i:i + 500]
+            stored.update((row[0], tuple(row)) for row in self.conn.execute(
+                f'SELECT * FROM submissions WHERE submission_id IN ({",".join("?" * len(chunk))})',
+                [data[0] for data in chunk]))
+        inserted: int = sum(1 for data in seq_of_parameters if data[0] not in stored)
+        updated: int = sum(1 for data in seq_of_parameters if data[0] in stored and stored[data[0]] != tuple(data))
+        self.add_page(slug, pagenum, seq_of_parameters)
+        self.flush()
+        return inserted, updated
+
+    def record_reconcile_run(self, slug: str, started_at: int, suspicious_rows: int, stale_pages: int,
+                             requests: int, rows_inserted: int, rows_updated: int, rows_missing: int) -> None:
+        self.conn.execute('INSERT INTO reconcile_runs VALUES (NULL,?,?,?,?,?,?,?,?,?)',
+                          (slug, started_at, int(time.time()), suspicious_rows, stale_pages, requests,
+                           rows_inserted, rows_updated, rows_missing))
+        self.conn.commit()
+
+    def has_tasks(self, slug: str) -> bool:
+        return self.conn.execute('SELECT COUNT(*) FROM tasks WHERE contest_slug = ?', (slug,)).fetchone()[0] > 0
+
+    def upsert_contest(self, data: ContestDBInsertData) -> None:
+        """コンテスト情報を（まだなければ）挿入する．同じコンテストについては 1 回しか書き込まない．"""
+        if data[0] in self.known_contests:
+            return
+        self.known_contests.add(data[0])
+        self.pending_contests.append(data)
+
+    def add_page(self, slug: str, pagenum: int, seq_of_parameters: List[DBInsertData]) -> bool:
+        """1 ページ分の提出を追加する．page_window ページたまったら書き込む．
+
+        提出が 1 行もない（コンテスト期間外の提出だけの）ページも，取得した時刻を pages に記録する．
+
+        Returns:
+            bool: 書き込みに失敗したら False
+        """
+        self.pending.append((slug, pagenum, int(time.time()), seq_of_parameters))
+        if len(self.pending) >= self.page_window:
+            return self.flush()
+        return True
+
+    def insert_tasks(self, seq_of_parameters: List[TaskDBInsertData]) -> None:
+        self.conn.executemany('INSERT INTO tasks VALUES (?,?,?,'
+                              '?,?,?)', seq_of_parameters)
+        self.conn.commit()
+
+    def flush(self) -> bool:
+        """ためているコンテスト情報と提出を書き込んでコミットする．
+
+        あるページの挿入に失敗した場合は，その直前のページまでをコミットし，残りは捨てる．
+        失敗したページの行は途中まで入ったものも含めて 1 行も残さない（残ると MAX(pagenum) + 1 から再開したときに
+        そのページの残りを取りこぼす）．SQLite 以外の例外もそのページを取り消してから投げ直す．
+
+        Returns:
+            bool: すべて書き込めたら True
+        """
+        ok: bool = True
+        metrics: Metrics = Metrics.get_default()
+        changed: Set[str] = set()
+        try:
+            start: float = time.perf_counter()
+            rows: int = 0
+            self.conn.executemany('INSERT INTO contests VALUES (?,?,?,?,?,?,?) '
+                                  'ON CONFLICT(contest_slug) DO NOTHING', self.pending_contests)
+            # ページごとのセーブポイントで RELEASE してもコミットされないよう，外側のトランザクションを先に始めておく
+            if not self.conn.in_transaction:
+                self.conn.execute('BEGIN')
+            try:
+                for slug, pagenum, crawled_at, seq_of_parameters in self.pending:
+                    self.conn.execute('SAVEPOINT page')
+                    try:
+                        total_changes: int = self.conn.total_changes
+                        self.conn.executemany(UPSERT_SUBMISSIONS_QUERY, seq_of_parameters)
+                        page_changed: bool = self.conn.total_changes != total_changes
+                        if pagenum > 0:
+                            self.conn.execute('INSERT OR REPLACE INTO pages VALUES (?,?,?)',
+                                              (slug, pagenum, crawled_at))
+                        rows += len(seq_of_parameters)
+                    except BaseException as e:
+                        # このページの行はすべて取り消し，それまでのページはトランザクション内に残す
+                        self.conn.execute('ROLLBACK TO page')
+                        self.conn.execute('RELEASE page')
+                        if not isinstance(e, sqlite3.Error):
+                            # SQLite 以外の例外（KeyboardInterrupt など）はそのまま投げる
+                            raise
+                        print(f' -> Page {pagenum}: {e}')
+                        metrics.add('sqlite_errors')
+                        ok = False
+                        break
+                    self.conn.execute('RELEASE page')
+                    if page_changed:
+                        changed.add(slug)
+            finally:
+                # 例外で抜けても，それまでのページはトランザクション内に残るので数えておく
+                self.conn.executemany(BUMP_REVISION_QUERY, [(slug,) for slug in sorted(changed)])
+            metrics.observe('sqlite_insert', time.perf_counter() - start)
+            metrics.add('rows_written', rows)
+            with metrics.timer('sqlite_commit'):
+                self.conn.commit()
+        finally:
+            self.pending = []
+            self.pending_contests = []
+        return ok
+
+    def mark_completed(self, slug: str) -> None:
+        self.flush()
+        self.conn.execute('UPDATE contests SET crawl_completed = 1 WHERE contest_slug = ?', (slug,))
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.flush()
+        self.conn.close()
@@ -0,0 +1,253 @@
+from __future__ import annotations
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from lib.ParserBackend import JST
+
+STATUSES: List[str] = ["AC", "AC", "AC", "AC", "WA", "TLE", "RE", "CE"]
+LANGUAGES: List[str] = ["C++ (GCC 9.2.1)", "Python (3.8.2)", "Rust (1.42.0)", "Java (OpenJDK 11.0.6)"]
+
+
+class SyntheticSubmission(NamedTuple):
+    submission_id: int
+    time: datetime
+    task_slug: str
+    user_name: str
+    lang_id: int
+    status: str
+    score: int
+    source_length: int
+    exec_time_ms: int
+    memory_kb: int
+
+
+class SyntheticContest:
+    """ドライランやベンチマーク用に，AtCoder のマラソンコンテストを模したデータを決定的に生成するクラス．
+
+    提出は submission_id 順に一定間隔で並び，num_submissions 件がコンテスト期間中，
+    num_practice_submissions 件がコンテスト終了後の練習提出になる．
+    num_created と num_judged を設定すると開催中のコンテストを模せる．そのときは先頭 num_created 件だけが見え，
+    num_judged 件目以降の提出はジャッジ中（WJ）として表示される．
+    提出一覧・問題一覧のほか，ac-predictor の aperfs と結果 CSV も提出と矛盾しない内容で生成する．
+    """
+
+    rows_per_page: int = 20
+
+    slug: str
+    name: str
+    start_time: datetime
+    duration_minutes: int
+    num_tasks: int
+    num_users: int
+    num_submissions: int
+    num_practice_submissions: int
+    submission_id_base: int
+    seed: int
+    num_created: Optional[int]  # None なら全提出が見える
+    num_judged: Optional[int]  # None なら全提出のジャッジが終わっている
+
+    def __init__(self, index: int, num_submissions: int = 200, num_practice_submissions: int = 20,
+                 num_users: int = 50, num_tasks: int = 1, seed: int = 0, slug: Optional[str] = None) -> None:
+        self.slug = f'synth{index:03d}' if slug is None else slug
+        self.name = f'Synthetic Heuristic Contest {index:03d}'
+        self.start_time = datetime(2021, 3, 6, 12, 0, 0, tzinfo=JST) + timedelta(days=14 * index)
+        self.duration_minutes = 8 * 24 * 60
+        self.num_tasks = num_tasks
+        self.num_users = num_users
+        self.num_submissions = num_submissions
+        self.num_practice_submissions = num_practice_submissions
+        self.submission_id_base = 20000000 + index * 1000000
+        self.seed = seed
+        self.num_created = None
+        self.num_judged = None
+
+    def __repr__(self) -> str:
+        return (f'<SyntheticContest slug={self.slug} submissions={self.num_submissions} '
+                f'practice_submissions={self.num_practice_submissions}>')
+
+    @property
+    def end_time(self) -> datetime:
+        return self.start_time + timedelta(minutes=self.duration_minutes)
+
+    @property
+    def num_visible(self) -> int:
+        total: int = self.num_submissions + self.num_practice_submissions
+        return total if self.num_created is None else min(total, self.num_created)
+
+    @property
+    def num_pages(self) -> int:
+        total: int = self.num_visible
+        return max(1, (total + self.rows_per_page - 1) // self.rows_per_page)
+
+    def task_slug(self, task_index: int) -> str:
+        return f'{self.slug}_{chr(ord("a") + task_index)}'
+
+    def submission_time(self, k: int) -> datetime:
+        """k 番目（0-indexed）の提出時刻を返す．"""
+        if k < self.num_submissions:
+            interval: float = self.duration_minutes * 60 / max(1, self.num_submissions)
+            return self.start_time + timedelta(seconds=int(k * interval))
+        return self.end_time + timedelta(minutes=10 * (k - self.num_submissions + 1))
+
+    def submission(self, k: int) -> SyntheticSubmission:
+        """k 番目（0-indexed）の提出を返す．"""
+        rng: random.Random = random.Random(f'{self.seed}/{self.slug}/{k}')
+        task_slug: str = self.task_slug(rng.randrange(self.num_tasks))
+        user_name: str = f'user{rng.randrange(self.num_users):05d}'
+        lang_id: int = rng.randrange(len(LANGUAGES))
+        status: str = rng.choice(STATUSES)
+        score: int = rng.randrange(0, 10 ** 9) if status == "AC" else 0
+        source_length: int = rng.randrange(100, 50000)
+        exec_time_ms: int = rng.randrange(1, 5000)
+        memory_kb: int = rng.randrange(1000, 1000000)
+        if self.num_judged is not None and k >= self.num_judged:
+            status, score = "WJ", 0
+        return SyntheticSubmission(self.submission_id_base + k, self.submission_time(k), task_slug, user_name,
+                                   lang_id, status, score, source_length, exec_time_ms, memory_kb)
+
+    def submission_row(self, k: int) -> str:
+        submission_id, time, task_slug, user_name, lang_id, status, score, source_length, exec_time_ms, memory_kb = \
+            self.submission(k)
+        time_str: str = time.strftime('%Y-%m-%d %H:%M:%S+0900')
+        detail: str
+        if status in ("CE", "WJ"):
+            detail = '<td class="text-center" colspan="3"><a href="/contests/{0}/submissions/{1}">Detail</a></td>'
+        else:
+            detail = ('<td class="text-right">{2} ms</td><td class="text-right">{3} KB</td>'
+                      '<td class="text-center"><a href="/contests/{0}/submissions/{1}">Detail</a></td>')
+        return (
+            '<tr>'
+            f'<td class="no-break"><time class="fixtime fixtime-second">{time_str}</time></td>'
+            f'<td><a href="/contests/{self.slug}/tasks/{task_slug}">{task_slug[-1].upper()} - Task</a></td>'
+            f'<td><a href="/users/{user_name}">{user_name}</a> '
+            f'<a href="/contests/{self.slug}/submissions?f.User={user_name}">'
+            '<span class="glyphicon glyphicon-search black" aria-hidden="true"></span></a></td>'
+            f'<td><a href="/contests/{self.slug}/submissions?f.Language={4000 + lang_id}">{LANGUAGES[lang_id]}</a></td>'
+            f'<td class="text-right submission-score" data-id="{submission_id}">{score}</td>'
+            f'<td class="text-right">{source_length} Byte</td>'
+            f'<td class="text-center"><span class="label label-default" aria-hidden="true">{status}</span></td>'
+            + detail.format(self.slug, submission_id, exec_time_ms, memory_kb)
+            + '</tr>'
+        )
+
+    def submission_list_html(self, pagenum: int, desc: bool = False) -> str:
+        """提出一覧ページ（orderBy=created，desc なら新しい順）の HTML を返す．範囲外のページは空の表になる．"""
+        total: int = self.num_visible
+        begin: int = (pagenum - 1) * self.rows_per_page
+        end: int = min(total, begin + self.rows_per_page)
+        indexes: Iterable[int] = range(total - 1 - begin, total - 1 - end, -1) if desc else range(begin, end)
+        rows: str = '\n'.join(self.submission_row(k) for k in indexes) if pagenum >= 1 else ''
+        order: str = '&amp;desc=true' if desc else ''
+        pagination: str = '\n'.join(
+            ('<li class="active">' if p == pagenum else '<li>')
+            + f'<a href="/contests/{self.slug}/submissions?orderBy=created{order}&amp;page={p}">{p}</a></li>'
+            for p in sorted({1, max(1, pagenum - 1), min(self.num_pages, max(1, pagenum)),
+                             min(self.num_pages, pagenum + 1), self.num_pages})
+        )
+        return (
+            '<!DOCTYPE html>\n<html>\n<head>\n'
+            f'<title>Submissions - {self.name}</title>\n'
+            '<script>\n'
+            f'var startTime = moment("{self.start_time.strftime("%Y-%m-%dT%H:%M:%S")}+09:00");\n'
+            f'var endTime = moment("{self.end_time.strftime("%Y-%m-%dT%H:%M:%S")}+09:00");\n'
+            '</script>\n</head>\n<body>\n'
+            '<div id="navbar-collapse" class="collapse navbar-collapse">\n<ul class="nav navbar-nav">\n'
+            f'<li><a class="contest-title" href="/contests/{self.slug}">{self.name}</a></li>\n'
+            '</ul>\n</div>\n'
+            '<div class="table-responsive">\n<table class="table table-bordered table-striped small th-center">\n'
+            '<thead><tr><th>Submission Time</th><th>Task</th><th>User</th><th>Language</th><th>Score</th>'
+            '<th>Code Size</th><th>Status</th><th>Exec Time</th><th>Memory</th><th></th></tr></thead>\n'
+            f'<tbody>\n{rows}\n</tbody>\n</table>\n</div>\n'
+            f'<div class="text-center"><ul class="pagination pagination-sm mt-0 mb-1">\n{pagination}\n</ul></div>\n'
+            '</body>\n</html>\n'
+        )
+
+    def task_list_html(self) -> str:
+        rows: str = '\n'.join(
+            '<tr>'
+            f'<td class="text-center no-break"><a href="/contests/{self.slug}/tasks/{self.task_slug(i)}">'
+            f'{chr(ord("A") + i)}</a></td>'
+            f'<td><a href="/contests/{self.slug}/tasks/{self.task_slug(i)}">Task {chr(ord("A") + i)}</a></td>'
+            '<td class="text-right">2 sec</td><td class="text-right">1024 MB</td>'
+            f'<td class="text-center"><a href="/contests/{self.slug}/submit?taskScreenName={self.task_slug(i)}">'
+            'Submit</a></td>'
+            '</tr>'
+            for i in range(self.num_tasks)
+        )
+        return (
+            '<!DOCTYPE html>\n<html>\n<body>\n<div class="table-responsive">\n<table class="table table-bordered table-striped">\n'
+            f'<tbody>\n{rows}\n</tbody>\n</table>\n</div>\n</body>\n</html>\n'
+        )
+
+
+    def aperfs(self) -> Dict[str, int]:
+        """ac-predictor の aperfs/{contest}.json の内容（ユーザ名→内部レート）を返す．"""
+        rng: random.Random = random.Random(f'{self.seed}/{self.slug}/aperfs')
+        return {f'user{k:05d}': max(0, int(rng.gauss(1400, 600))) for k in range(self.num_users)}
+
+    def result_csv(self, provisional: bool = False) -> str:
+        """コンテスト期間中の AC 提出から作った最終順位表を，AtCoder の結果 CSV の形式で返す．
+
+        得点は問題ごとの最高点の合計で，同点は同順位になる．
+        provisional なら，ahc001 の CSV のように暫定順位と暫定得点の列も付ける．
+        """
+        best: Dict[str, Dict[str, int]] = {}
+        for k in range(min(self.num_submissions, self.num_visible)):
+            submission: SyntheticSubmission = self.submission(k)
+            if submission.status != "AC":
+                continue
+            task_best: Dict[str, int] = best.setdefault(submission.user_name, {})
+            task_best[submission.task_slug] = max(task_best.get(submission.task_slug, 0), submission.score)
+        scores: List[Tuple[int, str]] = sorted(((sum(task_best.values()), user_name) for user_name, task_best in best.items()),
+                                     key=lambda t: (-t[0], t[1]))
+        # 暫定得点はシステムテストの前の得点なので，最終得点とは順位が入れ替わる
+        provisional_scores: Dict[str, int] = {
+            user_name: score // 50 + random.Random(f'{self.seed}/{self.slug}/{user_name}').randrange(10 ** 7)
+            for score, user_name in scores}
+        provisional_ranks: Dict[str, int] = rank_by_score(provisional_scores)
+        ranks: Dict[str, int] = rank_by_score({user_name: score for score, user_name in scores})
+        aperfs: Dict[str, int] = self.aperfs()
+        lines: List[str] = ['Rank,Name,Score,Provisional Rank,Provisional Score,Performance,Old Rating(β),Change,'
+                            'New Rating(β)' if provisional else
+                            'Rank,Name,Score,Performance,Old Rating(β),Change,New Rating(β)']
+        for score, user_name in scores:
+            performance: int = aperfs[user_name]
+            old_rating: int = performance // 2
+            new_rating: int = (old_rating + performance) // 2
+            columns: List[object] = [ranks[user_name], user_name, score]
+            if provisional:
+                columns += [provisional_ranks[user_name], provisional_scores[user_name]]
+            columns += [performance, old_rating, f'{new_rating - old_rating:+d}', new_rating]
+            lines.append(','.join(map(str, columns)))
+        return '\n'.join(lines) + '\n'
+
+
+def rank_by_score(scores: Dict[str, int]) -> Dict[str, int]:
+    """得点の降順の順位（同点は同順位）を返す．"""
+    ranks: Dict[str, int] = {}
+    ordered: List[int] = sorted(scores.values(), reverse=True)
+    first: Dict[int, int] = {}
+    for position, score in enumerate(ordered):
+        first.setdefault(score, position + 1)
+    for user_name, score in scores.items():
+        ranks[user_name] = first[score]
+    return ranks
+
+
+def contest_list_html(contests: List[SyntheticContest]) -> str:
+    """コンテスト一覧（アーカイブ）ページの HTML を返す．新しいコンテストが先頭に来る．"""
+    rows: str = '\n'.join(
+        '<tr>'
+        f'<td class="text-center"><time class="fixtime-full">{contest.start_time.strftime("%Y-%m-%d %H:%M:%S+0900")}'
+        '</time></td>'
+        f'<td><a href="/contests/{contest.slug}">{contest.name}</a></td>'
+        f'<td class="text-center">{contest.duration_minutes // 60:02d}:{contest.duration_minutes % 60:02d}</td>'
+        '<td class="text-center">All</td>'
+        '</tr>'
+        for contest in sorted(contests, key=lambda c: c.start_time, reverse=True)
+    )
+    return (
+        '<!DOCTYPE html>\n<html>\n<body>\n<div class="table-responsive">\n<table class="table table-default table-striped table-hover table-condensed">\n'
+        f'<tbody>\n{rows}\n</tbody>\n</table>\n</div>\n</body>\n</html>\n'
+    )
@@ -2,6 +2,9 @@ import re
 from typing import List, Match, Optional, Pattern
 from bs4 import BeautifulSoup
 from bs4.element import Tag
+import lxml.html
+
+from lib.ParserBackend import BackendName, ParserBackend, TABLE_ROWS_XPATH
 
 
 class TaskListPage:
@@ -24,14 +27,29 @@ class TaskListPage:
             self.name = table_data_list[1].get_text()
 
             task_tag: Tag = table_data_list[1].find("a")
-            task_href_match: Optional[Match[str]] = self.task_href_pattern.search(
-                task_tag["href"]
-            )
+            self.__parse_href(task_tag["href"])
+            self.__parse_limits(table_data_list[2].get_text(), table_data_list[3].get_text())
+
+        @classmethod
+        def from_lxml(cls, table_row: lxml.html.HtmlElement) -> "TaskListPage.Task":
+            """lxml の行要素から問題インスタンスを初期化する．__init__ と同じ結果になる．"""
+            self = cls.__new__(cls)
+            table_data_list: List[lxml.html.HtmlElement] = list(table_row.iter("td"))
+
+            self.label = table_data_list[0].text_content()
+            self.name = table_data_list[1].text_content()
+
+            self.__parse_href(next(table_data_list[1].iter("a")).get("href"))
+            self.__parse_limits(table_data_list[2].text_content(), table_data_list[3].text_content())
+            return self
+
+        def __parse_href(self, href: str) -> None:
+            task_href_match: Optional[Match[str]] = self.task_href_pattern.search(href)
             assert task_href_match is not None
             self.contest_slug = task_href_match.group(1)
             self.task_slug = task_href_match.group(2)
 
-            time_limit_sec_str: str = table_data_list[2].get_text()
+        def __parse_limits(self, time_limit_sec_str: str, memory_limit_mb_str: str) -> None:
             time_limit_sec_str = time_limit_sec_str.strip()
             time_limit_sec_match: Optional[Match[str]] = (
                 self.time_limit_sec_pattern.search(time_limit_sec_str)
@@ -46,7 +64,6 @@ class TaskListPage:
                 else:
                     assert False
 
-            memory_limit_mb_str: str = table_data_list[3].get_text()
             memory_limit_mb_match: Optional[Match[str]] = (
                 self.memory_limit_mb_pattern.search(memory_limit_mb_str)
             )
@@ -65,12 +82,19 @@ class TaskListPage:
 
     tasks: List[Task]
 
-    def __init__(self, html: str) -> None:
+    def __init__(self, html: str, backend: Optional[BackendName] = None) -> None:
         """HTML をパースして問題一覧を初期化する．
 
         Args:
             html (str): 問題一覧ページの HTML 文字列．
+            backend (Optional[BackendName]): 使用するパーサ．None なら ParserBackend.default
         """
+        if (backend or ParserBackend.default) == "lxml":
+            self.tasks = [
+                TaskListPage.Task.from_lxml(table_row)
+                for table_row in lxml.html.fromstring(html).xpath(TABLE_ROWS_XPATH)
+            ]
+            return
         soup: BeautifulSoup = BeautifulSoup(html, "html.parser")
         table_rows: List[Tag] = soup.select("div.table-responsive table.table tbody tr")
         self.tasks = [TaskListPage.Task(table_row) for table_row in table_rows]
@@ -1,7 +1,9 @@
 from __future__ import annotations
 from typing import List, Tuple
+from lib.Endpoint import Endpoint
+from lib.HttpClient import HttpClient
+from lib.Metrics import Metrics
 from lib.TaskListPage import TaskListPage
-import requests
 from requests.models import Response
 
 TaskDBInsertData = Tuple[str, str, str, str, float, int]
@@ -20,9 +22,9 @@ class TaskListPageRequestResult:
         return (f'<TaskListPageRequestResult contest={self.contest} task_list_page={self.task_list_page}>')
 
     def get(self) -> None:
-        url: str = (f'https://atcoder.jp/contests/{self.contest}/tasks?lang=ja')
+        url: str = (f'{Endpoint.atcoder}/contests/{self.contest}/tasks?lang=ja')
         headers = {'accept-language': 'ja,en-US;q=0.9,en;q=0.8'}
-        response: Response = requests.get(url, headers=headers)
+        response: Response = HttpClient.get_default().get(url, headers=headers)
         if response.status_code == 404:
             self.is_closed = True
         else:
@@ -31,7 +33,8 @@ class TaskListPageRequestResult:
         self.html = response.text
 
     def parse(self) -> None:
-        self.task_list_page = TaskListPage(self.html)
+        with Metrics.get_default().timer('parse_tasks'):
+            self.task_list_page = TaskListPage(self.html)
 
     @classmethod
     def create_from_request(cls, contest: str = 'ahc001') -> TaskListPageRequestResult:
@@ -1,5 +1,5 @@
 import csv
-from typing import Dict, List, Set, Union
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 
 
 class AHCRankEntry:
@@ -79,11 +79,42 @@ class AHCScoresCSV:
         # print(self.name2score)
         # print(self.entries)
 
-    def fix_data(
+    def summarize_scores(
         self,
-        data: List[Dict[str, Union[str, int, float]]],
-        last_submission_id_set: Set[int]
-    ) -> List[Dict[str, Union[str, int, float]]]:
+        data: Iterable[Dict[str, Union[str, int, float]]]
+    ) -> Dict[str, Tuple[int, Optional[int]]]:
+        """ユーザごとの提出数と，最後の提出を除いた最大スコアを返す．
+
+        最大スコア推移のリストの末尾から 2 番目の値だけが要るので，リストは作らない．
+
+        Returns:
+            Dict[str, Tuple[int, Optional[int]]]: ユーザ名→(提出数, 最後の提出より前の最大スコア)
+        """
+        # ユーザ名→(提出数, 最後の提出より前の最大スコア, 最大スコア)
+        states: Dict[str, Tuple[int, Optional[int], int]] = {}
+        for d in data:
+            assert isinstance(d['score'], int)
+            assert isinstance(d['user_name'], str)
+            if d['user_name'] in states:
+                count, _, ma = states[d['user_name']]
+                states[d['user_name']] = (count + 1, ma, max(d['score'], ma))
+            else:
+                states[d['user_name']] = (1, None, d['score'])
+        return {user_name: (count, prev_ma) for user_name, (count, prev_ma, _) in states.items()}
+
+    def fix_stream(
+        self,
+        data: Iterable[Dict[str, Union[str, int, float]]],
+        last_submission_id_set: Set[int],
+        score_summaries: Dict[str, Tuple[int, Optional[int]]]
+    ) -> Iterator[Dict[str, Union[str, int, float]]]:
+        """提出を 1 件ずつ受け取り，最終提出のスコアを暫定スコアに置き換えながら返す．
+
+        Args:
+            data (Iterable[Dict[str, Union[str, int, float]]]): 提出 ID 昇順の提出
+            last_submission_id_set (Set[int]): (ユーザ, 問題) ごとの最終提出の ID
+            score_summaries (Dict[str, Tuple[int, Optional[int]]]): 同じ提出に対する summarize_scores の結果
+        """
         # {
         #     'submission_id': submission_id,
         #     'task': task,
@@ -92,32 +123,31 @@ class AHCScoresCSV:
         #     'score': row[4] if row[6] == 1 else row[4] / row[6],
         #     'status': row[5]
         # }
-
-        # ユーザごとの最大スコア推移を出す
-        user_score_list_map: Dict[str, List[int]] = {}
-        for d in data:
-            assert isinstance(d['score'], int)
-            assert isinstance(d['user_name'], str)
-            if d['user_name'] in user_score_list_map:
-                ma: int = max(d['score'], user_score_list_map[d['user_name']][-1])
-                user_score_list_map[d['user_name']].append(ma)
-            else:
-                user_score_list_map[d['user_name']] = [d['score']]
         for d in data:
             if not (d['submission_id'] in last_submission_id_set):
+                yield d
                 continue
             # assert d['submission_id'] in last_submission_id_set
             assert isinstance(d['user_name'], str)
             if not (d['user_name'] in self.name2provisionalscore):
+                yield d
                 continue
             # assert d['user_name'] in self.name2score
-            assert d['user_name'] in user_score_list_map
+            assert d['user_name'] in score_summaries
             provisional_score: int = self.name2provisionalscore[d['user_name']]
-            if len(user_score_list_map[d['user_name']]) == 1 or provisional_score > user_score_list_map[d['user_name']][-2]:
+            count, prev_ma = score_summaries[d['user_name']]
+            if count == 1 or (prev_ma is not None and provisional_score > prev_ma):
                 d['score'] = provisional_score
             else:
                 d['score'] = -1
-        return data
+            yield d
+
+    def fix_data(
+        self,
+        data: List[Dict[str, Union[str, int, float]]],
+        last_submission_id_set: Set[int]
+    ) -> List[Dict[str, Union[str, int, float]]]:
+        return list(self.fix_stream(data, last_submission_id_set, self.summarize_scores(data)))
 
 
 def main() -> None:
@@ -0,0 +1,161 @@
+from __future__ import annotations
+import argparse
+import csv
+import hashlib
+import io
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Match, Optional, Pattern, Tuple
+
+from lib.Migration import connect
+from lib.csv.AHCResultCSV import AHCRankEntry, AHCScoresCSV
+
+CSV_DIR: Path = Path(__file__).resolve().parent
+
+# results 表の 1 行（contest, user_name, position, rank, ... new_rating_beta）
+ResultDBInsertData = Tuple[str, str, int, int, int, int, int, int, int, int, int]
+
+result_filename_pattern: Pattern[str] = re.compile(r'^result_(.+)\.csv$')
+
+ENTRY_COLUMNS: str = ('user_name, rank, score, provisional_rank, provisional_score, performance, '
+                      'old_rating_beta, change, new_rating_beta')
+
+
+class AHCResultStore:
+    """AHC の最終結果 CSV を DB の results 表に取り込み，コンテストやユーザごとに引くクラス．
+
+    CSV は内容が変わったときだけ取り込み直すので，毎回パースする必要はない．
+    """
+
+    conn: sqlite3.Connection
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        """
+        Args:
+            conn (sqlite3.Connection): results 表のある DB への接続（読み取り専用でもよい）
+        """
+        self.conn = conn
+
+    def __repr__(self) -> str:
+        return f'<AHCResultStore contests={len(self.get_contests())}>'
+
+    @classmethod
+    def open(cls, database: str) -> AHCResultStore:
+        """DB に接続し，スキーマを最新にしてから返す．close で接続を閉じる．"""
+        return cls(connect(database))
+
+    def __enter__(self) -> AHCResultStore:
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def get_contests(self) -> List[str]:
+        return [row[0] for row in self.conn.execute('SELECT contest FROM result_files ORDER BY contest')]
+
+    def get_sha256(self, contest: str) -> Optional[str]:
+        """取り込んだ CSV の sha256 を返す．取り込んでいなければ None．"""
+        row: Optional[Tuple[str]] = self.conn.execute(
+            'SELECT sha256 FROM result_files WHERE contest = ?', (contest,)).fetchone()
+        return None if row is None else row[0]
+
+    def import_csv(self, contest: str, path: Path, force: bool = False) -> bool:
+        """CSV を取り込む．前回と内容が同じなら何もしない．
+
+        Returns:
+            bool: 取り込んだら True
+        """
+        data: bytes = path.read_bytes()
+        sha256: str = hashlib.sha256(data).hexdigest()
+        if not force and self.get_sha256(contest) == sha256:
+            return False
+        rows: List[ResultDBInsertData] = list(parse_result_csv(contest, data.decode('utf_8')))
+        self.conn.execute('DELETE FROM results WHERE contest = ?', (contest,))
+        self.conn.executemany('INSERT OR REPLACE INTO results VALUES (?,?,?,?,?,?,?,?,?,?,?)', rows)
+        self.conn.execute('INSERT OR REPLACE INTO result_files VALUES (?,?,?,?)',
+                          (contest, sha256, int(time.time()), len(rows)))
+        self.conn.commit()
+        return True
+
+    def import_all(self, csv_dir: Path = CSV_DIR, force: bool = False) -> List[str]:
+        """csv_dir の result_{contest}.csv をすべて取り込む．
+
+        Returns:
+            List[str]: 取り込んだ（内容が変わっていた）コンテスト
+        """
+        imported: List[str] = []
+        for path in sorted(csv_dir.glob('result_*.csv')):
+            match: Optional[Match[str]] = result_filename_pattern.match(path.name)
+            assert match is not None
+            if self.import_csv(match.group(1), path, force):
+                imported.append(match.group(1))
+        return imported
+
+    def get_entries(self, contest: str) -> Dict[str, AHCRankEntry]:
+        """コンテストのユーザ名→結果を，CSV の行の順に返す．"""
+        return {row[0]: AHCRankEntry(row[1], row[0], *row[2:]) for row in self.conn.execute(
+            f'SELECT {ENTRY_COLUMNS} FROM results WHERE contest = ? ORDER BY position', (contest,))}
+
+    def get_entry(self, contest: str, user_name: str) -> Optional[AHCRankEntry]:
+        row: Optional[Tuple[int, ...]] = self.conn.execute(
+            f'SELECT {ENTRY_COLUMNS} FROM results WHERE contest = ? AND user_name = ?',
+            (contest, user_name)).fetchone()
+        return None if row is None else AHCRankEntry(row[1], row[0], *row[2:])
+
+    def get_user_entries(self, user_name: str) -> Dict[str, AHCRankEntry]:
+        """ユーザのコンテスト→結果を返す．"""
+        return {row[0]: AHCRankEntry(row[2], row[1], *row[3:]) for row in self.conn.execute(
+            f'SELECT contest, {ENTRY_COLUMNS} FROM results WHERE user_name = ? ORDER BY contest', (user_name,))}
+
+    def get_scores(self, contest: str) -> AHCScoresCSV:
+        """CSV を読まずに，AHCScoresCSV(result_{contest}.csv) と同じものを返す．"""
+        scores: AHCScoresCSV = AHCScoresCSV.__new__(AHCScoresCSV)
+        scores.entries = self.get_entries(contest)
+        scores.name2provisionalscore = {
+            name: entry.provisional_score for name, entry in scores.entries.items() if entry.provisional_score != -1}
+        return scores
+
+    def get_provisional_scores(self, contest: str) -> Dict[str, int]:
+        """暫定スコアのあるユーザのユーザ名→暫定スコアを返す．"""
+        return dict(self.conn.execute(
+            'SELECT user_name, provisional_score FROM results WHERE contest = ? AND provisional_score != -1 '
+            'ORDER BY position', (contest,)))
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def parse_result_csv(contest: str, text: str) -> Iterator[ResultDBInsertData]:
+    """CSV の各行を results 表の行にする．列の位置はヘッダから 1 回だけ求め，ない列は -1 にする．"""
+    reader: Iterator[List[str]] = csv.reader(io.StringIO(text))
+    header: List[str] = next(reader)
+    columns: List[Optional[int]] = [
+        header.index(name) if name in header else None
+        for name in ('Rank', 'Score', 'Provisional Rank', 'Provisional Score', 'Performance',
+                     'Old Rating(β)', 'Change', 'New Rating(β)')]
+    name_column: int = header.index('Name')
+    for position, row in enumerate(reader):
+        if len(row) == 0:
+            continue
+        values: List[int] = [-1 if column is None else int(row[column]) for column in columns]
+        yield (contest, row[name_column], position, values[0], values[1], values[2], values[3], values[4],
+               values[5], values[6], values[7])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='lib/csv/result_*.csv を DB の results 表に取り込む')
+    parser.add_argument('--database', default='db.db')
+    parser.add_argument('--csv-dir', default=str(CSV_DIR))
+    parser.add_argument('--force', action='store_true', help='内容が変わっていない CSV も取り込み直す')
+    args = parser.parse_args()
+    with AHCResultStore.open(args.database) as store:
+        imported: List[str] = store.import_all(Path(args.csv_dir), args.force)
+        print(f'imported {len(imported)} contests: {imported}')
+
+
+# $ cd crawler
+# $ python -m lib.csv.AHCResultStore
+if __name__ == '__main__':
+    main()
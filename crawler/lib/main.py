@@ -1,18 +1,24 @@
 
 import re
-import json
+import argparse
 from datetime import timedelta
+from pathlib import Path
 from typing import Dict, List, Pattern, Union
-from ContestListPageRequestResult import ContestListPageRequestResult
-from csv.AHCResultCSV import AHCScoresCSV
+from lib.AtomicFile import write_json
+from lib.ContestListPageRequestResult import ContestListPageRequestResult
+from lib.csv.AHCResultCSV import AHCRankEntry
+from lib.csv.AHCResultStore import AHCResultStore
 
+HISTORY_JSON_DIR: Path = Path('../atcoder-marathon-rating-history-frontend/public/json')
 
-def crawl() -> None:
+
+def crawl(store: AHCResultStore) -> None:
     pattern: Pattern[str] = re.compile(r'^(ahc\d\d\d|rcl-contest-2021-long|future-contest-2022-qual)$')
     clprr: ContestListPageRequestResult = ContestListPageRequestResult.create_from_request()
     contests: List[Dict[str, Union[int, str]]] = []
     for contest in clprr.contest_list_page.contests:
-        if pattern.match(contest.contest_slug):
+        # 結果 CSV を取り込んでいないコンテストは飛ばす
+        if pattern.match(contest.contest_slug) and store.get_sha256(contest.contest_slug) is not None:
             # print(contest, contest.time + timedelta(minutes=contest.duration_minutes))
             end_time = int((contest.time + timedelta(minutes=contest.duration_minutes)).timestamp())
             contests.append({'name': contest.contest_name, 'endtime': end_time, 'slug': contest.contest_slug})
@@ -21,7 +27,7 @@ def crawl() -> None:
             #   "ContestName": "AtCoder Beginner Contest 142",
             #   "StandingsUrl": "https://atcoder.jp/contests/abc142/standings?watching=abb",
             #   "StandingsU": "/contests/abc142/standings?watching=abb", "low": 0, "high": 10000},
-            csv: AHCScoresCSV = AHCScoresCSV(f'./csv/result_{contest.contest_slug}.csv')
+            entries: Dict[str, AHCRankEntry] = store.get_entries(contest.contest_slug)
             obj: Dict[str, Dict[str, Union[int, str]]] = {name: {
                 'EndTime': end_time,
                 'NewRating': entry.new_rating_beta,
@@ -35,19 +41,22 @@ def crawl() -> None:
                 'performance': entry.performance,
                 'change': entry.change,
                 'slug': contest.contest_slug
-            } for name, entry in csv.entries.items()}
-            with open(f'../atcoder-marathon-rating-history-frontend/public/json/results/{contest.contest_slug}.json',
-                      mode='wt', encoding='utf-8') as f:
-                json.dump(obj, f, separators=(',', ':'))
+            } for name, entry in entries.items()}
+            write_json(HISTORY_JSON_DIR / 'results' / f'{contest.contest_slug}.json', obj)
     contests.reverse()
-    with open(f'../atcoder-marathon-rating-history-frontend/public/json/contests/contests.json',
-              mode='wt', encoding='utf-8') as f:
-        json.dump(contests, f, separators=(',', ':'))
+    write_json(HISTORY_JSON_DIR / 'contests' / 'contests.json', contests)
 
 
 def main() -> None:
-    crawl()
+    parser = argparse.ArgumentParser(description='AHC のレーティング履歴を JSON で出力する')
+    parser.add_argument('--database', default='db.db')
+    args = parser.parse_args()
+    with AHCResultStore.open(args.database) as store:
+        store.import_all()
+        crawl(store)
 
 
+# $ cd crawler
+# $ python -m lib.main
 if __name__ == '__main__':
     main()
@@ -0,0 +1,24 @@
+# Author: iilj
+
+import argparse
+import sqlite3
+from sqlite3.dbapi2 import Connection
+
+from lib.Migration import get_version, migrate
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='クローラの DB を作成・最新のスキーマに更新する')
+    parser.add_argument('--database', default='db.db')
+    parser.add_argument('--target', type=int, default=None, help='このバージョンまで適用する')
+    args = parser.parse_args()
+
+    conn: Connection = sqlite3.connect(args.database)
+    print(f'{args.database}: version {get_version(conn)}')
+    version: int = migrate(conn, args.target, verbose=True)
+    print(f'{args.database}: version {version}')
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
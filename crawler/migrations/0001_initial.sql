@@ -1,4 +1,4 @@
-CREATE TABLE submissions(
+CREATE TABLE IF NOT EXISTS submissions(
     submission_id INTEGER PRIMARY KEY,
     contest TEXT,
     task TEXT,
@@ -16,7 +16,7 @@ CREATE TABLE submissions(
     magnification INTEGER DEFAULT 1
 );
 
-CREATE TABLE contests(
+CREATE TABLE IF NOT EXISTS contests(
     contest_slug TEXT,
     contest_name TEXT,
     start_time_unix INTEGER,
@@ -26,7 +26,7 @@ CREATE TABLE contests(
     rated INTEGER  DEFAULT 0
 );
 
-CREATE TABLE tasks(
+CREATE TABLE IF NOT EXISTS tasks(
     contest_slug TEXT,
     task_slug TEXT,
     label TEXT,
@@ -0,0 +1,21 @@
+-- contests.contest_slug を主キーにする（SQLite では ALTER TABLE で主キーを追加できないので作り直す）
+CREATE TABLE contests_new(
+    contest_slug TEXT PRIMARY KEY,
+    contest_name TEXT,
+    start_time_unix INTEGER,
+    end_time_unix INTEGER,
+    crawl_completed INTEGER DEFAULT 0,
+    closed INTEGER DEFAULT 0,
+    rated INTEGER  DEFAULT 0
+);
+INSERT OR IGNORE INTO contests_new SELECT * FROM contests ORDER BY rowid ASC;
+DROP TABLE contests;
+ALTER TABLE contests_new RENAME TO contests;
+
+-- export_submissions / get_users 用のカバリングインデックス（submission_id は rowid なので含まれる）
+CREATE INDEX submissions_contest_time_unix ON submissions(
+    contest, time_unix, user_name, task, score, status, magnification
+);
+
+-- crawl_contest の再開位置 MAX(pagenum) 用
+CREATE INDEX submissions_contest_pagenum ON submissions(contest, pagenum);
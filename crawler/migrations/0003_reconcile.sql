@@ -0,0 +1,24 @@
+-- 昇順の提出一覧ページを最後に取得した時刻（コンテスト終了前に取得したページを再取得の対象にする）
+CREATE TABLE pages(
+    contest TEXT,
+    pagenum INTEGER,
+    crawled_at INTEGER,
+    PRIMARY KEY(contest, pagenum)
+);
+
+-- 再取得ジョブの実行記録
+CREATE TABLE reconcile_runs(
+    run_id INTEGER PRIMARY KEY,
+    contest TEXT,
+    started_at INTEGER,
+    finished_at INTEGER,
+    suspicious_rows INTEGER,
+    stale_pages INTEGER,
+    requests INTEGER,
+    rows_inserted INTEGER,
+    rows_updated INTEGER,
+    rows_missing INTEGER
+);
+
+-- 再取得の対象になる WJ/WR/IE の提出を探す用
+CREATE INDEX submissions_contest_status ON submissions(contest, status);
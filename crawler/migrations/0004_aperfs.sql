@@ -0,0 +1,14 @@
+-- ac-predictor の aperfs/{contest}.json をまとめて持つ表（lib/json/ の JSON ファイルの置き換え）
+CREATE TABLE aperfs(
+    contest TEXT,
+    user_name TEXT,
+    aperf INTEGER,
+    PRIMARY KEY(contest, user_name)
+) WITHOUT ROWID;
+
+-- 取得済みのコンテスト（aperfs に行がないコンテストも取得済みとわかるように別に持つ）
+CREATE TABLE aperf_contests(
+    contest TEXT PRIMARY KEY,
+    fetched_at INTEGER,
+    users INTEGER
+);
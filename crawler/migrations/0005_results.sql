@@ -0,0 +1,27 @@
+-- lib/csv/result_{contest}.csv（AHC の最終結果）を取り込んだ表
+-- position は CSV での行の順番（同順位の並びも CSV どおりに返すため）
+CREATE TABLE results(
+    contest TEXT,
+    user_name TEXT,
+    position INTEGER,
+    rank INTEGER,
+    score INTEGER,
+    provisional_rank INTEGER,
+    provisional_score INTEGER,
+    performance INTEGER,
+    old_rating_beta INTEGER,
+    change INTEGER,
+    new_rating_beta INTEGER,
+    PRIMARY KEY(contest, user_name)
+) WITHOUT ROWID;
+
+CREATE INDEX results_contest_position ON results(contest, position);
+CREATE INDEX results_user_name ON results(user_name, contest);
+
+-- 取り込んだ CSV の内容のハッシュ（変わっていなければ取り込み直さない）
+CREATE TABLE result_files(
+    contest TEXT PRIMARY KEY,
+    sha256 TEXT,
+    imported_at INTEGER,
+    rows INTEGER
+);
@@ -0,0 +1,11 @@
+-- 日本時間の日時をホストのタイムゾーンの時刻とみなして UNIX 時刻にしていた値を，本来の UNIX 時刻（+09:00 として解釈したもの）に直す
+-- datetime(t, 'unixepoch', 'localtime') でページに書かれていた日時に戻してから，9 時間を引く
+-- DB を作ったホストと同じタイムゾーンで適用すること（日本時間のホストでは値は変わらない）
+UPDATE contests SET
+    start_time_unix = CAST(strftime('%s', start_time_unix, 'unixepoch', 'localtime') AS INTEGER) - 32400,
+    end_time_unix = CAST(strftime('%s', end_time_unix, 'unixepoch', 'localtime') AS INTEGER) - 32400
+WHERE start_time_unix != CAST(strftime('%s', start_time_unix, 'unixepoch', 'localtime') AS INTEGER) - 32400
+   OR end_time_unix != CAST(strftime('%s', end_time_unix, 'unixepoch', 'localtime') AS INTEGER) - 32400;
+
+UPDATE submissions SET time_unix = CAST(strftime('%s', time_unix, 'unixepoch', 'localtime') AS INTEGER) - 32400
+WHERE time_unix != CAST(strftime('%s', time_unix, 'unixepoch', 'localtime') AS INTEGER) - 32400;
@@ -0,0 +1,5 @@
+-- コンテストごとの提出の更新回数（export.py の指紋用．SubmissionWriter と crawl.py --reparse が，行を変えたときに増やす）
+CREATE TABLE contest_revisions(
+    contest TEXT PRIMARY KEY,
+    revision INTEGER
+) WITHOUT ROWID;